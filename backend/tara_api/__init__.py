@@ -1,8 +1,20 @@
 """
 TARA API - 威胁分析和风险评估报告生成服务
 """
-from .main import app
+import time
+
+# 服务启动耗时从导入本包开始计算
+_import_started = time.perf_counter()
+
 from .models import TARAReportData, GenerateReportResponse
 
 __version__ = "1.0.0"
 __all__ = ["app", "TARAReportData", "GenerateReportResponse"]
+
+
+def __getattr__(name):
+    # 按需导入应用，使 tara_api.benchmark 等工具可以在生成器导入前完成配置（如字体）
+    if name == "app":
+        from .main import app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
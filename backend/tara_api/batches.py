@@ -0,0 +1,80 @@
+"""
+批量报告生成
+一次请求提交多个报告文档（多个JSON文件，或包含JSON文件的zip压缩包），各报告在工作进程中并行生成，
+结果以逐项状态清单返回，所有生成的报告可打包为一个zip下载
+"""
+import os
+import uuid
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import Any, Dict, List, Tuple
+
+from .json_backend import dumps
+
+
+class BatchArchiveError(ValueError):
+    """上传的zip压缩包无效或超出限制"""
+
+
+def list_zip_documents(path: Path, max_documents: int) -> List[str]:
+    """
+    列出zip压缩包中的JSON文件（按文件名排序）
+    忽略目录、隐藏文件和 __MACOSX/ 下的元数据；不是有效的zip或文件数超出限制时抛出 BatchArchiveError
+    """
+    try:
+        with zipfile.ZipFile(path) as zf:
+            names = []
+            for info in zf.infolist():
+                member = PurePosixPath(info.filename)
+                if info.is_dir() or member.parts[0] == '__MACOSX' or member.name.startswith('.'):
+                    continue
+                if member.suffix.lower() == '.json':
+                    names.append(info.filename)
+    except zipfile.BadZipFile:
+        raise BatchArchiveError("上传的文件不是有效的zip压缩包")
+
+    if not names:
+        raise BatchArchiveError("zip压缩包中没有JSON文件")
+    if len(names) > max_documents:
+        raise BatchArchiveError(f"zip压缩包中的JSON文件数超过上限({max_documents})")
+    return sorted(names)
+
+
+def read_zip_document(path: Path, name: str, max_size: int) -> bytes:
+    """
+    读取zip压缩包中的一个文件
+    按解压后的实际大小限制（不信任压缩包中记录的大小），超出时抛出 BatchArchiveError
+    """
+    with zipfile.ZipFile(path) as zf:
+        if zf.getinfo(name).file_size > max_size:
+            raise BatchArchiveError(f"文件超过大小限制({max_size // (1024 * 1024)}MB)")
+        with zf.open(name) as f:
+            data = f.read(max_size + 1)
+    if len(data) > max_size:
+        raise BatchArchiveError(f"文件超过大小限制({max_size // (1024 * 1024)}MB)")
+    return data
+
+
+def archive_member_name(item: Dict[str, Any]) -> str:
+    """报告在打包文件中的文件名：序号_来源文件名_报告ID.xlsx"""
+    stem = PurePosixPath(item['name'] or '').stem or 'report'
+    return f"{item['index'] + 1:03d}_{stem}_{item['report_id']}.xlsx"
+
+
+def build_batch_archive(archive_path: Path, manifest: Dict[str, Any], files: List[Tuple[str, Path]]) -> Path:
+    """
+    将批量生成的报告和状态清单打包为zip（先写临时文件再原子替换）
+    xlsx本身已经压缩，按存储方式写入，不再重复压缩
+    """
+    archive_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = archive_path.parent / f".{archive_path.name}.{uuid.uuid4().hex}.tmp"
+    try:
+        with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_STORED) as zf:
+            zf.writestr('manifest.json', dumps(manifest), compress_type=zipfile.ZIP_DEFLATED)
+            for arcname, file_path in files:
+                zf.write(file_path, arcname)
+        os.replace(tmp_path, archive_path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    return archive_path
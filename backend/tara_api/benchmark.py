@@ -0,0 +1,478 @@
+"""
+PDF生成基准测试与版式分析
+使用合成报告数据按规模递增渲染PDF，统计各章节构建耗时、doc.build耗时、页数和文件大小，
+并可按Flowable类型统计布局（wrap/split/draw）耗时。
+--startup 测量API服务从启动进程到首个健康检查响应的耗时。
+--payload-memory 测量报告数据解析后的内存占用与JSON字节数之比（校验 payloads.PARSED_SIZE_FACTOR）。
+
+用法:
+    python -m tara_api.benchmark --sizes 10 100 1000
+    python -m tara_api.benchmark --sizes 100 --images --flowables
+    python -m tara_api.benchmark --sizes 100 --images --profile screen
+    python -m tara_api.benchmark --font system   # 使用系统中文字体（默认使用内置CID字体，离线可复现）
+    python -m tara_api.benchmark --startup 5 --max-startup 1.0   # 冷启动耗时，超过1秒时返回非0
+    python -m tara_api.benchmark --payload-memory --sizes 10 100 1000
+"""
+import os
+import re
+import sys
+import time
+import json
+import socket
+import argparse
+import tempfile
+import statistics
+import subprocess
+import tracemalloc
+import urllib.request
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager, nullcontext, redirect_stdout
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+
+
+# ==================== 合成数据 ====================
+STRIDE_MODELS = ['S欺骗', 'T篡改', 'R抵赖', 'I信息泄露', 'D拒绝服务', 'E权限提升']
+ATTACK_VECTORS = ['网络', '邻居', '本地', '物理']
+IMPACT_LEVELS = ['可忽略不计的', '中等的', '重大的', '严重的']
+
+
+def create_sample_image(path: str, width: int = 1600, height: int = 900) -> str:
+    """生成一张用于测试的PNG图片"""
+    from PIL import Image as PILImage, ImageDraw
+
+    img = PILImage.new('RGB', (width, height), (255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    for i in range(0, width, 40):
+        draw.line([(i, 0), (width - i, height)], fill=(47, 84, 150), width=2)
+    for j in range(0, height, 60):
+        draw.rectangle([(j, j), (j + 120, j + 40)], outline=(68, 114, 196), width=3)
+    img.save(path, 'PNG')
+    return path
+
+
+def make_synthetic_report(
+    results_count: int,
+    assets_count: Optional[int] = None,
+    attack_trees_count: int = 3,
+    image_path: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    生成合成的TARA报告数据
+
+    参数:
+        results_count: TARA分析结果条数
+        assets_count: 资产条数（默认为结果条数的1/4，至少1条）
+        attack_trees_count: 攻击树数量
+        image_path: 所有图片字段使用的图片路径（为空则不含图片）
+    """
+    if assets_count is None:
+        assets_count = max(1, results_count // 4)
+
+    assets = []
+    for i in range(assets_count):
+        assets.append({
+            'id': f'P{i + 1:04d}',
+            'name': f'资产{i + 1} Asset',
+            'category': '内部实体' if i % 2 == 0 else '外部接口',
+            'remarks': f'资产{i + 1}的备注说明，描述资产用途与部署位置' * (1 + i % 3),
+            'authenticity': i % 2 == 0,
+            'integrity': True,
+            'non_repudiation': i % 3 == 0,
+            'confidentiality': i % 2 == 1,
+            'availability': True,
+            'authorization': i % 4 == 0
+        })
+
+    results = []
+    for i in range(results_count):
+        asset = assets[i % assets_count]
+        results.append({
+            'asset_id': asset['id'],
+            'asset_name': asset['name'],
+            'subdomain1': '系统实体',
+            'subdomain2': 'N/A',
+            'subdomain3': 'SOC',
+            'category': asset['category'],
+            'security_attribute': 'Integrity\n完整性',
+            'stride_model': STRIDE_MODELS[i % len(STRIDE_MODELS)],
+            'threat_scenario': f'威胁场景{i + 1}: 攻击者篡改{asset["name"]}的通信数据，导致功能异常',
+            'attack_path': f'1.攻击者接入车辆网络\n2.定位目标{asset["name"]}\n3.注入恶意报文{i + 1}',
+            'wp29_mapping': '4.1\n5.1',
+            'attack_vector': ATTACK_VECTORS[i % len(ATTACK_VECTORS)],
+            'attack_complexity': '低' if i % 2 == 0 else '高',
+            'privileges_required': '低',
+            'user_interaction': '不需要',
+            'safety_impact': IMPACT_LEVELS[i % len(IMPACT_LEVELS)],
+            'financial_impact': IMPACT_LEVELS[(i + 1) % len(IMPACT_LEVELS)],
+            'operational_impact': IMPACT_LEVELS[(i + 2) % len(IMPACT_LEVELS)],
+            'privacy_impact': IMPACT_LEVELS[(i + 3) % len(IMPACT_LEVELS)],
+            'security_requirement': f'1.应对{asset["name"]}的通信进行加密认证\n2.应对异常报文进行检测'
+        })
+
+    return {
+        'cover': {
+            'report_title': '威胁分析和风险评估报告',
+            'report_title_en': 'Threat Analysis And Risk Assessment Report',
+            'project_name': f'基准测试项目-{results_count}',
+            'data_level': '秘密',
+            'document_number': f'BENCH-{results_count:06d}',
+            'version': 'V1.0',
+            'author_date': '2025.01',
+            'review_date': '2025.01'
+        },
+        'definitions': {
+            'title': '基准测试 - 相关定义',
+            'functional_description': '车载信息娱乐系统(IVI)集成多媒体娱乐、导航、蓝牙通信等功能。' * 5,
+            'item_boundary_image': image_path,
+            'system_architecture_image': image_path,
+            'software_architecture_image': image_path,
+            'assumptions': [{'id': f'ASM-{i + 1:02d}', 'description': f'假设{i + 1}'} for i in range(5)],
+            'terminology': [{'abbreviation': 'IVI', 'english': 'In-Vehicle Infotainment', 'chinese': '车载信息娱乐系统'}]
+        },
+        'assets': {
+            'title': '资产列表 Asset List',
+            'dataflow_image': image_path,
+            'assets': assets
+        },
+        'attack_trees': {
+            'title': '攻击树分析 Attack Tree Analysis',
+            'attack_trees': [
+                {'title': f'攻击树{i + 1}', 'image': image_path}
+                for i in range(attack_trees_count)
+            ]
+        },
+        'tara_results': {
+            'title': 'TARA分析结果 TARA Analysis Results',
+            'results': results
+        }
+    }
+
+
+# ==================== Flowable布局分析 ====================
+class FlowableProfiler:
+    """
+    按Flowable类型统计布局耗时
+    临时替换所有Flowable子类自身定义的 wrap / split / draw，记录每种类型的调用次数、
+    总耗时以及扣除嵌套Flowable（如表格单元格中的段落）后的自身耗时。
+    """
+
+    METHODS = ('wrap', 'split', 'draw')
+
+    def __init__(self):
+        # (类型名, 方法名) -> [调用次数, 总耗时, 自身耗时]
+        self.stats: Dict[tuple, List[float]] = defaultdict(lambda: [0, 0.0, 0.0])
+        self._stack: List[float] = []
+        self._originals: List[tuple] = []
+
+    def _wrap_method(self, method_name: str, original):
+        profiler = self
+
+        def timed(flowable, *args, **kwargs):
+            profiler._stack.append(0.0)
+            start = time.perf_counter()
+            try:
+                return original(flowable, *args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                child_time = profiler._stack.pop()
+                if profiler._stack:
+                    profiler._stack[-1] += elapsed
+                entry = profiler.stats[(type(flowable).__name__, method_name)]
+                entry[0] += 1
+                entry[1] += elapsed
+                entry[2] += elapsed - child_time
+
+        return timed
+
+    @staticmethod
+    def _flowable_classes() -> List[type]:
+        from reportlab.platypus.flowables import Flowable
+
+        classes, pending = [], [Flowable]
+        while pending:
+            cls = pending.pop()
+            if cls not in classes:
+                classes.append(cls)
+                pending.extend(cls.__subclasses__())
+        return classes
+
+    @contextmanager
+    def active(self) -> Iterator['FlowableProfiler']:
+        for cls in self._flowable_classes():
+            for name in self.METHODS:
+                original = cls.__dict__.get(name)
+                if callable(original):
+                    self._originals.append((cls, name, original))
+                    setattr(cls, name, self._wrap_method(name, original))
+        try:
+            yield self
+        finally:
+            for cls, name, original in reversed(self._originals):
+                setattr(cls, name, original)
+            self._originals.clear()
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """按自身耗时倒序返回统计结果"""
+        rows = [
+            {
+                'flowable': flowable,
+                'method': method,
+                'calls': int(calls),
+                'total_seconds': round(total, 4),
+                'self_seconds': round(self_time, 4)
+            }
+            for (flowable, method), (calls, total, self_time) in self.stats.items()
+        ]
+        rows.sort(key=lambda row: row['self_seconds'], reverse=True)
+        return rows
+
+
+# ==================== 基准测试 ====================
+def count_pdf_pages(path: str) -> int:
+    """统计PDF页数（reportlab输出的页面对象不压缩，可直接匹配）"""
+    with open(path, 'rb') as f:
+        return len(re.findall(rb'/Type /Page\b(?!s)', f.read()))
+
+
+def benchmark_pdf(
+    report_data: Dict[str, Any],
+    output_path: str,
+    profile_flowables: bool = False,
+    pdf_profile: Optional[str] = None
+) -> Dict[str, Any]:
+    """渲染一份报告并返回耗时统计"""
+    from .tara_pdf_generator import generate_tara_pdf_from_json
+    from .instrumentation import listening
+
+    phases: Dict[str, float] = defaultdict(float)
+
+    def record(name: str, start: float, end: float) -> None:
+        phases[name] += end - start
+
+    profiler = FlowableProfiler() if profile_flowables else None
+    start = time.perf_counter()
+    with listening(record):
+        if profiler:
+            with profiler.active():
+                generate_tara_pdf_from_json(output_path, report_data, profile=pdf_profile)
+        else:
+            generate_tara_pdf_from_json(output_path, report_data, profile=pdf_profile)
+    total = time.perf_counter() - start
+
+    result = {
+        'results_count': len(report_data['tara_results']['results']),
+        'assets_count': len(report_data['assets']['assets']),
+        'total_seconds': round(total, 4),
+        'phases': {name: round(seconds, 4) for name, seconds in phases.items()},
+        'pages': count_pdf_pages(output_path),
+        'file_size': os.path.getsize(output_path)
+    }
+    if profiler:
+        result['flowables'] = profiler.summary()
+    return result
+
+
+def run_benchmark(
+    sizes: List[int],
+    output_dir: str,
+    with_images: bool = False,
+    profile_flowables: bool = False,
+    pdf_profile: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """按给定规模依次渲染合成报告"""
+    os.makedirs(output_dir, exist_ok=True)
+    image_path = None
+    if with_images:
+        image_path = create_sample_image(os.path.join(output_dir, 'bench_image.png'))
+
+    results = []
+    for size in sizes:
+        report_data = make_synthetic_report(size, image_path=image_path)
+        output_path = os.path.join(output_dir, f'bench_{size}.pdf')
+        results.append(benchmark_pdf(report_data, output_path, profile_flowables, pdf_profile))
+    return results
+
+
+def print_report(results: List[Dict[str, Any]], top: int = 15) -> None:
+    """以表格形式输出基准测试结果"""
+    phase_names: List[str] = []
+    for result in results:
+        for name in result['phases']:
+            if name not in phase_names:
+                phase_names.append(name)
+
+    header = ['results', 'pages', 'size(KB)', 'total(s)'] + [name.replace('pdf.', '') for name in phase_names]
+    print('\t'.join(header))
+    for result in results:
+        row = [
+            str(result['results_count']),
+            str(result['pages']),
+            f"{result['file_size'] / 1024:.1f}",
+            f"{result['total_seconds']:.3f}"
+        ] + [f"{result['phases'].get(name, 0.0):.3f}" for name in phase_names]
+        print('\t'.join(row))
+
+    for result in results:
+        if 'flowables' not in result:
+            continue
+        print(f"\n[{result['results_count']} results] Flowable布局耗时 (top {top})")
+        print('flowable\tmethod\tcalls\ttotal(s)\tself(s)')
+        for row in result['flowables'][:top]:
+            print(f"{row['flowable']}\t{row['method']}\t{row['calls']}\t"
+                  f"{row['total_seconds']:.3f}\t{row['self_seconds']:.3f}")
+
+
+# ==================== 启动耗时 ====================
+def measure_startup(timeout: float = 30.0) -> Dict[str, Any]:
+    """
+    启动一个API服务进程（使用临时数据库），测量从启动进程到首个健康检查响应的耗时
+    返回: {'seconds': 总耗时, 'app_seconds': 应用自身记录的导入到就绪耗时}
+    """
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    url = f"http://127.0.0.1:{port}/api/health"
+
+    with tempfile.TemporaryDirectory(prefix='tara-startup-') as db_dir:
+        env = dict(os.environ, TARA_DB_PATH=os.path.join(db_dir, 'tara.db'))
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'tara_api.main:app', '--port', str(port), '--log-level', 'warning'],
+            cwd=package_root, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        seconds, health = _wait_until_ready(process, url, start, timeout)
+    return {'seconds': round(seconds, 3), 'app_seconds': health.get('startup_seconds')}
+
+
+def _wait_until_ready(process: subprocess.Popen, url: str, start: float, timeout: float) -> Tuple[float, Dict[str, Any]]:
+    """轮询健康检查直到服务就绪，返回 (耗时, 健康检查响应)；结束时终止服务进程"""
+    try:
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"服务进程已退出（返回码 {process.returncode}）")
+            if time.perf_counter() - start > timeout:
+                raise TimeoutError(f"服务在{timeout}秒内未就绪")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    health = json.loads(response.read())
+                break
+            except OSError:
+                time.sleep(0.01)
+        return time.perf_counter() - start, health
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def run_startup_benchmark(runs: int, max_seconds: Optional[float] = None) -> int:
+    """重复测量冷启动耗时并输出；中位数超过 max_seconds 时返回1"""
+    results = [measure_startup() for _ in range(runs)]
+    median = statistics.median(result['seconds'] for result in results)
+    print('run\tseconds\tapp(s)')
+    for i, result in enumerate(results, 1):
+        print(f"{i}\t{result['seconds']:.3f}\t{result['app_seconds']}")
+    print(f"median\t{median:.3f}")
+    if max_seconds is not None and median > max_seconds:
+        print(f"启动耗时超过上限 {max_seconds:.3f}s")
+        return 1
+    return 0
+
+
+# ==================== 报告数据内存占用 ====================
+def measure_payload_memory(sizes: List[int]) -> List[Dict[str, Any]]:
+    """按规模测量报告数据的JSON字节数和解析后的内存占用（tracemalloc）"""
+    from .json_backend import dumps, loads
+
+    results = []
+    for size in sizes:
+        raw = dumps(make_synthetic_report(size))
+        tracemalloc.start()
+        try:
+            data = loads(raw)
+            parsed_bytes = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+        del data
+        results.append({
+            'results_count': size,
+            'json_bytes': len(raw),
+            'parsed_bytes': parsed_bytes,
+            'factor': round(parsed_bytes / len(raw), 2)
+        })
+    return results
+
+
+def run_payload_memory_benchmark(sizes: List[int]) -> int:
+    """输出报告数据的内存占用比；超过 PARSED_SIZE_FACTOR 时返回1（缓存会超出配置的上限）"""
+    from .payloads import PARSED_SIZE_FACTOR
+
+    results = measure_payload_memory(sizes)
+    print('results\tjson(KB)\tparsed(KB)\tfactor')
+    for result in results:
+        print(f"{result['results_count']}\t{result['json_bytes'] / 1024:.1f}\t"
+              f"{result['parsed_bytes'] / 1024:.1f}\t{result['factor']:.2f}")
+    worst = max(result['factor'] for result in results)
+    print(f"PARSED_SIZE_FACTOR\t{PARSED_SIZE_FACTOR}")
+    if worst > PARSED_SIZE_FACTOR:
+        print(f"实测比值 {worst:.2f} 超过 PARSED_SIZE_FACTOR")
+        return 1
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='TARA PDF生成基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000], help='TARA结果条数列表')
+    parser.add_argument('--output-dir', default=None, help='PDF输出目录（默认临时目录，结束后删除）')
+    parser.add_argument('--keep', action='store_true', help='保留默认临时输出目录（用于查看生成的PDF）')
+    parser.add_argument('--images', action='store_true', help='在报告中包含测试图片')
+    parser.add_argument('--flowables', action='store_true', help='按Flowable类型统计布局耗时')
+    parser.add_argument('--font', choices=['cid', 'system'], default='cid',
+                        help='cid: 使用内置CID字体（离线可复现）; system: 查找系统中文字体')
+    parser.add_argument('--profile', default=None, help='PDF输出配置: standard, screen, print, draft')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    parser.add_argument('--startup', type=int, default=0, metavar='RUNS',
+                        help='测量API服务冷启动到首个健康检查响应的耗时（重复次数），不运行PDF基准测试')
+    parser.add_argument('--max-startup', type=float, default=None, metavar='SECONDS',
+                        help='冷启动耗时中位数上限，超过时返回非0（用于回归检查）')
+    parser.add_argument('--payload-memory', action='store_true',
+                        help='测量报告数据解析后的内存占用比，超过PARSED_SIZE_FACTOR时返回非0，不运行PDF基准测试')
+    args = parser.parse_args(argv)
+
+    if args.startup:
+        return run_startup_benchmark(args.startup, args.max_startup)
+    if args.payload_memory:
+        return run_payload_memory_benchmark(args.sizes)
+
+    # 字体在导入生成器时注册，必须在导入前设置
+    if args.font == 'cid':
+        os.environ['TARA_PDF_FONT'] = 'cid'
+
+    with ExitStack() as stack:
+        output_dir = args.output_dir
+        if output_dir is None:
+            if args.keep:
+                output_dir = tempfile.mkdtemp(prefix='tara-bench-')
+            else:
+                output_dir = stack.enter_context(tempfile.TemporaryDirectory(prefix='tara-bench-'))
+        # 输出JSON时生成器的日志（如字体注册信息）改到stderr，stdout只有JSON结果
+        with redirect_stdout(sys.stderr) if args.json else nullcontext():
+            results = run_benchmark(args.sizes, output_dir, args.images, args.flowables, args.profile)
+
+        if args.json:
+            json.dump(results, sys.stdout, ensure_ascii=False, indent=2)
+            print()
+        else:
+            print_report(results)
+            if args.output_dir or args.keep:
+                print(f"\n输出目录: {output_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
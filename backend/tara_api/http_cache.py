@@ -0,0 +1,85 @@
+"""
+HTTP条件请求
+报告生成后内容不再变化，响应带上强ETag和Last-Modified，
+客户端携带 If-None-Match / If-Modified-Since 重新请求时直接返回304，不再重复传输内容
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+
+# 报告详情/预览：内容包含会变化的PDF状态，每次使用前需向服务器确认
+REVALIDATE_CACHE_CONTROL = "private, no-cache"
+
+# 报告文件：同一报告ID的文件不会改变
+REPORT_FILE_CACHE_CONTROL = "private, max-age=86400"
+
+
+def make_etag(*parts: object) -> str:
+    """由内容标识（哈希、ID、版本等）生成强ETag"""
+    digest = hashlib.sha256('\0'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def to_http_date(value: datetime) -> str:
+    """格式化为HTTP日期（本地时间按本机时区转换为UTC）"""
+    if value.tzinfo is None:
+        value = value.astimezone()
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def cache_headers(
+    etag: str,
+    last_modified: Optional[datetime] = None,
+    cache_control: str = REVALIDATE_CACHE_CONTROL
+) -> Dict[str, str]:
+    """条件请求相关的响应头"""
+    headers = {'ETag': etag, 'Cache-Control': cache_control}
+    if last_modified is not None:
+        headers['Last-Modified'] = to_http_date(last_modified)
+    return headers
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match 比较（GET请求使用弱比较，忽略 W/ 前缀）"""
+    if if_none_match.strip() == '*':
+        return True
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """
+    客户端缓存是否仍然有效
+    同时携带两个请求头时以 If-None-Match 为准（RFC 9110）
+    """
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        modified = last_modified if last_modified.tzinfo else last_modified.astimezone()
+        # HTTP日期精确到秒
+        return modified.replace(microsecond=0) <= since
+    return False
+
+
+def not_modified(headers: Dict[str, str]) -> Response:
+    """304响应"""
+    return Response(status_code=304, headers=headers)
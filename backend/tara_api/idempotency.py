@@ -0,0 +1,63 @@
+"""
+幂等生成
+规范化后的报告数据（图片路径替换为图片内容哈希）与生成器版本共同组成输入哈希，
+重复提交相同内容或相同 Idempotency-Key 时直接返回已生成的报告，不再重新生成
+"""
+import hashlib
+from typing import Any, Dict, Optional
+
+from .json_backend import dumps
+from .json_stream import StreamedArray, streamed_sources
+from .pdf_cache import cache_key_payload
+
+
+# Idempotency-Key 请求头的最大长度
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+
+def _feed(digest: Any, obj: Any) -> None:
+    """将数据按键排序序列化后写入摘要；StreamedArray 逐项读取，不整体载入内存"""
+    if isinstance(obj, StreamedArray):
+        digest.update(b'[')
+        for i, item in enumerate(obj):
+            digest.update((b',' if i else b'') + dumps(item, sort_keys=True))
+        digest.update(b']')
+    elif isinstance(obj, dict) and streamed_sources(obj):
+        digest.update(b'{')
+        for i, key in enumerate(sorted(obj, key=str)):
+            digest.update((b',' if i else b'') + dumps(str(key)) + b':')
+            _feed(digest, obj[key])
+        digest.update(b'}')
+    else:
+        digest.update(dumps(obj, sort_keys=True))
+
+
+def compute_input_hash(report_data: Dict[str, Any], generator_fingerprint: str) -> str:
+    """计算报告输入哈希（report_data为规范化后的报告数据，图片按内容计入）"""
+    digest = hashlib.sha256()
+    digest.update(generator_fingerprint.encode('utf-8'))
+    digest.update(b'\0')
+    _feed(digest, cache_key_payload(report_data))
+    return digest.hexdigest()
+
+
+def input_key(input_hash: str) -> str:
+    """按输入内容复用报告的键"""
+    return f"input:{input_hash}"
+
+
+def client_key(idempotency_key: str) -> str:
+    """客户端 Idempotency-Key 对应的键"""
+    return f"client:{idempotency_key}"
+
+
+def parse_idempotency_key(value: Optional[str]) -> Optional[str]:
+    """校验 Idempotency-Key 请求头（可见ASCII字符，长度1-255），无效时抛出ValueError"""
+    if value is None:
+        return None
+    value = value.strip()
+    if not value or len(value) > MAX_IDEMPOTENCY_KEY_LENGTH:
+        raise ValueError(f"Idempotency-Key 长度应为1-{MAX_IDEMPOTENCY_KEY_LENGTH}个字符")
+    if not all(0x21 <= ord(char) <= 0x7E for char in value):
+        raise ValueError("Idempotency-Key 只能包含可见ASCII字符")
+    return value
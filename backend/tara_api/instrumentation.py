@@ -0,0 +1,66 @@
+"""
+报告生成过程的阶段计时
+生成器在各阶段外层使用 phase(name)，注册的监听器接收 (阶段名, 开始时间, 结束时间)。
+没有监听器时不做任何计时，对正常生成没有额外开销。
+工作进程中记录的阶段由任务管理器带回服务进程，通过 emit() 交给服务进程中的监听器。
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, List, Tuple, Iterator
+
+# 监听器签名: (阶段名, 开始时间, 结束时间)，时间取自 time.perf_counter()
+PhaseListener = Callable[[str, float, float], None]
+
+# 进程级监听器（如全局指标）
+_global_listeners: List[PhaseListener] = []
+
+# 当前上下文的监听器（如基准测试、单次请求的追踪）
+_scoped_listeners: ContextVar[Tuple[PhaseListener, ...]] = ContextVar('tara_phase_listeners', default=())
+
+
+def add_listener(listener: PhaseListener) -> None:
+    """注册进程级监听器"""
+    if listener not in _global_listeners:
+        _global_listeners.append(listener)
+
+
+def remove_listener(listener: PhaseListener) -> None:
+    """移除进程级监听器"""
+    if listener in _global_listeners:
+        _global_listeners.remove(listener)
+
+
+@contextmanager
+def listening(listener: PhaseListener) -> Iterator[None]:
+    """在当前上下文中临时注册监听器"""
+    token = _scoped_listeners.set(_scoped_listeners.get() + (listener,))
+    try:
+        yield
+    finally:
+        _scoped_listeners.reset(token)
+
+
+def is_listening() -> bool:
+    """当前上下文是否有监听器"""
+    return bool(_global_listeners or _scoped_listeners.get())
+
+
+def emit(name: str, start: float, end: float) -> None:
+    """将已测得的阶段（如工作进程中记录的阶段）交给当前上下文的监听器"""
+    for listener in (*_global_listeners, *_scoped_listeners.get()):
+        listener(name, start, end)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """记录一个生成阶段的耗时"""
+    if not is_listening():
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        emit(name, start, time.perf_counter())
@@ -0,0 +1,361 @@
+"""
+报告生成任务管理
+CPU密集的报告渲染（Excel/PDF）在有界进程池中执行，不阻塞事件循环；
+耗时请求可作为异步任务提交，立即返回任务ID，客户端轮询或等待任务状态。
+多进程部署时任务状态同时写入共享的任务存储，其他服务进程也能查询和取消任务。
+"""
+import os
+import time
+import uuid
+import asyncio
+import multiprocessing
+from collections import OrderedDict
+from contextvars import ContextVar
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from functools import partial
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Set, Tuple
+
+from .instrumentation import emit, is_listening, listening
+
+
+# 查询其他服务进程的任务时，轮询共享存储的间隔（秒）
+REMOTE_POLL_INTERVAL = 0.5
+
+# 已结束的任务状态
+FINISHED_STATUSES = ('succeeded', 'failed', 'cancelled')
+
+# 当前上下文所属的异步任务：任务运行期间已占用并发名额，其中调用的 run() 不再重复占用
+_current_job: ContextVar[Optional['Job']] = ContextVar('tara_current_job', default=None)
+
+
+class JobQueueFullError(Exception):
+    """排队任务数超过上限"""
+
+
+class JobManagerClosedError(Exception):
+    """服务正在关闭，不再接受新任务"""
+
+
+def _run_with_phases(func: Callable, args: tuple, kwargs: Dict[str, Any]) -> Tuple[Any, List[Tuple[str, float, float]], float]:
+    """
+    在工作进程中执行函数并记录其中的生成阶段
+    返回: (结果, [(阶段名, 相对开始时间, 相对结束时间)], 总耗时)，时间以调用开始为0
+    """
+    phases: List[Tuple[str, float, float]] = []
+    start = time.perf_counter()
+
+    def record(name: str, phase_start: float, phase_end: float) -> None:
+        phases.append((name, phase_start - start, phase_end - start))
+
+    with listening(record):
+        result = func(*args, **kwargs)
+    return result, phases, time.perf_counter() - start
+
+
+def _report_worker_pid(queue: Any) -> None:
+    """工作进程启动时上报PID"""
+    queue.put(os.getpid())
+
+
+def _process_exists(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+
+class Job:
+    """异步任务记录"""
+
+    def __init__(self, job_id: str, kind: str, metadata: Optional[Dict[str, Any]] = None):
+        self.id = job_id
+        self.kind = kind
+        self.metadata = metadata or {}
+        self.status = 'queued'  # queued / running / succeeded / failed / cancelled
+        self.created_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'metadata': self.metadata,
+            'result': self.result,
+            'error': self.error
+        }
+
+
+class JobManager:
+    """
+    进程池与异步任务管理
+
+    - run(): 在进程池中执行函数并等待结果（同步接口使用）；
+      不在异步任务中调用时同样计入排队数（超出上限抛出 JobQueueFullError）并等待并发名额
+    - submit(): 提交异步任务，立即返回任务记录
+    - cancel(): 取消任务（排队中的任务不会执行；运行中的任务结果将被丢弃）
+    - shutdown(): 取消排队任务，等待运行中的任务完成后关闭进程池
+
+    运行中的工作进程无法被中断，取消只是丢弃其结果：run() 被取消时先等待工作进程执行完，
+    再向调用方抛出 CancelledError，调用方可以安全地清理输出文件，任务的并发名额也在此之后才释放。
+    提供 store（save_job / get_job / request_job_cancel / is_job_cancel_requested / prune_jobs）时，
+    任务状态在每次变化时写入 store：describe() 和 request_cancel() 可以处理其他服务进程提交的任务，
+    其他进程的取消请求在任务开始运行前和结束时生效。
+    """
+
+    def __init__(self, max_workers: int, max_pending: int = 100, max_finished: int = 1000, store: Any = None):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        self.store = store
+        self.jobs: 'OrderedDict[str, Job]' = OrderedDict()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pid_queue: Any = None
+        self._worker_pids: Set[int] = set()
+        self._closing = False
+        # 同时运行的任务（异步任务和同步接口的 run() 调用）不超过进程数，其余保持排队状态
+        self._slots = asyncio.Semaphore(max_workers)
+        # 排队和运行中的同步 run() 调用数
+        self._direct_calls = 0
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: 避免在已有线程的服务进程中fork
+            context = multiprocessing.get_context('spawn')
+            self._pid_queue = context.SimpleQueue()
+            self._worker_pids = set()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=context,
+                initializer=_report_worker_pid,
+                initargs=(self._pid_queue,)
+            )
+        return self._executor
+
+    def start(self) -> None:
+        """服务启动时调用"""
+        self._closing = False
+        self._slots = asyncio.Semaphore(self.max_workers)
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        在进程池中执行函数（函数和参数需可序列化）
+        函数中记录的生成阶段带回本进程，按结束时间对齐后交给当前上下文的阶段监听器
+        被取消时，已开始执行的函数无法中断，等其结束后再抛出 CancelledError
+        异步任务之外的调用与异步任务共用排队上限和并发名额，进程池的队列不会无限增长
+        """
+        if self._closing:
+            raise JobManagerClosedError("服务正在关闭")
+        job = _current_job.get()
+        if job is not None and job.status == 'running':
+            return await self._run_in_pool(func, args, kwargs)
+
+        if self.pending_count >= self.max_pending:
+            raise JobQueueFullError(f"排队任务数已达上限({self.max_pending})")
+        self._direct_calls += 1
+        try:
+            async with self._slots:
+                return await self._run_in_pool(func, args, kwargs)
+        finally:
+            self._direct_calls -= 1
+
+    async def _run_in_pool(self, func: Callable, args: tuple, kwargs: Dict[str, Any]) -> Any:
+        executor = self.executor
+        submitted: Optional[Future] = None
+        try:
+            submitted = executor.submit(_run_with_phases, func, args, kwargs)
+            future = asyncio.wrap_future(submitted)
+            result, phases, elapsed = await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if submitted is not None and not submitted.cancel():
+                # 已在工作进程中执行：等待执行结束（结果丢弃）
+                await asyncio.wait({future})
+            raise
+        except BrokenProcessPool:
+            # 工作进程异常退出（如内存不足被终止）后进程池不可再用，下次调用时重建
+            if self._executor is executor:
+                self._executor = None
+            raise
+
+        if phases and is_listening():
+            base = time.perf_counter() - elapsed
+            for name, phase_start, phase_end in phases:
+                emit(name, base + phase_start, base + phase_end)
+        return result
+
+    def worker_pids(self) -> List[int]:
+        """
+        当前工作进程的PID（仅用于内存指标）
+        ProcessPoolExecutor 不公开其工作进程，由各工作进程启动时上报PID（进程池按需启动进程，未启动的不在其中）
+        """
+        if self._executor is None:
+            return []
+        while not self._pid_queue.empty():
+            self._worker_pids.add(self._pid_queue.get())
+        return sorted(pid for pid in self._worker_pids if _process_exists(pid))
+
+    @property
+    def pending_count(self) -> int:
+        """排队和运行中的异步任务及同步调用数"""
+        return sum(1 for job in self.jobs.values() if not job.done) + self._direct_calls
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def submit(self, kind: str, work: Callable[[], Awaitable[Any]],
+               metadata: Optional[Dict[str, Any]] = None) -> Job:
+        """
+        提交异步任务
+        work 为无参协程函数，其返回值（可JSON序列化）作为任务结果
+        """
+        if self._closing:
+            raise JobManagerClosedError("服务正在关闭")
+        if self.pending_count >= self.max_pending:
+            raise JobQueueFullError(f"排队任务数已达上限({self.max_pending})")
+
+        job = Job(f"JOB-{uuid.uuid4().hex[:12].upper()}", kind, metadata)
+        self.jobs[job.id] = job
+        self._save(job)
+        job.task = asyncio.create_task(self._run_job(job, work))
+        self._prune()
+        return job
+
+    async def _run_job(self, job: Job, work: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            async with self._slots:
+                if self._cancel_requested(job):
+                    raise asyncio.CancelledError
+                job.status = 'running'
+                _current_job.set(job)
+                job.started_at = datetime.now()
+                self._save(job)
+                result = await work()
+        except asyncio.CancelledError:
+            job.status = 'cancelled'
+        except Exception as e:
+            job.status = 'failed'
+            job.error = getattr(e, 'detail', None) or str(e)
+        else:
+            if job.status != 'cancelled' and self._cancel_requested(job):
+                job.status = 'cancelled'
+            if job.status != 'cancelled':
+                job.status = 'succeeded'
+                job.result = result
+        finally:
+            job.finished_at = datetime.now()
+            self._save(job)
+
+    def _save(self, job: Job) -> None:
+        """将任务状态写入共享存储（写入失败不影响任务本身）"""
+        if self.store is None:
+            return
+        try:
+            self.store.save_job(job.to_dict())
+        except Exception as e:
+            print(f"Failed to save job {job.id}: {e}")
+
+    def _cancel_requested(self, job: Job) -> bool:
+        """其他服务进程是否请求取消该任务"""
+        if self.store is None:
+            return False
+        try:
+            return self.store.is_job_cancel_requested(job.id)
+        except Exception:
+            return False
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Job]:
+        """等待任务完成，最多等待timeout秒"""
+        job = self.jobs.get(job_id)
+        if job and not job.done and job.task and timeout > 0:
+            await asyncio.wait({job.task}, timeout=timeout)
+        return job
+
+    async def describe(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        任务状态，最多等待timeout秒至任务完成
+        不是本进程提交的任务从共享存储查询（等待时定期轮询）；不存在返回None
+        """
+        if job_id in self.jobs:
+            job = await self.wait(job_id, timeout)
+            return job.to_dict()
+        if self.store is None:
+            return None
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            record = await asyncio.to_thread(self.store.get_job, job_id)
+            remaining = deadline - loop.time()
+            if record is None or record['status'] in FINISHED_STATUSES or remaining <= 0:
+                return record
+            await asyncio.sleep(min(REMOTE_POLL_INTERVAL, remaining))
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """取消任务"""
+        job = self.jobs.get(job_id)
+        if job and not job.done and job.task:
+            job.status = 'cancelled'
+            job.task.cancel()
+        return job
+
+    def request_cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        取消任务，返回取消前的任务状态；不存在返回None
+        其他服务进程的任务只记录取消请求，由所属进程处理
+        """
+        job = self.jobs.get(job_id)
+        if job is not None:
+            state = job.to_dict()
+            self.cancel(job_id)
+            return state
+        if self.store is None:
+            return None
+        return self.store.request_job_cancel(job_id)
+
+    def _prune(self) -> None:
+        """只保留最近的已完成任务记录"""
+        finished = [job_id for job_id, job in self.jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self.jobs[job_id]
+        if self.store is not None:
+            try:
+                self.store.prune_jobs(self.max_finished)
+            except Exception as e:
+                print(f"Failed to prune jobs: {e}")
+
+    async def shutdown(self) -> None:
+        """停止接受新任务，取消排队中的工作，等待运行中的任务完成"""
+        self._closing = True
+        for job in self.jobs.values():
+            if job.status == 'queued' and job.task:
+                job.status = 'cancelled'
+                job.task.cancel()
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, partial(executor.shutdown, wait=True, cancel_futures=True))
+        tasks = [job.task for job in self.jobs.values() if job.task and not job.task.done()]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def default_worker_count() -> int:
+    """默认进程数：CPU核数，最多4个"""
+    return int(os.environ.get('TARA_JOB_WORKERS', min(4, os.cpu_count() or 1)))
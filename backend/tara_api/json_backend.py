@@ -0,0 +1,49 @@
+"""
+JSON解析与序列化
+安装了orjson时使用orjson（直接解析bytes，序列化速度快数倍），否则使用标准库json。
+可通过环境变量 TARA_JSON_BACKEND=json 强制使用标准库。
+"""
+import os
+import json
+from typing import Any, Union
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
+if os.environ.get('TARA_JSON_BACKEND', '').lower() == 'json':
+    orjson = None
+
+# 当前使用的JSON后端
+JSON_BACKEND = 'orjson' if orjson is not None else 'json'
+
+# orjson.JSONDecodeError 是 json.JSONDecodeError 的子类，调用方统一捕获 json.JSONDecodeError
+JSONDecodeError = json.JSONDecodeError
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    """解析JSON（bytes按UTF-8解码）"""
+    if orjson is not None:
+        return orjson.loads(data)
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = bytes(data).decode('utf-8')
+    return json.loads(data)
+
+
+def dumps(obj: Any, sort_keys: bool = False) -> bytes:
+    """序列化为紧凑的UTF-8 JSON，无法序列化的对象转为字符串；sort_keys 用于生成与键顺序无关的内容哈希"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_SORT_KEYS if sort_keys else None)
+    return json.dumps(
+        obj, ensure_ascii=False, separators=(',', ':'), default=str, sort_keys=sort_keys
+    ).encode('utf-8')
+
+
+class FastJSONResponse(JSONResponse):
+    """使用当前JSON后端序列化的响应"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,324 @@
+"""
+大型JSON文档的增量解析
+资产列表和TARA结果这类大数组不整体载入内存：解析时逐项读取、校验后即丢弃，
+只记录数组在文件中的位置和条目数，使用时再从文件逐项读取。
+其余较小的部分照常解析为dict/list，解析过程中的内存占用取决于最大的单个条目而不是整个文档。
+"""
+import json
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterator, Optional, Set, Tuple
+
+from .json_backend import dumps, loads
+
+
+# 每次从文件读取的字节数
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# 报告中按流式读取的数组（路径）
+REPORT_STREAM_PATHS: Tuple[Tuple[str, ...], ...] = (
+    ('assets', 'assets'),
+    ('tara_results', 'results'),
+)
+
+_WHITESPACE = b' \t\r\n'
+_SKIP_WHITESPACE = re.compile(rb'[ \t\r\n]*')
+# 字符串和括号之间的内容按"普通字符* (转义 普通字符*)*"展开书写，各部分互斥，不会回溯爆炸
+# （不使用3.11才支持的占有量词）
+_STRING = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_CONTAINER_CONTENT = re.compile(rb'[^"\[\]{}]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"\[\]{}]*)*', re.DOTALL)
+_SCALAR_END = re.compile(rb'[,\]}\s]')
+
+
+class StreamedJSONError(json.JSONDecodeError):
+    """增量解析时的格式错误（位置为字节偏移）"""
+
+    def __init__(self, msg: str, offset: int):
+        ValueError.__init__(self, f"{msg}（字节偏移 {offset}）")
+        self.msg = msg
+        self.doc = ''
+        self.pos = offset
+        self.lineno = None
+        self.colno = None
+
+    def __reduce__(self):
+        return self.__class__, (self.msg, self.pos)
+
+
+class _Reader:
+    """按块读取文件的缓冲区，扫描位置为缓冲区内的下标"""
+
+    def __init__(self, f: BinaryIO, offset: int = 0, chunk_size: int = STREAM_CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = b''
+        self.pos = 0
+        self.base = offset
+        self.eof = False
+
+    @property
+    def offset(self) -> int:
+        """当前位置在文件中的字节偏移"""
+        return self.base + self.pos
+
+    def fill(self) -> bool:
+        """追加读取一块数据，文件已读完返回False"""
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf += chunk
+        return True
+
+    def release(self) -> None:
+        """丢弃当前位置之前的数据（累计超过一块或已全部读完时才整理缓冲区，避免逐项复制）"""
+        if self.pos >= self.chunk_size or (self.pos and self.pos == len(self.buf)):
+            self.base += self.pos
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+
+    def error(self, msg: str, pos: Optional[int] = None) -> StreamedJSONError:
+        return StreamedJSONError(msg, self.base + (self.pos if pos is None else pos))
+
+    def peek(self) -> int:
+        """跳过空白并返回下一个字节，文件结束时抛出格式错误"""
+        while True:
+            self.pos = _SKIP_WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            self.release()
+            if not self.fill():
+                raise self.error("JSON数据不完整")
+
+    def expect(self, char: bytes) -> None:
+        if self.peek() != char[0]:
+            raise self.error(f"此处应为 {char.decode()}")
+        self.pos += 1
+
+    def skip_string(self, start: int) -> int:
+        """start为开头引号的位置，返回字符串结束后的位置"""
+        while True:
+            match = _STRING.match(self.buf, start)
+            if match:
+                return match.end()
+            if not self.fill():
+                raise self.error("JSON数据不完整", start)
+
+    def skip_value(self) -> int:
+        """从当前位置跳过一个JSON值（不解析），返回值结束的位置"""
+        first = self.peek()
+        start = self.pos
+        if first == 0x22:  # "
+            return self.skip_string(start)
+        if first not in b'[{':
+            # 数字、true/false/null：到分隔符或文档结尾为止
+            pos = start
+            while True:
+                match = _SCALAR_END.search(self.buf, pos)
+                if match:
+                    return match.start()
+                pos = len(self.buf)
+                if not self.fill():
+                    return pos
+
+        # 一次匹配跳过括号之间的所有内容（含字符串），只在括号处计数
+        depth = 0
+        pos = start
+        while True:
+            pos = _CONTAINER_CONTENT.match(self.buf, pos).end()
+            if pos == len(self.buf) or self.buf[pos] == 0x22:
+                # 缓冲区结束或字符串未读完整
+                if not self.fill():
+                    raise self.error("JSON数据不完整", pos)
+                continue
+            if self.buf[pos] in b'[{':
+                depth += 1
+            else:
+                depth -= 1
+            pos += 1
+            if depth == 0:
+                return pos
+
+    def read_value(self) -> Any:
+        """解析当前位置的一个JSON值"""
+        self.peek()
+        start = self.pos
+        end = self.skip_value()
+        try:
+            value = loads(self.buf[start:end])
+        except json.JSONDecodeError as e:
+            raise self.error(f"JSON格式错误: {e.msg}", start + e.pos)
+        self.pos = end
+        return value
+
+
+@dataclass(frozen=True)
+class StreamedArray:
+    """
+    保存在文件中的JSON数组（只读）
+    可多次迭代，每次迭代时从文件逐项解析；只保存文件位置，可传给工作进程使用。
+    item_loader 不为空时，每项解析后经其转换（如校验和补全默认值）再返回
+    """
+    path: str
+    start: int
+    end: int
+    count: int
+    item_loader: Optional[Callable[[Any], Any]] = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __bool__(self) -> bool:
+        return self.count > 0
+
+    def __iter__(self) -> Iterator[Any]:
+        with open(self.path, 'rb') as f:
+            f.seek(self.start)
+            reader = _Reader(f, self.start)
+            reader.expect(b'[')
+            if reader.peek() == 0x5D:  # ]
+                return
+            loader = self.item_loader
+            while True:
+                item = reader.read_value()
+                yield loader(item) if loader else item
+                reader.release()
+                if reader.peek() == 0x5D:
+                    return
+                reader.expect(b',')
+
+    def write_raw(self, f: BinaryIO, chunk_size: int = STREAM_CHUNK_SIZE) -> int:
+        """将数组原文写入f，返回写入的字节数"""
+        with open(self.path, 'rb') as src:
+            src.seek(self.start)
+            remaining = self.end - self.start
+            while remaining > 0:
+                chunk = src.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                f.write(chunk)
+                remaining -= len(chunk)
+        return self.end - self.start
+
+
+def _scan_array(reader: _Reader, path: str, name: str) -> StreamedArray:
+    """逐项读取并校验数组（每项须为对象），只保留位置和条目数"""
+    reader.peek()
+    start = reader.offset
+    reader.expect(b'[')
+    count = 0
+    if reader.peek() == 0x5D:
+        reader.pos += 1
+        return StreamedArray(path, start, reader.offset, 0)
+
+    while True:
+        reader.peek()
+        item_start = reader.pos
+        item = reader.read_value()
+        if not isinstance(item, dict):
+            raise reader.error(f"{name} 第{count + 1}项应为对象", item_start)
+        count += 1
+        del item
+        reader.release()
+        if reader.peek() == 0x5D:
+            reader.pos += 1
+            return StreamedArray(path, start, reader.offset, count)
+        reader.expect(b',')
+
+
+def _parse_object(
+    reader: _Reader,
+    path: str,
+    location: Tuple[str, ...],
+    stream_paths: Tuple[Tuple[str, ...], ...]
+) -> Dict[str, Any]:
+    """解析对象，stream_paths 指定的数组按流式读取"""
+    result: Dict[str, Any] = {}
+    reader.expect(b'{')
+    if reader.peek() == 0x7D:  # }
+        reader.pos += 1
+        return result
+
+    while True:
+        if reader.peek() != 0x22:
+            raise reader.error("对象的键应为字符串")
+        key = reader.read_value()
+        reader.expect(b':')
+
+        child = location + (key,)
+        token = reader.peek()
+        if child in stream_paths and token == 0x5B:  # [
+            result[key] = _scan_array(reader, path, '.'.join(child))
+        elif token == 0x7B and any(p[:len(child)] == child for p in stream_paths):
+            result[key] = _parse_object(reader, path, child, stream_paths)
+        else:
+            result[key] = reader.read_value()
+        reader.release()
+
+        if reader.peek() == 0x7D:
+            reader.pos += 1
+            return result
+        reader.expect(b',')
+
+
+def load_streaming(
+    path: Path,
+    stream_paths: Tuple[Tuple[str, ...], ...] = REPORT_STREAM_PATHS,
+    chunk_size: int = STREAM_CHUNK_SIZE
+) -> Any:
+    """
+    增量解析JSON文件
+    stream_paths 指定的数组返回 StreamedArray，其内容仍从该文件读取，使用完之前不能删除文件；
+    顶层不是对象时按普通方式解析
+    """
+    with open(path, 'rb') as f:
+        reader = _Reader(f, 0, chunk_size)
+        if reader.peek() == 0x7B:
+            data = _parse_object(reader, str(path), (), stream_paths)
+        else:
+            data = reader.read_value()
+        # 值之后只允许有空白
+        while True:
+            if reader.buf[reader.pos:].strip(_WHITESPACE):
+                raise reader.error("JSON数据后有多余内容")
+            reader.pos = len(reader.buf)
+            reader.release()
+            if not reader.fill():
+                break
+    return data
+
+
+def streamed_sources(obj: Any) -> Set[str]:
+    """数据中 StreamedArray 引用的文件（StreamedArray只出现在对象的值中，不查找数组内部）"""
+    if isinstance(obj, StreamedArray):
+        return {obj.path}
+    sources: Set[str] = set()
+    if isinstance(obj, dict):
+        for value in obj.values():
+            if isinstance(value, (dict, StreamedArray)):
+                sources |= streamed_sources(value)
+    return sources
+
+
+def write_json(f: BinaryIO, obj: Any) -> int:
+    """
+    序列化为JSON写入f，返回写入的字节数
+    StreamedArray 逐项写入（设置了 item_loader 时写入转换后的条目，否则直接复制原文）
+    """
+    if isinstance(obj, StreamedArray):
+        if obj.item_loader is None:
+            return obj.write_raw(f)
+        size = f.write(b'[')
+        for i, item in enumerate(obj):
+            size += f.write((b',' if i else b'') + dumps(item))
+        return size + f.write(b']')
+    if isinstance(obj, dict) and streamed_sources(obj):
+        size = f.write(b'{')
+        for i, (key, value) in enumerate(obj.items()):
+            size += f.write((b',' if i else b'') + dumps(str(key)) + b':')
+            size += write_json(f, value)
+        return size + f.write(b'}')
+    return f.write(dumps(obj))
@@ -3,34 +3,109 @@ TARA报告生成API服务
 提供TARA Excel报告的生成、预览和下载功能
 """
 import os
+import hmac
 import json
+import time
 import uuid
 import shutil
-import aiofiles
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
 from datetime import datetime
-from typing import Optional, Dict, Any, List
+from functools import partial
+from typing import Optional, Dict, Any, List, Callable, Awaitable, Tuple, Iterator, AsyncIterator
 from pathlib import Path
+from urllib.parse import quote
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form, BackgroundTasks
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Query, Header, Request, BackgroundTasks, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, Response, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
+from pydantic import ValidationError
 
 from .models import (
     TARAReportData,
+    AttackTree,
+    ReportDict,
+    ReportDataError,
+    normalize_report_data,
+    section_title,
     GenerateReportResponse,
     ReportInfo,
     ReportListResponse,
     ImageUploadResponse
 )
-from .tara_excel_generator import generate_tara_excel_from_json
-from .tara_pdf_generator import generate_tara_pdf_from_json
+from .renderers import excel_generator, pdf_generator, render_excel, render_pdf, warm_up, is_loaded
+from .pdf_profiles import get_pdf_profile, DEFAULT_PDF_PROFILE, PDF_PROFILES
+from .pdf_cache import PDFCache, PDFRenderCoordinator, compute_pdf_cache_key
+from .jobs import JobManager, JobQueueFullError, JobManagerClosedError, default_worker_count
+from .storage import MetadataStore
+from .payloads import PayloadStore
+from .json_backend import FastJSONResponse, loads as json_loads
+from .json_stream import StreamedArray, load_streaming, streamed_sources
+from .batches import (
+    BatchArchiveError,
+    list_zip_documents,
+    read_zip_document,
+    archive_member_name,
+    build_batch_archive
+)
+from .idempotency import compute_input_hash, input_key, client_key, parse_idempotency_key
+from .preview import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    parse_fields,
+    decode_offset_cursor,
+    project,
+    paginate_lists
+)
+from .http_cache import (
+    make_etag,
+    cache_headers,
+    is_not_modified,
+    not_modified,
+    REPORT_FILE_CACHE_CONTROL
+)
+from .uploads import SpooledUpload, UploadTooLargeError, spool_upload, sniff_image_type, commit_upload
+from .instrumentation import add_listener, listening, phase
+from .tracing import TraceRecorder, chrome_trace
+from .profiling import (
+    PROFILING_MODES,
+    run_profiled,
+    artifact_name,
+    list_artifacts,
+    find_artifact,
+    delete_artifacts,
+    format_pstats
+)
+from . import metrics
+from . import _import_started
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    应用生命周期：启动后在后台预热报告生成器；
+    关闭时取消排队中的任务，等待运行中的报告生成完成
+    """
+    job_manager.start()
+    app.state.startup_seconds = round(time.perf_counter() - _import_started, 3)
+    print(f"TARA API ready in {app.state.startup_seconds:.3f}s")
+    if RENDERER_WARMUP:
+        task = asyncio.create_task(warm_up_renderers())
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+    yield
+    await job_manager.shutdown()
+    metadata_store.close()
+
 
 # 创建FastAPI应用
 app = FastAPI(
     title="TARA Report Generator API",
     description="威胁分析和风险评估报告生成服务",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # CORS配置
@@ -42,22 +117,123 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 请求指标（按路由统计请求数和耗时），通过 /metrics 输出
+app.add_middleware(metrics.MetricsMiddleware)
+
 # 存储目录配置
 BASE_DIR = Path(__file__).parent.parent
-UPLOAD_DIR = BASE_DIR / "uploads"
-REPORTS_DIR = BASE_DIR / "reports"
+# 上传文件和生成的报告所在目录（多进程部署时各服务进程需指向同一目录）
+DATA_DIR = Path(os.environ.get('TARA_DATA_DIR', BASE_DIR))
+UPLOAD_DIR = DATA_DIR / "uploads"
+REPORTS_DIR = DATA_DIR / "reports"
 IMAGES_DIR = UPLOAD_DIR / "images"
+UPLOAD_TMP_DIR = UPLOAD_DIR / "tmp"
+PDF_CACHE_DIR = REPORTS_DIR / "pdf_cache"
+PAYLOAD_DIR = REPORTS_DIR / "payloads"
+BATCH_DIR = REPORTS_DIR / "batches"
+PROFILES_DIR = REPORTS_DIR / "profiles"
+
+# 支持的图片格式
+ALLOWED_IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif', '.bmp', '.svg'}
+
+# 图片ID由内容决定，同一ID的内容永不改变，可被客户端长期缓存
+IMAGE_CACHE_CONTROL = "public, max-age=31536000, immutable"
 
 # 确保目录存在
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 REPORTS_DIR.mkdir(parents=True, exist_ok=True)
 IMAGES_DIR.mkdir(parents=True, exist_ok=True)
+UPLOAD_TMP_DIR.mkdir(parents=True, exist_ok=True)
+
+# 上传文件大小限制（MB）
+MAX_IMAGE_SIZE = int(os.environ.get('TARA_MAX_IMAGE_MB', '20')) * 1024 * 1024
+MAX_JSON_SIZE = int(os.environ.get('TARA_MAX_JSON_MB', '100')) * 1024 * 1024
+
+# 超过该大小（MB）的JSON文件增量解析：资产列表和TARA结果逐项读取，不整体载入内存
+STREAM_JSON_SIZE = int(os.environ.get('TARA_STREAM_JSON_MB', '16')) * 1024 * 1024
+
+# 报告数据校验失败时最多返回的错误条数
+MAX_VALIDATION_ERRORS = 50
+
+# 批量上传时同时处理的图片数
+BATCH_IMAGE_CONCURRENCY = int(os.environ.get('TARA_BATCH_IMAGE_CONCURRENCY', '8'))
+
+# 批量生成一次最多提交的报告数
+MAX_BATCH_REPORTS = int(os.environ.get('TARA_BATCH_MAX_REPORTS', '100'))
+
+# 报告与图片元数据（SQLite）
+DB_PATH = Path(os.environ.get('TARA_DB_PATH', BASE_DIR / "tara.db"))
+metadata_store = MetadataStore(DB_PATH)
+
+# 报告原始数据压缩存储在磁盘上，内存中只缓存最近使用的报告（MB）
+PAYLOAD_CACHE_SIZE = int(os.environ.get('TARA_PAYLOAD_CACHE_MB', '256')) * 1024 * 1024
+payload_store = PayloadStore(PAYLOAD_DIR, PAYLOAD_CACHE_SIZE)
+
+# PDF内容寻址缓存，总大小上限（MB，0为不限制），超出时淘汰最久未使用的PDF
+PDF_CACHE_SIZE = int(os.environ.get('TARA_PDF_CACHE_MB', '2048')) * 1024 * 1024
+pdf_cache = PDFCache(PDF_CACHE_DIR, PDF_CACHE_SIZE)
+
+# 报告生成（Excel/PDF）在有界进程池中执行，不阻塞事件循环
+JOB_WORKERS = default_worker_count()
+JOB_QUEUE_LIMIT = int(os.environ.get('TARA_JOB_QUEUE_LIMIT', '100'))
+# 任务状态写入数据库，多进程部署时任一服务进程都能查询和取消任务
+job_manager = JobManager(max_workers=JOB_WORKERS, max_pending=JOB_QUEUE_LIMIT, store=metadata_store)
+
+# 生成阶段耗时（包括工作进程中记录的阶段）计入 /metrics
+add_listener(metrics.observe_phase)
+
+
+def collect_process_metrics() -> None:
+    """输出指标前读取任务队列长度和进程内存"""
+    metrics.jobs_pending.set(job_manager.pending_count)
+    rss = metrics.resident_memory_bytes()
+    if rss is not None:
+        metrics.process_resident_memory_bytes.set(rss)
+    worker_rss = [metrics.resident_memory_bytes(pid) for pid in job_manager.worker_pids()]
+    metrics.worker_resident_memory_bytes.set(sum(r for r in worker_rss if r))
+
+
+metrics.registry.add_collector(collect_process_metrics)
+
+
+async def run_pdf_render(func: Callable, *args: Any) -> Path:
+    """在工作进程中渲染PDF，记录生成耗时和文件大小"""
+    with phase('render.pdf'):
+        path = await metrics.track_generation('pdf', job_manager.run, func, *args)
+    metrics.observe_output('pdf', path)
+    return path
 
-# 内存中的报告存储（生产环境应使用数据库）
-reports_db: Dict[str, Dict[str, Any]] = {}
 
-# 图片存储映射
-images_db: Dict[str, Dict[str, str]] = {}
+# PDF渲染同一内容同时只渲染一次
+pdf_renderer = PDFRenderCoordinator(pdf_cache, run_pdf_render)
+
+# 报告文件下载交给前置Web服务器发送: x-accel-redirect (Nginx) / x-sendfile (Apache, lighttpd)
+FILE_OFFLOAD = os.environ.get('TARA_FILE_OFFLOAD', '').lower()
+# X-Accel-Redirect 的内部路径前缀，对应 reports 目录（Nginx中配置为internal location）
+ACCEL_REDIRECT_PREFIX = os.environ.get('TARA_ACCEL_REDIRECT_PREFIX', '/_protected/reports/')
+
+# 报告生成后是否在后台预渲染PDF（可被请求参数覆盖）
+PDF_PRERENDER = os.environ.get('TARA_PDF_PRERENDER', '').lower() in ('1', 'true', 'yes')
+
+# 启动后是否在后台导入报告生成器并启动工作进程（关闭后在第一次生成报告时导入）
+RENDERER_WARMUP = os.environ.get('TARA_RENDERER_WARMUP', 'true').lower() in ('1', 'true', 'yes')
+
+# 是否默认按输入内容复用已生成的报告（可被请求参数覆盖）
+REPORT_REUSE = os.environ.get('TARA_REPORT_REUSE', '').lower() in ('1', 'true', 'yes')
+
+# 性能分析的管理令牌（请求头 X-Profiling-Token），未设置时不接受性能分析请求
+PROFILING_TOKEN = os.environ.get('TARA_PROFILING_TOKEN', '')
+
+# 是否记录报告生成的时间线（可导出为Chrome trace-event格式）
+TRACE_ENABLED = os.environ.get('TARA_TRACE', 'true').lower() in ('1', 'true', 'yes')
+# 每个报告保留的时间线条数（每次生成或PDF渲染一条）
+MAX_TRACES_PER_REPORT = int(os.environ.get('TARA_TRACE_KEEP', '20'))
+
+# 后台任务引用，避免任务在完成前被回收
+_background_tasks: set = set()
+
+# 进行中的幂等生成: 幂等键 -> (输入哈希, 完成后为报告ID的Future，失败时为None)
+_inflight_generations: Dict[str, Tuple[str, asyncio.Future]] = {}
 
 
 # ==================== 辅助函数 ====================
@@ -66,20 +242,125 @@ def generate_report_id() -> str:
     return f"RPT-{datetime.now().strftime('%Y%m%d')}-{uuid.uuid4().hex[:8].upper()}"
 
 
-def generate_image_id() -> str:
-    """生成图片ID"""
-    return f"IMG-{uuid.uuid4().hex[:12]}"
+def generate_batch_id() -> str:
+    """生成批量生成ID"""
+    return f"BATCH-{datetime.now().strftime('%Y%m%d')}-{uuid.uuid4().hex[:8].upper()}"
+
+
+def image_id_for_hash(sha256: str) -> str:
+    """由内容哈希生成图片ID（相同内容的图片共用同一ID）"""
+    return f"IMG-{sha256[:16]}"
+
+
+async def receive_image(upload: UploadFile) -> SpooledUpload:
+    """
+    接收上传的图片：分块写入临时文件，同时计算哈希并按文件头识别格式
+    超过大小限制返回413，内容不是支持的图片格式返回400
+    """
+    try:
+        spooled = await spool_upload(upload, IMAGES_DIR, MAX_IMAGE_SIZE)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    
+    if not sniff_image_type(spooled.header):
+        spooled.discard()
+        raise HTTPException(status_code=400, detail=f"文件 {upload.filename} 不是有效的图片")
+    return spooled
+
+
+def store_image(spooled: SpooledUpload, image_type: str) -> Dict[str, Any]:
+    """
+    按内容哈希保存已接收的图片（查询、登记数据库和移动文件，在线程中调用）
+    相同内容的图片只保存一份，重复上传直接返回已有记录；
+    记录中的 type 为首次上传时的图片类型，图片类型只用于上传响应，后续上传的类型不写入记录
+    """
+    with phase('images.persist'):
+        sha256 = spooled.sha256
+        existing = metadata_store.find_image_by_hash(sha256)
+        if existing and Path(existing['path']).exists():
+            spooled.discard()
+            return existing
+        
+        # 扩展名取实际图片格式；文件丢失时按原路径补写
+        file_ext = sniff_image_type(spooled.header)
+        file_path = Path(existing['path']) if existing else IMAGES_DIR / f"{sha256}{file_ext}"
+        commit_upload(spooled, file_path)
+        
+        # 并发上传相同内容时只保留一条记录
+        metadata_store.add_image({
+            'id': image_id_for_hash(sha256),
+            'type': image_type,
+            'filename': file_path.name,
+            'path': str(file_path),
+            'original_name': spooled.filename,
+            'created_at': datetime.now().isoformat(),
+            'sha256': sha256
+        })
+        return metadata_store.find_image_by_hash(sha256)
 
 
-def calculate_statistics(data: Dict[str, Any]) -> Dict[str, int]:
-    """计算报告统计信息"""
-    assets_count = len(data.get('assets', {}).get('assets', []))
-    threats_count = len(data.get('tara_results', {}).get('results', []))
+async def read_json_upload(upload: UploadFile) -> Any:
+    """
+    分块接收上传的JSON文件（受大小限制）并解析
+    超过 STREAM_JSON_SIZE 的文件增量解析，大数组以 StreamedArray 返回，
+    临时文件保留到报告生成结束，由 discard_json_source 删除
+    """
+    try:
+        spooled = await spool_upload(upload, UPLOAD_TMP_DIR, MAX_JSON_SIZE)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    
+    if spooled.size < STREAM_JSON_SIZE:
+        try:
+            with phase('json.parse'):
+                return json_loads(spooled.path.read_bytes())
+        finally:
+            spooled.discard()
+    
+    try:
+        with phase('json.parse'):
+            return await asyncio.to_thread(load_streaming, spooled.path)
+    except BaseException:
+        spooled.discard()
+        raise
+
+
+async def validate_report_data(report_data: Any) -> ReportDict:
+    """
+    校验并规范化请求中的报告数据（每个请求只做一次），后续生成和统计直接使用结果
+    校验失败返回422并删除增量解析的临时文件
+    """
+    try:
+        with phase('report.validate'):
+            return await asyncio.to_thread(normalize_report_data, report_data)
+    except ReportDataError as e:
+        discard_json_source(report_data)
+        raise HTTPException(
+            status_code=422,
+            detail={'message': f"报告数据校验失败: {e}", 'errors': e.errors[:MAX_VALIDATION_ERRORS]}
+        )
+
+
+def discard_json_source(report_data: Any) -> None:
+    """删除增量解析的报告数据引用的临时文件"""
+    for path in streamed_sources(report_data):
+        Path(path).unlink(missing_ok=True)
+
+
+def inline_preview_items(items: Any) -> List[Any]:
+    """生成响应中内联的预览条目；增量解析的大数组不内联，完整内容通过预览接口获取"""
+    return [] if isinstance(items, StreamedArray) else items
+
+
+def calculate_statistics(data: ReportDict) -> Dict[str, int]:
+    """计算报告统计信息（data为规范化后的报告数据）"""
+    assets_count = len(data['assets']['assets'])
+    threats_count = len(data['tara_results']['results'])
     
     # 计算高风险项（简化逻辑）
     high_risk_count = 0
-    for result in data.get('tara_results', {}).get('results', []):
-        if result.get('operational_impact') in ['重大的', '严重的']:
+    for result in data['tara_results']['results']:
+        if result['operational_impact'] in ['重大的', '严重的']:
             high_risk_count += 1
     
     return {
@@ -90,8 +371,498 @@ def calculate_statistics(data: Dict[str, Any]) -> Dict[str, int]:
     }
 
 
+async def load_report_data(report_id: str) -> Dict[str, Any]:
+    """
+    获取报告原始数据（只读）
+    未在内存中时在线程中从磁盘加载，避免解压和解析阻塞事件循环
+    """
+    data = payload_store.get_cached(report_id)
+    if data is None:
+        data = await asyncio.to_thread(payload_store.load, report_id)
+    if data is None:
+        # 旧版本存放在数据库中的报告数据
+        report_info = await asyncio.to_thread(metadata_store.get_report, report_id)
+        data = report_info.get('data', {}) if report_info else {}
+    return data
+
+
+async def save_report(report_info: Dict[str, Any], report_data: Dict[str, Any]) -> None:
+    """保存报告：原始数据写入磁盘，元数据写入数据库"""
+    with phase('report.save'):
+        await asyncio.to_thread(payload_store.save, report_info['id'], report_data)
+        metadata_store.add_report(report_info)
+
+
+@contextmanager
+def record_trace(operation: str) -> Iterator[Optional[TraceRecorder]]:
+    """在当前上下文（包括其中创建的任务）中记录生成时间线，TARA_TRACE关闭时为None"""
+    if not TRACE_ENABLED:
+        yield None
+        return
+    recorder = TraceRecorder(operation)
+    with listening(recorder):
+        yield recorder
+
+
+def generation_trace(operation: str) -> Callable[[], AsyncIterator[Optional[TraceRecorder]]]:
+    """请求依赖：记录本次请求的生成时间线（异步任务模式下同样记录后台生成）"""
+    async def dependency() -> AsyncIterator[Optional[TraceRecorder]]:
+        with record_trace(operation) as recorder:
+            yield recorder
+    return dependency
+
+
+async def save_trace(recorder: Optional[TraceRecorder], report_id: str) -> None:
+    """
+    保存报告的生成时间线；没有记录到阶段时不保存（如命中缓存、等待其他请求进行中的渲染）
+    保存失败只记录日志，不影响生成结果
+    """
+    if recorder is None:
+        return
+    spans = recorder.finish()
+    if len(spans) <= 1:
+        return
+    try:
+        await asyncio.to_thread(
+            metadata_store.add_trace, report_id, recorder.operation, recorder.created_at, spans, MAX_TRACES_PER_REPORT
+        )
+    except Exception as e:
+        print(f"Failed to save trace for {report_id}: {e}")
+
+
+def report_etag(kind: str, report_info: Dict[str, Any], variant: str = '') -> str:
+    """
+    报告详情/预览的ETag：报告内容生成后不变，只有PDF状态会变化
+    variant 区分同一报告的不同表示（如字段投影和分页参数）
+    """
+    return make_etag(kind, app.version, report_info['id'], report_info['created_at'],
+                     report_info.get('pdf_status', 'none'), variant)
+
+
+def parse_view_params(
+    fields: Optional[str],
+    allowed_fields: Tuple[str, ...],
+    offset: int,
+    cursors: Dict[str, Optional[str]]
+) -> Tuple[Optional[List[str]], Dict[str, int]]:
+    """
+    解析报告详情/预览的字段投影和分页参数，参数无效时返回400
+    返回: (字段列表, 列表名 -> 起始位置)；列表的游标优先于offset
+    """
+    try:
+        selected = parse_fields(fields, allowed_fields)
+        offsets = {
+            name: decode_offset_cursor(name, cursor) if cursor else offset
+            for name, cursor in cursors.items()
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return selected, offsets
+
+
+def file_etag(kind: str, key: str, stat: os.stat_result) -> str:
+    """文件的ETag（按文件大小和修改时间）"""
+    return make_etag(kind, key, stat.st_size, stat.st_mtime_ns)
+
+
+def send_report_file(
+    file_path: Path,
+    stat: os.stat_result,
+    download_name: str,
+    media_type: str,
+    headers: Dict[str, str]
+) -> Response:
+    """
+    发送报告文件
+    默认由应用发送（支持Range断点续传）；开启文件转发时只返回转发头，
+    由前置Web服务器发送文件内容
+    """
+    if FILE_OFFLOAD not in ('x-accel-redirect', 'x-sendfile'):
+        return FileResponse(
+            path=file_path,
+            filename=download_name,
+            media_type=media_type,
+            headers=headers,
+            stat_result=stat
+        )
+    
+    quoted_name = quote(download_name)
+    if quoted_name != download_name:
+        content_disposition = f"attachment; filename*=utf-8''{quoted_name}"
+    else:
+        content_disposition = f'attachment; filename="{download_name}"'
+    offload_headers = {**headers, 'Content-Disposition': content_disposition}
+    
+    if FILE_OFFLOAD == 'x-accel-redirect':
+        relative = file_path.resolve().relative_to(REPORTS_DIR.resolve()).as_posix()
+        offload_headers['X-Accel-Redirect'] = quote(f"{ACCEL_REDIRECT_PREFIX.rstrip('/')}/{relative}")
+    else:
+        offload_headers['X-Sendfile'] = str(file_path.resolve())
+    return Response(headers=offload_headers, media_type=media_type)
+
+
+def image_urls_from_paths(image_paths: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    """由图片路径生成图片URL，在报告创建时计算一次供列表使用"""
+    urls = {}
+    for key, path in image_paths.items():
+        if isinstance(path, list):
+            continue
+        image_id = metadata_store.find_image_id_by_path(path) if path else None
+        urls[key] = f"/api/images/{image_id}" if image_id else None
+    return urls
+
+
+async def warm_up_renderers() -> None:
+    """导入服务进程和各工作进程中的报告生成器，第一个生成请求不再承担导入耗时"""
+    try:
+        seconds = await asyncio.to_thread(warm_up)
+        print(f"Renderers loaded in {sum(seconds.values()):.3f}s")
+        await asyncio.gather(*(job_manager.run(warm_up) for _ in range(JOB_WORKERS)))
+    except Exception as e:
+        print(f"Renderer warm-up failed: {e}")
+
+
+def get_pdf_cache_key(report_data: Dict[str, Any], profile: str = DEFAULT_PDF_PROFILE) -> str:
+    """计算报告PDF的缓存键（报告数据 + 图片内容哈希 + 生成器指纹 + 输出配置）"""
+    fingerprint = f"{pdf_generator().get_generator_fingerprint()}|{get_pdf_profile(profile)!r}"
+    return compute_pdf_cache_key(report_data, fingerprint)
+
+
+def discard_cached_pdfs(report_data: Dict[str, Any]) -> None:
+    """删除报告各PDF输出配置对应的缓存文件（旧版本生成器的缓存由大小上限淘汰）"""
+    if not report_data:
+        return
+    try:
+        pdf_cache.discard([get_pdf_cache_key(report_data, profile) for profile in PDF_PROFILES])
+    except Exception as e:
+        print(f"删除PDF缓存失败: {e}")
+
+
+def resolve_pdf_profile(profile: Optional[str]) -> str:
+    """校验PDF输出配置名称"""
+    name = profile or DEFAULT_PDF_PROFILE
+    if name not in PDF_PROFILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"无效的PDF输出配置。可选配置: {', '.join(PDF_PROFILES)}"
+        )
+    return name
+
+
+async def render_report_pdf(
+    report_id: str,
+    profile: str = DEFAULT_PDF_PROFILE,
+    force: bool = False,
+    render: Callable = render_pdf
+):
+    """
+    渲染报告PDF（命中缓存时直接返回），并更新报告的PDF状态
+    
+    PDF状态仅跟踪默认输出配置: pending(已排队) / rendering / ready / failed
+    render 可替换为带性能分析的渲染函数；实际执行的渲染记录为报告的时间线
+    返回: (PDF路径, 是否命中缓存)
+    """
+    with record_trace(f"render_pdf.{profile}") as trace:
+        report_data = await load_report_data(report_id)
+        cache_key = await asyncio.to_thread(get_pdf_cache_key, report_data, profile)
+        track_status = profile == DEFAULT_PDF_PROFILE
+        
+        if track_status and not pdf_cache.get(cache_key):
+            metadata_store.update_report(report_id, pdf_status='rendering')
+        try:
+            pdf_path, cached = await pdf_renderer.ensure(
+                cache_key,
+                # 报告数据入库时已校验，渲染时只补全缺失字段
+                partial(render, json_data=report_data, profile=profile, validate=False),
+                force=force
+            )
+        except Exception as e:
+            if track_status:
+                metadata_store.update_report(report_id, pdf_status='failed', pdf_error=str(e))
+            raise
+        
+        if track_status:
+            metadata_store.update_report(report_id, pdf_status='ready', pdf_error=None)
+    
+    await save_trace(trace, report_id)
+    return pdf_path, cached
+
+
+async def _prerender_report_pdf(report_id: str) -> None:
+    """后台预渲染任务，失败时只记录状态"""
+    try:
+        await render_report_pdf(report_id)
+    except Exception as e:
+        print(f"PDF pre-rendering failed for {report_id}: {e}")
+
+
+def schedule_pdf_prerender(report_id: str) -> None:
+    """将报告的PDF渲染加入后台队列"""
+    metadata_store.update_report(report_id, pdf_status='pending')
+    task = asyncio.create_task(_prerender_report_pdf(report_id))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+def submit_job(
+    kind: str,
+    work,
+    metadata: Optional[Dict[str, Any]] = None,
+    cleanup: Optional[Callable[[], None]] = None
+) -> FastJSONResponse:
+    """提交异步任务，返回 202 和任务状态地址；cleanup 在任务结束（或提交失败）后调用"""
+    try:
+        job = job_manager.submit(kind, work, metadata)
+    except (JobQueueFullError, JobManagerClosedError) as e:
+        if cleanup:
+            cleanup()
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    if cleanup:
+        job.task.add_done_callback(lambda _: cleanup())
+    
+    return FastJSONResponse(
+        status_code=202,
+        content={
+            'success': True,
+            'message': '任务已提交',
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': f"/api/jobs/{job.id}",
+            **job.metadata
+        }
+    )
+
+
+def build_preview_data(
+    report_data: Dict[str, Any],
+    statistics: Dict[str, Any],
+    images: Dict[str, Optional[str]],
+    include_preview: bool
+) -> Dict[str, Any]:
+    """生成响应中的预览数据：默认只含摘要，include_preview 时加入完整列表"""
+    preview_data = {
+        'cover': report_data['cover'],
+        'definitions': {
+            'title': section_title(report_data['definitions'], ''),
+            'functional_description': report_data['definitions']['functional_description']
+        },
+        'statistics': statistics,
+        'images': images
+    }
+    if include_preview:
+        preview_data['definitions']['assumptions'] = report_data['definitions']['assumptions']
+        preview_data['definitions']['terminology'] = report_data['definitions']['terminology']
+        preview_data['assets'] = inline_preview_items(report_data['assets']['assets'])
+        preview_data['attack_trees'] = report_data['attack_trees']['attack_trees']
+        preview_data['tara_results'] = inline_preview_items(report_data['tara_results']['results'])
+    return preview_data
+
+
+def report_input_fingerprint() -> str:
+    """报告输入哈希中的生成器指纹：Excel生成器或服务版本变化后不再复用旧报告"""
+    return f"excel:{excel_generator().EXCEL_GENERATOR_VERSION}|api:{app.version}"
+
+
+def check_client_key(key: str, input_hash: str) -> None:
+    """Idempotency-Key 已用于内容不同的请求时返回422"""
+    record = metadata_store.get_idempotency_key(key)
+    pending = _inflight_generations.get(key)
+    if (record and record['input_hash'] != input_hash) or (pending and pending[0] != input_hash):
+        raise HTTPException(status_code=422, detail="Idempotency-Key 已用于内容不同的请求")
+
+
+def find_idempotent_report(keys: List[str], input_hash: str) -> Optional[str]:
+    """按幂等键查找已生成的报告ID；报告或报告文件已不存在时删除对应的键"""
+    for key in keys:
+        record = metadata_store.get_idempotency_key(key)
+        if record is None or record['input_hash'] != input_hash:
+            continue
+        report = metadata_store.get_report(record['report_id'], include_data=False)
+        if report and Path(report['file_path']).exists():
+            return report['id']
+        metadata_store.delete_idempotency_key(key)
+    return None
+
+
+def record_idempotency_keys(keys: List[str], input_hash: str, report_id: str) -> None:
+    """记录幂等键与报告的对应关系"""
+    created_at = datetime.now().isoformat()
+    for key in keys:
+        metadata_store.add_idempotency_key(key, input_hash, report_id, created_at)
+
+
+async def replay_report(
+    report_id: str,
+    keys: List[str],
+    input_hash: str,
+    include_preview: bool,
+    prerender: bool
+) -> Optional[Dict[str, Any]]:
+    """返回已生成报告的生成响应（同时记录本次请求的幂等键），报告已被删除返回None"""
+    report_info = await asyncio.to_thread(metadata_store.get_report, report_id, False)
+    if report_info is None:
+        return None
+    report_data = await load_report_data(report_id)
+    await asyncio.to_thread(record_idempotency_keys, keys, input_hash, report_id)
+    
+    if prerender and report_info.get('pdf_status', 'none') in ('none', 'failed'):
+        schedule_pdf_prerender(report_id)
+    
+    images = report_info.get('image_urls') or image_urls_from_paths(report_info.get('images') or {})
+    return GenerateReportResponse(
+        success=True,
+        message="报告已存在，返回已生成的报告",
+        report_id=report_id,
+        download_url=f"/api/reports/{report_id}/download",
+        preview_url=f"/api/reports/{report_id}/preview",
+        preview_data=build_preview_data(report_data, report_info['statistics'], images, include_preview),
+        reused=True
+    ).model_dump()
+
+
+async def run_idempotent(
+    keys: List[str],
+    input_hash: str,
+    build: Callable[[], Awaitable[Dict[str, Any]]],
+    replay: Callable[[str], Awaitable[Optional[Dict[str, Any]]]]
+) -> Dict[str, Any]:
+    """
+    幂等生成：已有相同键的报告时返回已有报告，否则调用 build 生成并记录键
+    同一进程中相同键的请求同时到达时，后到的请求等待进行中的生成完成后复用其结果
+    """
+    for key in keys:
+        pending = _inflight_generations.get(key)
+        if pending is not None and pending[0] == input_hash:
+            # shield: 本请求被取消时不影响进行中的生成
+            report_id = await asyncio.shield(pending[1])
+            if report_id:
+                response = await replay(report_id)
+                if response is not None:
+                    return response
+            break
+    
+    # 先登记再查询数据库，同时到达的请求不会都开始生成
+    future = asyncio.get_running_loop().create_future()
+    for key in keys:
+        _inflight_generations[key] = (input_hash, future)
+    try:
+        report_id = await asyncio.to_thread(find_idempotent_report, keys, input_hash)
+        response = await replay(report_id) if report_id else None
+        if response is None:
+            response = await build()
+            await asyncio.to_thread(record_idempotency_keys, keys, input_hash, response['report_id'])
+        future.set_result(response['report_id'])
+        return response
+    finally:
+        if not future.done():
+            future.set_result(None)
+        for key in keys:
+            if _inflight_generations.get(key, (None, None))[1] is future:
+                del _inflight_generations[key]
+
+
+async def create_report(report_data: ReportDict, prerender_pdf: bool = False) -> Dict[str, Any]:
+    """由规范化的报告数据生成Excel并保存报告（批量生成使用），返回报告信息"""
+    report_id = generate_report_id()
+    output_path = REPORTS_DIR / f"{report_id}.xlsx"
+    await run_excel_generation(output_path, report_data)
+    
+    report_info = {
+        'id': report_id,
+        'name': report_data['cover']['report_title'] or 'TARA报告',
+        'project_name': report_data['cover']['project_name'] or '未命名项目',
+        'document_number': report_data['cover']['document_number'],
+        'version': report_data['cover']['version'],
+        'created_at': datetime.now().isoformat(),
+        'status': 'completed',
+        'file_path': str(output_path),
+        'file_size': output_path.stat().st_size,
+        'statistics': calculate_statistics(report_data),
+        'image_urls': {},
+        'pdf_status': 'none'
+    }
+    await save_report(report_info, report_data)
+    
+    if prerender_pdf:
+        schedule_pdf_prerender(report_id)
+    return report_info
+
+
+async def run_excel_generation(
+    output_path: Path,
+    report_data: Dict[str, Any],
+    render: Callable = render_excel
+) -> None:
+    """
+    在工作进程中生成Excel报告（render 可替换为带性能分析的渲染函数）
+    任务被取消时，工作进程结束后删除已写出的文件
+    """
+    try:
+        with phase('render.xlsx'):
+            await metrics.track_generation('xlsx', job_manager.run, render, str(output_path), report_data)
+    except asyncio.CancelledError:
+        output_path.unlink(missing_ok=True)
+        raise
+    except (JobQueueFullError, JobManagerClosedError) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"报告生成失败: {str(e)}")
+    metrics.observe_output('xlsx', output_path)
+
+
+def check_profiling_token(token: Optional[str]) -> None:
+    """校验性能分析的管理令牌，未配置或不匹配时返回403"""
+    if not PROFILING_TOKEN:
+        raise HTTPException(status_code=403, detail="性能分析未启用（未配置TARA_PROFILING_TOKEN）")
+    if not token or not hmac.compare_digest(token.encode('utf-8'), PROFILING_TOKEN.encode('utf-8')):
+        raise HTTPException(status_code=403, detail="无效的性能分析令牌")
+
+
+def resolve_profiling(mode: Optional[str], token: Optional[str]) -> Optional[str]:
+    """校验请求的性能分析方式（X-Profiling 头），未请求时返回None"""
+    if mode is None:
+        return None
+    check_profiling_token(token)
+    mode = mode.strip().lower() or 'cprofile'
+    if mode not in PROFILING_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"无效的性能分析方式。可选方式: {', '.join(PROFILING_MODES)}"
+        )
+    return mode
+
+
+def profiled(render: Callable, mode: Optional[str], report_id: str, target: str) -> Tuple[Callable, Optional[Path]]:
+    """
+    需要性能分析时将渲染函数包装为在分析器下运行
+    返回: (渲染函数, 分析结果文件路径)，未请求分析时原样返回渲染函数
+    """
+    if mode is None:
+        return render, None
+    artifact_path = PROFILES_DIR / artifact_name(report_id, target, mode)
+    return partial(run_profiled, mode, str(artifact_path), render), artifact_path
+
+
+def profiling_url(report_id: str, artifact_path: Optional[Path]) -> Optional[str]:
+    """分析结果的下载地址（未请求分析或渲染未在本次请求中执行时为None）"""
+    if artifact_path is None or not artifact_path.exists():
+        return None
+    return f"/api/reports/{report_id}/profiles/{artifact_path.name}"
+
+
 # ==================== API端点 ====================
 
+# 报告详情和预览可选择的顶层字段
+REPORT_DETAIL_FIELDS = (
+    'id', 'name', 'project_name', 'created_at', 'status', 'pdf_status', 'statistics',
+    'cover', 'definitions', 'assets', 'attack_trees', 'tara_results', 'download_url'
+)
+REPORT_PREVIEW_FIELDS = (
+    'report_info', 'cover', 'definitions', 'assets', 'dataflow_image',
+    'attack_trees', 'tara_results', 'statistics'
+)
+
 @app.get("/")
 async def root():
     """API根路径"""
@@ -118,12 +889,11 @@ async def upload_image(
     - attack_tree: 攻击树图
     """
     # 验证文件类型
-    allowed_extensions = {'.png', '.jpg', '.jpeg', '.gif', '.bmp', '.svg'}
     file_ext = Path(file.filename).suffix.lower()
-    if file_ext not in allowed_extensions:
+    if file_ext not in ALLOWED_IMAGE_EXTENSIONS:
         raise HTTPException(
             status_code=400, 
-            detail=f"不支持的文件格式。支持的格式: {', '.join(allowed_extensions)}"
+            detail=f"不支持的文件格式。支持的格式: {', '.join(ALLOWED_IMAGE_EXTENSIONS)}"
         )
     
     # 验证图片类型
@@ -134,28 +904,14 @@ async def upload_image(
             detail=f"无效的图片类型。有效类型: {', '.join(valid_types)}"
         )
     
-    # 生成图片ID和保存路径
-    image_id = generate_image_id()
-    filename = f"{image_id}{file_ext}"
-    file_path = IMAGES_DIR / filename
-    
-    # 保存文件
+    # 按内容保存文件（相同图片只保存一份）
+    spooled = await receive_image(file)
     try:
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
+        image_info = await asyncio.to_thread(store_image, spooled, image_type)
     except Exception as e:
+        spooled.discard()
         raise HTTPException(status_code=500, detail=f"文件保存失败: {str(e)}")
-    
-    # 记录图片信息
-    images_db[image_id] = {
-        'id': image_id,
-        'type': image_type,
-        'filename': filename,
-        'path': str(file_path),
-        'original_name': file.filename,
-        'created_at': datetime.now().isoformat()
-    }
+    image_id = image_info['id']
     
     return ImageUploadResponse(
         success=True,
@@ -167,18 +923,26 @@ async def upload_image(
 
 
 @app.get("/api/images/{image_id}")
-async def get_image(image_id: str):
-    """获取图片"""
-    if image_id not in images_db:
+async def get_image(image_id: str, request: Request):
+    """获取图片（支持ETag条件请求）"""
+    image_info = metadata_store.get_image(image_id)
+    if not image_info:
         raise HTTPException(status_code=404, detail="图片不存在")
     
-    image_info = images_db[image_id]
     file_path = Path(image_info['path'])
     
-    if not file_path.exists():
+    try:
+        stat = file_path.stat()
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="图片文件不存在")
     
-    return FileResponse(file_path)
+    # 按内容存储的图片直接以内容哈希作为ETag
+    etag = f'"{image_info["sha256"]}"' if image_info.get('sha256') else file_etag('image', image_id, stat)
+    headers = cache_headers(etag, datetime.fromtimestamp(stat.st_mtime), IMAGE_CACHE_CONTROL)
+    if is_not_modified(request, etag, datetime.fromtimestamp(stat.st_mtime)):
+        return not_modified(headers)
+    
+    return FileResponse(file_path, headers=headers, stat_result=stat)
 
 
 @app.post("/api/reports/generate", response_model=GenerateReportResponse)
@@ -190,7 +954,15 @@ async def generate_report(
     software_architecture_image: str = Form(None, description="软件架构图片ID"),
     dataflow_image: str = Form(None, description="数据流图片ID"),
     attack_tree_images: str = Form(None, description="攻击树图片ID列表(逗号分隔)"),
-    attack_trees_data: str = Form(None, description="攻击树数据JSON(用于替换)")
+    attack_trees_data: str = Form(None, description="攻击树数据JSON(用于替换)"),
+    prerender_pdf: Optional[bool] = Form(None, description="是否在后台预渲染PDF(默认取TARA_PDF_PRERENDER)"),
+    reuse_existing: Optional[bool] = Form(None, description="相同输入已生成过报告时直接返回(默认取TARA_REPORT_REUSE)"),
+    idempotency_key: Optional[str] = Header(None, description="幂等键，相同键的重复请求返回同一报告"),
+    profiling: Optional[str] = Header(None, alias="X-Profiling", description="性能分析方式: cprofile, sample（需管理令牌）"),
+    profiling_token: Optional[str] = Header(None, alias="X-Profiling-Token", description="性能分析管理令牌"),
+    include_preview: bool = Query(False, description="在preview_data中返回资产、攻击树和TARA结果的完整列表"),
+    async_job: bool = Query(False, alias="async", description="作为异步任务提交，立即返回任务ID"),
+    trace: Optional[TraceRecorder] = Depends(generation_trace('generate_report'))
 ):
     """
     生成TARA报告
@@ -198,34 +970,47 @@ async def generate_report(
     可以通过上传JSON文件或直接传递JSON数据来生成报告。
     同时支持关联已上传的图片。
     如果提供了attack_trees_data，将自动替换JSON中的attack_trees字段。
+    开启PDF预渲染时，Excel生成后立即在后台渲染PDF。
+    preview_data 默认只包含封面、统计和图片等摘要，完整内容通过 preview_url 分页获取；
+    传入include_preview=true时返回完整列表。
+    携带 Idempotency-Key 请求头或开启 reuse_existing 时，相同输入（报告数据和图片内容）
+    已生成过报告则直接返回该报告（reused=true），不再重新生成；同一键用于不同内容时返回422。
+    传入async=true时返回202和任务ID，通过 /api/jobs/{job_id} 查询结果。
+    携带 X-Profiling 和 X-Profiling-Token 请求头时，本次Excel生成在分析器下运行，
+    响应中的 profiling_url 为分析结果的下载地址。
     """
+    try:
+        idempotency_key = parse_idempotency_key(idempotency_key)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    profiling = resolve_profiling(profiling, profiling_token)
+    
     # 解析JSON数据
     report_data = None
     
     if json_file and json_file.filename:
         try:
-            content = await json_file.read()
-            report_data = json.loads(content.decode('utf-8'))
+            report_data = await read_json_upload(json_file)
         except json.JSONDecodeError as e:
             raise HTTPException(status_code=400, detail=f"JSON文件格式错误: {str(e)}")
     elif json_data:
         try:
-            report_data = json.loads(json_data)
+            with phase('json.parse'):
+                report_data = json_loads(json_data)
         except json.JSONDecodeError as e:
             raise HTTPException(status_code=400, detail=f"JSON数据格式错误: {str(e)}")
     else:
         raise HTTPException(status_code=400, detail="请提供JSON文件或JSON数据")
     
+    # 校验并规范化（之后所有部分和字段都存在）
+    report_data = await validate_report_data(report_data)
+    
     # 处理图片关联
     def get_image_path(image_id: Optional[str]) -> Optional[str]:
-        if image_id and image_id in images_db:
-            return images_db[image_id]['path']
-        return None
+        image_info = metadata_store.get_image(image_id) if image_id else None
+        return image_info['path'] if image_info else None
     
     # 更新数据中的图片路径
-    if 'definitions' not in report_data:
-        report_data['definitions'] = {}
-    
     if item_boundary_image:
         report_data['definitions']['item_boundary_image'] = get_image_path(item_boundary_image)
     if system_architecture_image:
@@ -233,36 +1018,32 @@ async def generate_report(
     if software_architecture_image:
         report_data['definitions']['software_architecture_image'] = get_image_path(software_architecture_image)
     
-    if 'assets' not in report_data:
-        report_data['assets'] = {}
     if dataflow_image:
         report_data['assets']['dataflow_image'] = get_image_path(dataflow_image)
     
     # 处理攻击树数据替换
     if attack_trees_data:
         try:
-            attack_trees_list = json.loads(attack_trees_data)
+            attack_trees_list = json_loads(attack_trees_data)
             if attack_trees_list and len(attack_trees_list) > 0:
                 # 使用前端提供的攻击树数据替换JSON中的attack_trees
                 new_attack_trees = []
                 for tree_data in attack_trees_list:
                     image_id = tree_data.get('image_id')
                     image_path = get_image_path(image_id) if image_id else None
-                    new_attack_trees.append({
-                        'asset_id': tree_data.get('asset_id', ''),
-                        'asset_name': tree_data.get('asset_name', ''),
-                        'title': tree_data.get('title', ''),
-                        'image': image_path
-                    })
-                report_data['attack_trees'] = {'attack_trees': new_attack_trees}
-        except json.JSONDecodeError:
+                    new_attack_trees.append(AttackTree(
+                        asset_id=tree_data.get('asset_id', ''),
+                        asset_name=tree_data.get('asset_name', ''),
+                        title=tree_data.get('title', ''),
+                        image=image_path
+                    ).model_dump())
+                report_data['attack_trees']['attack_trees'] = new_attack_trees
+        except (json.JSONDecodeError, ValidationError):
             pass  # 忽略解析错误，使用原始数据
     elif attack_tree_images:
         # 兼容旧的攻击树图片ID列表方式
         image_ids = [img_id.strip() for img_id in attack_tree_images.split(',') if img_id.strip()]
-        if 'attack_trees' not in report_data:
-            report_data['attack_trees'] = {'attack_trees': []}
-        attack_trees = report_data.get('attack_trees', {}).get('attack_trees', [])
+        attack_trees = report_data['attack_trees']['attack_trees']
         for i, img_id in enumerate(image_ids):
             if i < len(attack_trees):
                 attack_trees[i]['image'] = get_image_path(img_id)
@@ -271,111 +1052,214 @@ async def generate_report(
     report_id = generate_report_id()
     output_filename = f"{report_id}.xlsx"
     output_path = REPORTS_DIR / output_filename
+    render, profile_path = profiled(render_excel, profiling, report_id, 'xlsx')
     
-    # 生成Excel报告
-    try:
-        generate_tara_excel_from_json(str(output_path), report_data)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"报告生成失败: {str(e)}")
-    
-    # 计算统计信息
-    statistics = calculate_statistics(report_data)
-    
-    # 获取图片信息用于预览
-    images_info = {
-        'item_boundary': get_image_path(item_boundary_image),
-        'system_architecture': get_image_path(system_architecture_image),
-        'software_architecture': get_image_path(software_architecture_image),
-        'dataflow': get_image_path(dataflow_image)
-    }
-    
-    # 存储报告信息
-    report_info = {
-        'id': report_id,
-        'name': report_data.get('cover', {}).get('report_title', 'TARA报告'),
-        'project_name': report_data.get('cover', {}).get('project_name', '未命名项目'),
-        'created_at': datetime.now().isoformat(),
-        'status': 'completed',
-        'file_path': str(output_path),
-        'statistics': statistics,
-        'images': images_info,
-        'data': report_data  # 保存原始数据用于预览
-    }
-    reports_db[report_id] = report_info
-    
-    # 构建预览数据
-    preview_data = {
-        'cover': report_data.get('cover', {}),
-        'definitions': {
-            'title': report_data.get('definitions', {}).get('title', ''),
-            'functional_description': report_data.get('definitions', {}).get('functional_description', ''),
-            'assumptions': report_data.get('definitions', {}).get('assumptions', []),
-            'terminology': report_data.get('definitions', {}).get('terminology', [])
-        },
-        'assets': report_data.get('assets', {}).get('assets', []),
-        'attack_trees': report_data.get('attack_trees', {}).get('attack_trees', []),
-        'tara_results': report_data.get('tara_results', {}).get('results', []),
-        'statistics': statistics,
-        'images': {
+    async def build() -> Dict[str, Any]:
+        # 在工作进程中生成Excel报告
+        await run_excel_generation(output_path, report_data, render)
+        
+        # 计算统计信息
+        statistics = calculate_statistics(report_data)
+        
+        # 获取图片信息用于预览
+        images_info = {
+            'item_boundary': get_image_path(item_boundary_image),
+            'system_architecture': get_image_path(system_architecture_image),
+            'software_architecture': get_image_path(software_architecture_image),
+            'dataflow': get_image_path(dataflow_image)
+        }
+        
+        # 存储报告信息
+        report_info = {
+            'id': report_id,
+            'name': report_data['cover']['report_title'] or 'TARA报告',
+            'project_name': report_data['cover']['project_name'] or '未命名项目',
+            'document_number': report_data['cover']['document_number'],
+            'created_at': datetime.now().isoformat(),
+            'status': 'completed',
+            'file_path': str(output_path),
+            'statistics': statistics,
+            'images': images_info,
+            'image_urls': image_urls_from_paths(images_info),
+            'pdf_status': 'none'
+        }
+        await save_report(report_info, report_data)
+        await save_trace(trace, report_id)
+        
+        if PDF_PRERENDER if prerender_pdf is None else prerender_pdf:
+            schedule_pdf_prerender(report_id)
+        
+        # 构建预览数据（默认只含摘要）
+        preview_data = build_preview_data(report_data, statistics, {
             'item_boundary': f"/api/images/{item_boundary_image}" if item_boundary_image else None,
             'system_architecture': f"/api/images/{system_architecture_image}" if system_architecture_image else None,
             'software_architecture': f"/api/images/{software_architecture_image}" if software_architecture_image else None,
             'dataflow': f"/api/images/{dataflow_image}" if dataflow_image else None
-        }
-    }
+        }, include_preview)
+        
+        return GenerateReportResponse(
+            success=True,
+            message="报告生成成功",
+            report_id=report_id,
+            download_url=f"/api/reports/{report_id}/download",
+            preview_url=f"/api/reports/{report_id}/preview",
+            preview_data=preview_data,
+            profiling_url=profiling_url(report_id, profile_path)
+        ).model_dump()
+    
+    release = partial(discard_json_source, report_data)
+    
+    # 幂等键：客户端提供的键和（开启复用时）输入哈希
+    reuse = REPORT_REUSE if reuse_existing is None else reuse_existing
+    run = build
+    job_report_id = report_id
+    if idempotency_key or reuse:
+        try:
+            input_hash = await asyncio.to_thread(
+                lambda: compute_input_hash(report_data, report_input_fingerprint())
+            )
+            keys = []
+            if idempotency_key:
+                keys.append(client_key(idempotency_key))
+                check_client_key(keys[0], input_hash)
+            if reuse:
+                keys.append(input_key(input_hash))
+            job_report_id = await asyncio.to_thread(find_idempotent_report, keys, input_hash) or report_id
+        except BaseException:
+            release()
+            raise
+        replay = partial(
+            replay_report,
+            keys=keys,
+            input_hash=input_hash,
+            include_preview=include_preview,
+            prerender=PDF_PRERENDER if prerender_pdf is None else prerender_pdf
+        )
+        run = partial(run_idempotent, keys, input_hash, build, replay)
     
-    return GenerateReportResponse(
-        success=True,
-        message="报告生成成功",
-        report_id=report_id,
-        download_url=f"/api/reports/{report_id}/download",
-        preview_data=preview_data
-    )
+    if async_job:
+        return submit_job('generate_report', run, {'report_id': job_report_id}, cleanup=release)
+    try:
+        return await run()
+    finally:
+        release()
+
+
+def local_isoformat(value: Optional[datetime]) -> Optional[str]:
+    """
+    筛选时间转换为与created_at相同的格式（服务器本地时间、不带时区的ISO字符串）
+    带时区的时间先换算为本地时间，否则按字符串比较时会与本地时间错开时区偏移
+    """
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value.isoformat()
 
 
 @app.get("/api/reports", response_model=ReportListResponse)
-async def list_reports():
-    """获取报告列表"""
-    reports = []
-    for report_id, report_info in reports_db.items():
-        reports.append(ReportInfo(
+async def list_reports(
+    limit: int = Query(50, ge=1, le=500, description="每页数量"),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的next_cursor）"),
+    sort_by: str = Query('created_at', description="排序字段: created_at, name, project_name, threats_count, high_risk_count"),
+    order: str = Query('desc', description="排序方向: asc, desc"),
+    project_name: Optional[str] = Query(None, description="按项目名称筛选"),
+    status: Optional[str] = Query(None, description="按状态筛选"),
+    created_from: Optional[datetime] = Query(None, description="创建时间起（含），不带时区时按服务器本地时间"),
+    created_to: Optional[datetime] = Query(None, description="创建时间止（不含），不带时区时按服务器本地时间"),
+    min_threats: Optional[int] = Query(None, ge=0, description="威胁数下限"),
+    max_threats: Optional[int] = Query(None, ge=0, description="威胁数上限"),
+    min_high_risk: Optional[int] = Query(None, ge=0, description="高风险项数下限"),
+    max_high_risk: Optional[int] = Query(None, ge=0, description="高风险项数上限"),
+    include_total: bool = Query(False, description="有筛选条件时是否统计总数")
+):
+    """
+    获取报告列表
+    
+    使用游标分页：每页按排序索引定位，翻页开销与报告总数无关。
+    将返回的next_cursor作为cursor参数获取下一页，排序方式需保持一致。
+    """
+    filters = {
+        'project_name': project_name,
+        'status': status,
+        'created_from': local_isoformat(created_from),
+        'created_to': local_isoformat(created_to),
+        'min_threats': min_threats,
+        'max_threats': max_threats,
+        'min_high_risk': min_high_risk,
+        'max_high_risk': max_high_risk
+    }
+    try:
+        rows, next_cursor = metadata_store.list_reports(
+            limit=limit, cursor=cursor, sort_by=sort_by, order=order, **filters
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    reports = [
+        ReportInfo(
             id=report_info['id'],
             name=report_info['name'],
             project_name=report_info['project_name'],
-            created_at=datetime.fromisoformat(report_info['created_at']),
+            created_at=report_info['created_at'],
             status=report_info['status'],
             file_path=report_info['file_path'],
-            statistics=report_info['statistics'],
-            images={k: f"/api/images/{v.split('/')[-1].split('.')[0]}" if v else None 
-                   for k, v in report_info.get('images', {}).items()}
-        ))
+            statistics=report_info.get('statistics', {}),
+            images=report_info.get('image_urls', {})
+        )
+        for report_info in rows
+    ]
     
-    # 按创建时间倒序排列
-    reports.sort(key=lambda x: x.created_at, reverse=True)
+    # 无筛选条件时总数来自计数器；有筛选条件时需要计数查询，按需返回
+    has_filters = any(value is not None for value in filters.values())
+    total = metadata_store.count_reports(**filters) if include_total or not has_filters else None
     
     return ReportListResponse(
         success=True,
         reports=reports,
-        total=len(reports)
+        total=total,
+        next_cursor=next_cursor
     )
 
 
 @app.get("/api/reports/{report_id}")
-async def get_report(report_id: str):
-    """获取报告详情"""
-    if report_id not in reports_db:
+async def get_report(
+    report_id: str,
+    request: Request,
+    fields: Optional[str] = Query(None, description="只返回指定的顶层字段（逗号分隔），如 cover,statistics"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="资产和TARA结果列表每页条数，默认返回全部"),
+    offset: int = Query(0, ge=0, description="资产和TARA结果列表的起始位置"),
+    assets_cursor: Optional[str] = Query(None, description="资产列表的分页游标：上一页响应中的 page.assets.next_cursor（优先于offset）"),
+    results_cursor: Optional[str] = Query(None, description="TARA结果列表的分页游标：上一页响应中的 page.tara_results.next_cursor（优先于offset）")
+):
+    """
+    获取报告详情（支持ETag条件请求）
+    
+    指定 fields 时只返回这些字段；指定 limit/offset/游标时资产和TARA结果列表分页返回，
+    响应的 page 中包含各列表的总数和下一页游标；两个列表分别用 assets_cursor / results_cursor 翻页。
+    """
+    selected, offsets = parse_view_params(
+        fields, REPORT_DETAIL_FIELDS, offset, {'assets': assets_cursor, 'tara_results': results_cursor}
+    )
+    report_info = metadata_store.get_report(report_id, include_data=False)
+    if not report_info:
         raise HTTPException(status_code=404, detail="报告不存在")
     
-    report_info = reports_db[report_id]
-    report_data = report_info.get('data', {})
+    # 客户端已有最新内容时不再加载和序列化报告数据
+    headers = cache_headers(report_etag('report', report_info, request.url.query))
+    if is_not_modified(request, headers['ETag']):
+        return not_modified(headers)
+    
+    report_data = await load_report_data(report_id)
     
     # 构建预览数据
-    preview_data = {
+    preview_data = project({
         'id': report_id,
         'name': report_info['name'],
         'project_name': report_info['project_name'],
         'created_at': report_info['created_at'],
         'status': report_info['status'],
+        'pdf_status': report_info.get('pdf_status', 'none'),
         'statistics': report_info['statistics'],
         'cover': report_data.get('cover', {}),
         'definitions': report_data.get('definitions', {}),
@@ -383,114 +1267,238 @@ async def get_report(report_id: str):
         'attack_trees': report_data.get('attack_trees', {}),
         'tara_results': report_data.get('tara_results', {}),
         'download_url': f"/api/reports/{report_id}/download"
-    }
+    }, selected)
+    
+    if limit is not None or any(offsets.values()):
+        preview_data['page'] = paginate_lists(
+            preview_data,
+            {'assets': ('assets', 'assets'), 'tara_results': ('tara_results', 'results')},
+            offsets, limit or DEFAULT_PAGE_SIZE
+        )
     
-    return JSONResponse(content=preview_data)
+    return FastJSONResponse(content=preview_data, headers=headers)
 
 
 @app.get("/api/reports/{report_id}/download")
-async def download_report(report_id: str):
-    """下载报告"""
-    if report_id not in reports_db:
+async def download_report(report_id: str, request: Request):
+    """下载报告（支持Range断点续传和ETag条件请求）"""
+    report_info = metadata_store.get_report(report_id, include_data=False)
+    if not report_info:
         raise HTTPException(status_code=404, detail="报告不存在")
     
-    report_info = reports_db[report_id]
     file_path = Path(report_info['file_path'])
     
-    if not file_path.exists():
+    try:
+        stat = file_path.stat()
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="报告文件不存在")
     
+    last_modified = datetime.fromtimestamp(stat.st_mtime)
+    headers = cache_headers(file_etag('xlsx', report_id, stat), last_modified, REPORT_FILE_CACHE_CONTROL)
+    if is_not_modified(request, headers['ETag'], last_modified):
+        return not_modified(headers)
+    
     # 使用项目名称作为下载文件名
     download_name = f"{report_info['project_name']}_TARA报告_{report_id}.xlsx"
     
-    return FileResponse(
-        path=file_path,
-        filename=download_name,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    return send_report_file(
+        file_path,
+        stat,
+        download_name,
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers
     )
 
 
 @app.get("/api/reports/{report_id}/download/pdf")
-async def download_report_pdf(report_id: str):
-    """下载PDF格式报告"""
-    if report_id not in reports_db:
-        raise HTTPException(status_code=404, detail="报告不存在")
-    
-    report_info = reports_db[report_id]
-    report_data = report_info.get('data', {})
+async def download_report_pdf(
+    request: Request,
+    report_id: str,
+    profile: str = Query(DEFAULT_PDF_PROFILE, description="PDF输出配置: standard, screen, print, draft"),
+    profiling: Optional[str] = Header(None, alias="X-Profiling", description="性能分析方式: cprofile, sample（需管理令牌）"),
+    profiling_token: Optional[str] = Header(None, alias="X-Profiling-Token", description="性能分析管理令牌")
+):
+    """
+    下载PDF格式报告（支持Range断点续传和ETag条件请求）
     
-    # PDF文件路径
-    pdf_filename = f"{report_id}.pdf"
-    pdf_path = REPORTS_DIR / pdf_filename
+    输出配置:
+    - standard: 原图嵌入（默认）
+    - screen: 低DPI JPEG图片 + 页面压缩，文件最小，适合浏览器查看
+    - print: 高DPI无损图片，适合打印
+    - draft: 不含图片、不压缩，生成最快，适合审阅
     
-    # 如果PDF不存在，生成它
-    if not pdf_path.exists():
-        try:
-            generate_tara_pdf_from_json(str(pdf_path), report_data)
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"PDF生成失败: {str(e)}")
+    携带 X-Profiling 和 X-Profiling-Token 请求头时忽略缓存重新渲染，渲染在分析器下运行，
+    响应头 X-Profiling-Artifact 为分析结果的下载地址。
+    """
+    report_info = metadata_store.get_report(report_id, include_data=False)
+    if not report_info:
+        raise HTTPException(status_code=404, detail="报告不存在")
+    profile = resolve_pdf_profile(profile)
+    profiling = resolve_profiling(profiling, profiling_token)
+    render, profile_path = profiled(render_pdf, profiling, report_id, f"pdf-{profile}")
     
-    # 使用项目名称作为下载文件名
-    download_name = f"{report_info['project_name']}_TARA报告_{report_id}.pdf"
+    # 内容未变化时直接复用缓存的PDF；正在后台渲染时等待其完成；否则重新生成
+    try:
+        pdf_path, _ = await render_report_pdf(report_id, profile, force=profiling is not None, render=render)
+    except (JobQueueFullError, JobManagerClosedError) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"PDF生成失败: {str(e)}")
     
-    return FileResponse(
-        path=pdf_path,
-        filename=download_name,
-        media_type="application/pdf"
-    )
+    # PDF按内容缓存，文件名即内容哈希，可直接作为ETag（断点续传时用于If-Range校验）
+    stat = pdf_path.stat()
+    last_modified = datetime.fromtimestamp(stat.st_mtime)
+    headers = cache_headers(f'"{pdf_path.stem}"', last_modified, REPORT_FILE_CACHE_CONTROL)
+    artifact_url = profiling_url(report_id, profile_path)
+    if artifact_url:
+        headers['X-Profiling-Artifact'] = artifact_url
+    if is_not_modified(request, headers['ETag'], last_modified):
+        return not_modified(headers)
+    
+    # 使用项目名称作为下载文件名，非默认配置附加配置名
+    suffix = "" if profile == DEFAULT_PDF_PROFILE else f"_{profile}"
+    download_name = f"{report_info['project_name']}_TARA报告_{report_id}{suffix}.pdf"
+    
+    return send_report_file(pdf_path, stat, download_name, "application/pdf", headers)
 
 
 @app.post("/api/reports/{report_id}/generate-pdf")
-async def generate_report_pdf(report_id: str):
+async def generate_report_pdf(
+    report_id: str,
+    force: bool = False,
+    profile: str = Query(DEFAULT_PDF_PROFILE, description="PDF输出配置: standard, screen, print, draft"),
+    profiling: Optional[str] = Header(None, alias="X-Profiling", description="性能分析方式: cprofile, sample（需管理令牌）"),
+    profiling_token: Optional[str] = Header(None, alias="X-Profiling-Token", description="性能分析管理令牌"),
+    async_job: bool = Query(False, alias="async", description="作为异步任务提交，立即返回任务ID")
+):
     """
     为指定报告生成PDF版本
+    
+    报告数据、引用图片和生成器均未变化时直接返回缓存的PDF，
+    传入force=true可强制重新生成。
+    传入async=true时返回202和任务ID，通过 /api/jobs/{job_id} 查询结果。
+    携带 X-Profiling 和 X-Profiling-Token 请求头时忽略缓存重新渲染，渲染在分析器下运行，
+    响应中的 profiling_url 为分析结果的下载地址。
     """
-    if report_id not in reports_db:
+    if not metadata_store.has_report(report_id):
         raise HTTPException(status_code=404, detail="报告不存在")
+    profile = resolve_pdf_profile(profile)
+    profiling = resolve_profiling(profiling, profiling_token)
+    render, profile_path = profiled(render_pdf, profiling, report_id, f"pdf-{profile}")
     
-    report_info = reports_db[report_id]
-    report_data = report_info.get('data', {})
-    
-    # PDF文件路径
-    pdf_filename = f"{report_id}.pdf"
-    pdf_path = REPORTS_DIR / pdf_filename
-    
-    try:
-        generate_tara_pdf_from_json(str(pdf_path), report_data)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"PDF生成失败: {str(e)}")
-    
-    # 获取文件大小
-    file_size = pdf_path.stat().st_size if pdf_path.exists() else 0
+    async def build() -> Dict[str, Any]:
+        try:
+            pdf_path, cached = await render_report_pdf(
+                report_id, profile, force=force or profiling is not None, render=render
+            )
+        except (JobQueueFullError, JobManagerClosedError) as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"PDF生成失败: {str(e)}")
+        
+        # 获取文件大小
+        file_size = pdf_path.stat().st_size if pdf_path.exists() else 0
+        
+        return {
+            "success": True,
+            "message": "PDF报告已是最新" if cached else "PDF报告生成成功",
+            "pdf_path": str(pdf_path),
+            "file_size": file_size,
+            "cached": cached,
+            "profile": profile,
+            "download_url": f"/api/reports/{report_id}/download/pdf?profile={profile}",
+            "profiling_url": profiling_url(report_id, profile_path)
+        }
     
-    return {
-        "success": True,
-        "message": "PDF报告生成成功",
-        "pdf_path": str(pdf_path),
-        "file_size": file_size,
-        "download_url": f"/api/reports/{report_id}/download/pdf"
-    }
+    if async_job:
+        return submit_job('generate_pdf', build, {'report_id': report_id, 'profile': profile})
+    return await build()
 
 
 @app.delete("/api/reports/{report_id}")
 async def delete_report(report_id: str):
     """删除报告"""
-    if report_id not in reports_db:
+    report_info = metadata_store.get_report(report_id, include_data=False)
+    if not report_info:
         raise HTTPException(status_code=404, detail="报告不存在")
     
-    report_info = reports_db[report_id]
-    
     # 删除文件
     file_path = Path(report_info['file_path'])
     if file_path.exists():
         file_path.unlink()
     
+    # 删除该报告各输出配置的缓存PDF（需在删除报告数据前计算缓存键）
+    report_data = await load_report_data(report_id)
+    await asyncio.to_thread(discard_cached_pdfs, report_data)
+    
     # 从数据库删除
-    del reports_db[report_id]
+    metadata_store.delete_report(report_id)
+    payload_store.delete(report_id)
+    delete_artifacts(PROFILES_DIR, report_id)
     
     return {"success": True, "message": "报告已删除"}
 
 
+@app.get("/api/reports/{report_id}/trace")
+async def get_report_trace(report_id: str):
+    """
+    导出报告的生成时间线（Chrome trace-event格式，可在 chrome://tracing 或 ui.perfetto.dev 中打开）
+    包括报告生成和之后每次实际执行的PDF渲染，每次操作为一个线程
+    """
+    if not metadata_store.has_report(report_id):
+        raise HTTPException(status_code=404, detail="报告不存在")
+    traces = await asyncio.to_thread(metadata_store.get_traces, report_id)
+    return chrome_trace({report_id: traces})
+
+
+@app.get("/api/reports/{report_id}/profiles")
+async def list_report_profiles(
+    report_id: str,
+    profiling_token: Optional[str] = Header(None, alias="X-Profiling-Token", description="性能分析管理令牌")
+):
+    """列出报告的性能分析结果（需管理令牌）"""
+    check_profiling_token(profiling_token)
+    if not metadata_store.has_report(report_id):
+        raise HTTPException(status_code=404, detail="报告不存在")
+    
+    artifacts = await asyncio.to_thread(list_artifacts, PROFILES_DIR, report_id)
+    for item in artifacts:
+        item['download_url'] = f"/api/reports/{report_id}/profiles/{item['name']}"
+    return {"report_id": report_id, "profiles": artifacts}
+
+
+@app.get("/api/reports/{report_id}/profiles/{name}")
+async def download_report_profile(
+    report_id: str,
+    name: str,
+    format: str = Query('raw', description="raw: 原始文件; text: pstats文本摘要（仅cprofile）"),
+    sort: str = Query('cumulative', description="text摘要的排序: cumulative, tottime, calls"),
+    limit: int = Query(50, ge=1, le=1000, description="text摘要的函数数"),
+    profiling_token: Optional[str] = Header(None, alias="X-Profiling-Token", description="性能分析管理令牌")
+):
+    """
+    下载报告的性能分析结果（需管理令牌）
+    cprofile结果为pstats文件（python -m pstats / snakeviz 查看），sample结果为折叠栈文本（flamegraph.pl / speedscope 查看）
+    """
+    check_profiling_token(profiling_token)
+    path = find_artifact(PROFILES_DIR, report_id, name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="分析结果不存在")
+    
+    if format == 'text':
+        if path.suffix != PROFILING_MODES['cprofile']:
+            raise HTTPException(status_code=400, detail="只有cprofile结果支持文本摘要")
+        if sort not in ('cumulative', 'tottime', 'calls'):
+            raise HTTPException(status_code=400, detail="无效的排序方式。可选: cumulative, tottime, calls")
+        text = await asyncio.to_thread(format_pstats, path, sort, limit)
+        return PlainTextResponse(text)
+    if format != 'raw':
+        raise HTTPException(status_code=400, detail="无效的格式。可选格式: raw, text")
+    
+    media_type = "text/plain" if path.suffix == PROFILING_MODES['sample'] else "application/octet-stream"
+    return FileResponse(path, filename=path.name, media_type=media_type)
+
+
 @app.post("/api/upload/batch")
 async def upload_batch(
     json_file: UploadFile = File(..., description="JSON数据文件"),
@@ -498,112 +1506,114 @@ async def upload_batch(
     system_architecture_image: UploadFile = File(None, description="系统架构图"),
     software_architecture_image: UploadFile = File(None, description="软件架构图"),
     dataflow_image: UploadFile = File(None, description="数据流图"),
-    attack_tree_images: List[UploadFile] = File(None, description="攻击树图片列表")
+    attack_tree_images: List[UploadFile] = File(None, description="攻击树图片列表"),
+    prerender_pdf: Optional[bool] = Form(None, description="是否在后台预渲染PDF(默认取TARA_PDF_PRERENDER)"),
+    async_job: bool = Query(False, alias="async", description="作为异步任务提交，立即返回任务ID"),
+    trace: Optional[TraceRecorder] = Depends(generation_trace('upload_batch'))
 ):
     """
     批量上传JSON和图片文件，一键生成报告
     
     这个端点同时接收JSON数据文件和所有图片文件，
     自动处理图片保存和路径关联，然后生成Excel报告。
-    支持上传多张攻击树图片。
+    支持上传多张攻击树图片，所有图片并发保存；
+    无法保存的图片不影响报告生成，在响应的image_errors中逐个列出。
+    传入async=true时图片保存后即返回202和任务ID，Excel在后台生成。
     """
     # 解析JSON数据
     try:
-        content = await json_file.read()
-        report_data = json.loads(content.decode('utf-8'))
+        report_data = await read_json_upload(json_file)
     except json.JSONDecodeError as e:
         raise HTTPException(status_code=400, detail=f"JSON文件格式错误: {str(e)}")
     
-    # 确保definitions和assets存在
-    if 'definitions' not in report_data:
-        report_data['definitions'] = {}
-    if 'assets' not in report_data:
-        report_data['assets'] = {}
-    if 'attack_trees' not in report_data:
-        report_data['attack_trees'] = {'attack_trees': []}
-    
-    # 辅助函数：保存上传的图片并返回路径
-    async def save_uploaded_image(upload_file: UploadFile, image_type: str) -> Optional[str]:
-        if not upload_file or not upload_file.filename:
-            return None
+    # 校验并规范化（之后所有部分和字段都存在）
+    report_data = await validate_report_data(report_data)
+    
+    # 辅助函数：保存上传的图片并返回路径，失败时记录到image_errors
+    image_errors: List[Dict[str, Any]] = []
+    semaphore = asyncio.Semaphore(BATCH_IMAGE_CONCURRENCY)
+    
+    async def save_uploaded_image(upload_file: UploadFile, image_type: str, field: str) -> Optional[str]:
+        def fail(error: str) -> None:
+            image_errors.append({'field': field, 'filename': upload_file.filename, 'error': error})
         
         file_ext = Path(upload_file.filename).suffix.lower()
-        if file_ext not in {'.png', '.jpg', '.jpeg', '.gif', '.bmp', '.svg'}:
+        if file_ext not in ALLOWED_IMAGE_EXTENSIONS:
+            fail(f"不支持的文件格式: {file_ext or '无扩展名'}")
             return None
         
-        image_id = generate_image_id()
-        filename = f"{image_id}{file_ext}"
-        file_path = IMAGES_DIR / filename
-        
-        try:
-            async with aiofiles.open(file_path, 'wb') as f:
-                img_content = await upload_file.read()
-                await f.write(img_content)
+        async with semaphore:
+            try:
+                spooled = await spool_upload(upload_file, IMAGES_DIR, MAX_IMAGE_SIZE)
+            except UploadTooLargeError as e:
+                fail(str(e))
+                return None
+            except Exception as e:
+                fail(f"文件读取失败: {e}")
+                return None
             
-            # 记录图片信息
-            images_db[image_id] = {
-                'id': image_id,
-                'type': image_type,
-                'filename': filename,
-                'path': str(file_path),
-                'original_name': upload_file.filename,
-                'created_at': datetime.now().isoformat()
-            }
+            if not sniff_image_type(spooled.header):
+                spooled.discard()
+                fail("不是有效的图片")
+                return None
             
-            return str(file_path)
-        except Exception as e:
-            print(f"Failed to save image {upload_file.filename}: {e}")
-            return None
+            try:
+                return (await asyncio.to_thread(store_image, spooled, image_type))['path']
+            except Exception as e:
+                spooled.discard()
+                fail(f"文件保存失败: {e}")
+                return None
+    
+    # 并发保存所有图片（读取、校验、写入和登记），并发数受限
+    single_images = [
+        (field, upload_file) for field, upload_file in (
+            ('item_boundary', item_boundary_image),
+            ('system_architecture', system_architecture_image),
+            ('software_architecture', software_architecture_image),
+            ('dataflow', dataflow_image)
+        )
+        if upload_file and upload_file.filename
+    ]
+    attack_tree_uploads = [
+        (i, attack_img) for i, attack_img in enumerate(attack_tree_images or [])
+        if attack_img and attack_img.filename
+    ]
+    saved = await asyncio.gather(
+        *(save_uploaded_image(upload_file, field, f"{field}_image") for field, upload_file in single_images),
+        *(save_uploaded_image(attack_img, f'attack_tree_{i}', f'attack_tree_images[{i}]')
+          for i, attack_img in attack_tree_uploads)
+    )
+    single_paths = dict(zip((field for field, _ in single_images), saved[:len(single_images)]))
+    attack_tree_saved = saved[len(single_images):]
     
-    # 保存各类图片并更新JSON数据中的路径
+    # 更新JSON数据中的路径
     image_paths = {}
-    
-    if item_boundary_image and item_boundary_image.filename:
-        path = await save_uploaded_image(item_boundary_image, 'item_boundary')
+    for field, path in single_paths.items():
         if path:
-            report_data['definitions']['item_boundary_image'] = path
-            image_paths['item_boundary'] = path
-    
-    if system_architecture_image and system_architecture_image.filename:
-        path = await save_uploaded_image(system_architecture_image, 'system_architecture')
-        if path:
-            report_data['definitions']['system_architecture_image'] = path
-            image_paths['system_architecture'] = path
-    
-    if software_architecture_image and software_architecture_image.filename:
-        path = await save_uploaded_image(software_architecture_image, 'software_architecture')
-        if path:
-            report_data['definitions']['software_architecture_image'] = path
-            image_paths['software_architecture'] = path
-    
-    if dataflow_image and dataflow_image.filename:
-        path = await save_uploaded_image(dataflow_image, 'dataflow')
-        if path:
-            report_data['assets']['dataflow_image'] = path
-            image_paths['dataflow'] = path
+            section = 'assets' if field == 'dataflow' else 'definitions'
+            report_data[section][f'{field}_image'] = path
+            image_paths[field] = path
     
     # 处理攻击树图片
     attack_tree_paths = []
     if attack_tree_images:
-        existing_trees = report_data.get('attack_trees', {}).get('attack_trees', [])
+        existing_trees = report_data['attack_trees']['attack_trees']
         
-        for i, attack_img in enumerate(attack_tree_images):
-            if attack_img and attack_img.filename:
-                path = await save_uploaded_image(attack_img, f'attack_tree_{i}')
-                if path:
-                    attack_tree_paths.append(path)
-                    
-                    # 更新或创建攻击树条目
-                    if i < len(existing_trees):
-                        existing_trees[i]['image'] = path
-                    else:
-                        # 创建新的攻击树条目
-                        existing_trees.append({
-                            'asset_id': f'AT{i+1:03d}',
-                            'asset_name': f'攻击树 {i+1}',
-                            'title': f'攻击树分析 {i+1}',
-                            'image': path
-                        })
+        for (i, _), path in zip(attack_tree_uploads, attack_tree_saved):
+            if path:
+                attack_tree_paths.append(path)
+                
+                # 更新或创建攻击树条目
+                if i < len(existing_trees):
+                    existing_trees[i]['image'] = path
+                else:
+                    # 创建新的攻击树条目
+                    existing_trees.append(AttackTree(
+                        asset_id=f'AT{i+1:03d}',
+                        asset_name=f'攻击树 {i+1}',
+                        title=f'攻击树分析 {i+1}',
+                        image=path
+                    ).model_dump())
         
         report_data['attack_trees']['attack_trees'] = existing_trees
         image_paths['attack_trees'] = attack_tree_paths
@@ -613,114 +1623,375 @@ async def upload_batch(
     output_filename = f"{report_id}.xlsx"
     output_path = REPORTS_DIR / output_filename
     
-    # 生成Excel报告
-    try:
-        generate_tara_excel_from_json(str(output_path), report_data)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"报告生成失败: {str(e)}")
-    
-    # 计算统计信息
-    statistics = calculate_statistics(report_data)
-    
-    # 获取文件大小
-    file_size = output_path.stat().st_size if output_path.exists() else 0
-    
-    # 存储报告信息
-    report_info = {
-        'id': report_id,
-        'name': report_data.get('cover', {}).get('report_title', 'TARA报告'),
-        'project_name': report_data.get('cover', {}).get('project_name', '未命名项目'),
-        'version': report_data.get('cover', {}).get('version', '1.0'),
-        'created_at': datetime.now().isoformat(),
-        'status': 'completed',
-        'file_path': str(output_path),
-        'file_size': file_size,
-        'statistics': statistics,
-        'image_paths': image_paths,
-        'data': report_data  # 保存原始数据用于预览
-    }
-    reports_db[report_id] = report_info
-    
-    # 构建响应
-    return {
-        'success': True,
-        'message': '报告生成成功',
-        'report_info': {
+    async def build() -> Dict[str, Any]:
+        # 在工作进程中生成Excel报告
+        await run_excel_generation(output_path, report_data)
+        
+        # 计算统计信息
+        statistics = calculate_statistics(report_data)
+        
+        # 获取文件大小
+        file_size = output_path.stat().st_size if output_path.exists() else 0
+        
+        # 存储报告信息
+        report_info = {
             'id': report_id,
-            'name': report_info['name'],
-            'version': report_info['version'],
-            'created_at': report_info['created_at'],
-            'file_path': report_info['file_path'],
+            'name': report_data['cover']['report_title'] or 'TARA报告',
+            'project_name': report_data['cover']['project_name'] or '未命名项目',
+            'document_number': report_data['cover']['document_number'],
+            'version': report_data['cover']['version'],
+            'created_at': datetime.now().isoformat(),
+            'status': 'completed',
+            'file_path': str(output_path),
             'file_size': file_size,
-            'statistics': statistics
-        },
-        'download_url': f"/api/reports/{report_id}/download",
-        'preview_url': f"/api/reports/{report_id}/preview"
-    }
+            'statistics': statistics,
+            'image_paths': image_paths,
+            'image_urls': image_urls_from_paths(image_paths),
+            'pdf_status': 'none'
+        }
+        await save_report(report_info, report_data)
+        await save_trace(trace, report_id)
+        
+        if PDF_PRERENDER if prerender_pdf is None else prerender_pdf:
+            schedule_pdf_prerender(report_id)
+        
+        # 构建响应
+        return {
+            'success': True,
+            'message': '报告生成成功',
+            'report_info': {
+                'id': report_id,
+                'name': report_info['name'],
+                'version': report_info['version'],
+                'created_at': report_info['created_at'],
+                'file_path': report_info['file_path'],
+                'file_size': file_size,
+                'statistics': statistics
+            },
+            'download_url': f"/api/reports/{report_id}/download",
+            'preview_url': f"/api/reports/{report_id}/preview",
+            'image_errors': image_errors
+        }
+    
+    release = partial(discard_json_source, report_data)
+    if async_job:
+        return submit_job('upload_batch', build, {'report_id': report_id}, cleanup=release)
+    try:
+        return await build()
+    finally:
+        release()
 
 
 @app.get("/api/reports/{report_id}/preview")
-async def get_report_preview(report_id: str):
-    """获取报告预览数据"""
-    if report_id not in reports_db:
+async def get_report_preview(
+    report_id: str,
+    request: Request,
+    fields: Optional[str] = Query(None, description="只返回指定的顶层字段（逗号分隔），如 report_info,statistics"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="资产和TARA结果列表每页条数，默认返回全部"),
+    offset: int = Query(0, ge=0, description="资产和TARA结果列表的起始位置"),
+    assets_cursor: Optional[str] = Query(None, description="资产列表的分页游标：上一页响应中的 page.assets.next_cursor（优先于offset）"),
+    results_cursor: Optional[str] = Query(None, description="TARA结果列表的分页游标：上一页响应中的 page.tara_results.next_cursor（优先于offset）")
+):
+    """
+    获取报告预览数据（支持ETag条件请求）
+    
+    指定 fields 时只构建和返回这些字段；指定 limit/offset/游标时资产和TARA结果列表分页返回，
+    响应的 page 中包含各列表的总数和下一页游标；两个列表分别用 assets_cursor / results_cursor 翻页。
+    """
+    selected, offsets = parse_view_params(
+        fields, REPORT_PREVIEW_FIELDS, offset, {'assets': assets_cursor, 'tara_results': results_cursor}
+    )
+    report_info = metadata_store.get_report(report_id, include_data=False)
+    if not report_info:
         raise HTTPException(status_code=404, detail="报告不存在")
     
-    report_info = reports_db[report_id]
-    report_data = report_info.get('data', {})
+    headers = cache_headers(report_etag('preview', report_info, request.url.query))
+    if is_not_modified(request, headers['ETag']):
+        return not_modified(headers)
+    
+    def wanted(name: str) -> bool:
+        return selected is None or name in selected
+    
+    # 只包含报告信息和统计时不需要加载报告数据
+    needs_data = any(wanted(name) for name in REPORT_PREVIEW_FIELDS if name not in ('report_info', 'statistics'))
+    report_data = await load_report_data(report_id) if needs_data else {}
     image_paths = report_info.get('image_paths', {})
     
     # 辅助函数：将文件路径转换为API URL
     def path_to_url(file_path: Optional[str]) -> Optional[str]:
         if not file_path:
             return None
-        # 从images_db中查找对应的image_id
-        for img_id, img_info in images_db.items():
-            if img_info['path'] == file_path:
-                return f"/api/images/{img_id}"
-        return None
-    
-    # 构建图片URL映射
-    images_urls = {
-        'item_boundary': path_to_url(image_paths.get('item_boundary')),
-        'system_architecture': path_to_url(image_paths.get('system_architecture')),
-        'software_architecture': path_to_url(image_paths.get('software_architecture')),
-        'dataflow': path_to_url(image_paths.get('dataflow'))
-    }
-    
-    # 处理攻击树数据，添加图片URL
-    attack_trees = []
-    for tree in report_data.get('attack_trees', {}).get('attack_trees', []):
-        tree_copy = dict(tree)
-        if tree.get('image'):
-            tree_copy['image_url'] = path_to_url(tree['image'])
-        attack_trees.append(tree_copy)
-    
-    # 构建预览数据
-    preview_data = {
-        'report_info': {
+        # 按路径索引查找对应的image_id
+        image_id = metadata_store.find_image_id_by_path(file_path)
+        return f"/api/images/{image_id}" if image_id else None
+    
+    # 构建预览数据（未请求的字段不构建）
+    preview_data: Dict[str, Any] = {}
+    if wanted('report_info'):
+        preview_data['report_info'] = {
             'id': report_id,
             'name': report_info['name'],
             'version': report_info.get('version', '1.0'),
             'created_at': report_info['created_at'],
             'file_path': report_info['file_path'],
             'file_size': report_info.get('file_size', 0),
+            'pdf_status': report_info.get('pdf_status', 'none'),
             'statistics': report_info['statistics']
-        },
-        'cover': report_data.get('cover', {}),
-        'definitions': {
+        }
+    if wanted('cover'):
+        preview_data['cover'] = report_data.get('cover', {})
+    if wanted('definitions'):
+        preview_data['definitions'] = {
             **report_data.get('definitions', {}),
-            'item_boundary_image': images_urls['item_boundary'],
-            'system_architecture_image': images_urls['system_architecture'],
-            'software_architecture_image': images_urls['software_architecture']
-        },
-        'assets': report_data.get('assets', {}).get('assets', []),
-        'dataflow_image': images_urls['dataflow'],
-        'attack_trees': attack_trees,
-        'tara_results': report_data.get('tara_results', {}).get('results', []),
-        'statistics': report_info['statistics']
-    }
+            'item_boundary_image': path_to_url(image_paths.get('item_boundary')),
+            'system_architecture_image': path_to_url(image_paths.get('system_architecture')),
+            'software_architecture_image': path_to_url(image_paths.get('software_architecture'))
+        }
+    if wanted('assets'):
+        preview_data['assets'] = report_data.get('assets', {}).get('assets', [])
+    if wanted('dataflow_image'):
+        preview_data['dataflow_image'] = path_to_url(image_paths.get('dataflow'))
+    if wanted('attack_trees'):
+        # 处理攻击树数据，添加图片URL
+        attack_trees = []
+        for tree in report_data.get('attack_trees', {}).get('attack_trees', []):
+            tree_copy = dict(tree)
+            if tree.get('image'):
+                tree_copy['image_url'] = path_to_url(tree['image'])
+            attack_trees.append(tree_copy)
+        preview_data['attack_trees'] = attack_trees
+    if wanted('tara_results'):
+        preview_data['tara_results'] = report_data.get('tara_results', {}).get('results', [])
+    if wanted('statistics'):
+        preview_data['statistics'] = report_info['statistics']
+    
+    if limit is not None or any(offsets.values()):
+        preview_data['page'] = paginate_lists(
+            preview_data,
+            {'assets': ('assets',), 'tara_results': ('tara_results',)},
+            offsets, limit or DEFAULT_PAGE_SIZE
+        )
     
-    return JSONResponse(content=preview_data)
+    return FastJSONResponse(content=preview_data, headers=headers)
+
+
+@app.post("/api/reports/batch")
+async def generate_report_batch(
+    json_files: List[UploadFile] = File(None, description="JSON数据文件列表"),
+    archive: UploadFile = File(None, description="包含多个JSON数据文件的zip压缩包"),
+    prerender_pdf: Optional[bool] = Form(None, description="是否在后台预渲染PDF(默认取TARA_PDF_PRERENDER)"),
+    async_job: bool = Query(False, alias="async", description="作为异步任务提交，立即返回任务ID")
+):
+    """
+    批量生成TARA报告
+    
+    通过多个json_files或一个zip压缩包(archive)提交多个报告文档，各报告在工作进程中并行生成。
+    单个文档格式错误、校验失败或生成失败不影响其他报告，响应的items中逐项列出状态和报告ID，
+    所有生成的报告可通过 archive_url 打包下载。
+    传入async=true时文件接收后即返回202和任务ID，报告在后台生成。
+    """
+    uploads = [upload for upload in json_files or [] if upload and upload.filename]
+    if not uploads and not (archive and archive.filename):
+        raise HTTPException(status_code=400, detail="请提供JSON文件或zip压缩包")
+    
+    # 上传的zip压缩包写入临时文件，其中的文档在生成时逐个读取
+    archive_upload: Optional[SpooledUpload] = None
+    zip_names: List[str] = []
+    if archive and archive.filename:
+        try:
+            archive_upload = await spool_upload(archive, UPLOAD_TMP_DIR, MAX_JSON_SIZE)
+        except UploadTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        try:
+            zip_names = await asyncio.to_thread(list_zip_documents, archive_upload.path, MAX_BATCH_REPORTS)
+        except BatchArchiveError as e:
+            archive_upload.discard()
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    if len(uploads) + len(zip_names) > MAX_BATCH_REPORTS:
+        if archive_upload:
+            archive_upload.discard()
+        raise HTTPException(status_code=400, detail=f"一次最多提交{MAX_BATCH_REPORTS}个报告")
+    
+    # 上传的JSON文件在请求结束前读取；格式错误等记录在对应条目中
+    parsed = await asyncio.gather(*(read_json_upload(upload) for upload in uploads), return_exceptions=True)
+    
+    def release() -> None:
+        for data in parsed:
+            discard_json_source(data)
+        if archive_upload:
+            archive_upload.discard()
+    
+    async def load_upload(value: Any) -> Any:
+        if isinstance(value, BaseException):
+            raise value
+        return value
+    
+    def load_zip_member(name: str) -> Any:
+        data = read_zip_document(archive_upload.path, name, MAX_JSON_SIZE)
+        with phase('json.parse'):
+            return json_loads(data)
+    
+    documents: List[Tuple[str, Callable[[], Awaitable[Any]]]] = [
+        *((upload.filename, partial(load_upload, value)) for upload, value in zip(uploads, parsed)),
+        *((name, partial(asyncio.to_thread, load_zip_member, name)) for name in zip_names)
+    ]
+    
+    batch_id = generate_batch_id()
+    prerender = PDF_PRERENDER if prerender_pdf is None else prerender_pdf
+    # 同时处理的文档数：工作进程生成时，下一批文档的解析和校验可以同时进行，内存中的文档数有上限
+    semaphore = asyncio.Semaphore(JOB_WORKERS * 2)
+    
+    async def generate_item(index: int, name: str, load: Callable[[], Awaitable[Any]]) -> Dict[str, Any]:
+        item: Dict[str, Any] = {'index': index, 'name': name, 'status': 'failed'}
+        report_data = None
+        async with semaphore:
+            # 每个文档单独记录时间线，合并导出时可以看到并发生成的重叠
+            with record_trace('batch_generate') as trace:
+                try:
+                    report_data = await load()
+                    report_data = await asyncio.to_thread(normalize_report_data, report_data)
+                    report_info = await create_report(report_data, prerender)
+                except json.JSONDecodeError as e:
+                    item['error'] = f"JSON格式错误: {e}"
+                except ReportDataError as e:
+                    item['error'] = f"报告数据校验失败: {e}"
+                    item['errors'] = e.errors[:MAX_VALIDATION_ERRORS]
+                except HTTPException as e:
+                    item['error'] = e.detail
+                except Exception as e:
+                    item['error'] = str(e)
+                else:
+                    report_id = report_info['id']
+                    item.update({
+                        'status': 'succeeded',
+                        'report_id': report_id,
+                        'project_name': report_info['project_name'],
+                        'statistics': report_info['statistics'],
+                        'download_url': f"/api/reports/{report_id}/download",
+                        'preview_url': f"/api/reports/{report_id}/preview"
+                    })
+                    await save_trace(trace, report_id)
+                finally:
+                    discard_json_source(report_data)
+        return item
+    
+    async def build() -> Dict[str, Any]:
+        items = await asyncio.gather(
+            *(generate_item(index, name, load) for index, (name, load) in enumerate(documents))
+        )
+        succeeded = sum(1 for item in items if item['status'] == 'succeeded')
+        created_at = datetime.now().isoformat()
+        manifest = {
+            'batch_id': batch_id,
+            'created_at': created_at,
+            'total': len(items),
+            'succeeded': succeeded,
+            'failed': len(items) - succeeded,
+            'items': items,
+            'archive_url': f"/api/reports/batch/{batch_id}/archive" if succeeded else None
+        }
+        await asyncio.to_thread(metadata_store.add_batch, batch_id, created_at, manifest)
+        return {
+            'success': succeeded == len(items),
+            'message': f"共{len(items)}个报告，成功{succeeded}个，失败{len(items) - succeeded}个",
+            **manifest
+        }
+    
+    if async_job:
+        return submit_job('generate_batch', build, {'batch_id': batch_id}, cleanup=release)
+    try:
+        return await build()
+    finally:
+        release()
+
+
+@app.get("/api/reports/batch/{batch_id}")
+async def get_report_batch(batch_id: str):
+    """获取批量生成的状态清单"""
+    manifest = await asyncio.to_thread(metadata_store.get_batch, batch_id)
+    if manifest is None:
+        raise HTTPException(status_code=404, detail="批量生成记录不存在")
+    return manifest
+
+
+@app.get("/api/reports/batch/{batch_id}/trace")
+async def get_report_batch_trace(batch_id: str):
+    """导出批量生成中所有报告的时间线（Chrome trace-event格式，每个报告为一个进程，可查看并发生成的重叠）"""
+    manifest = await asyncio.to_thread(metadata_store.get_batch, batch_id)
+    if manifest is None:
+        raise HTTPException(status_code=404, detail="批量生成记录不存在")
+    
+    def load_traces() -> Dict[str, List[Dict[str, Any]]]:
+        return {
+            item['report_id']: metadata_store.get_traces(item['report_id'])
+            for item in manifest['items'] if item['status'] == 'succeeded'
+        }
+    
+    return chrome_trace(await asyncio.to_thread(load_traces))
+
+
+@app.get("/api/reports/batch/{batch_id}/archive")
+async def download_report_batch(batch_id: str, request: Request):
+    """
+    下载批量生成的所有报告（zip，含manifest.json状态清单）
+    首次下载时打包并保存，之后直接发送；已删除的报告不包含在内
+    """
+    manifest = await asyncio.to_thread(metadata_store.get_batch, batch_id)
+    if manifest is None:
+        raise HTTPException(status_code=404, detail="批量生成记录不存在")
+    
+    archive_path = BATCH_DIR / f"{batch_id}.zip"
+    if not archive_path.exists():
+        files = []
+        for item in manifest['items']:
+            if item['status'] != 'succeeded':
+                continue
+            report_info = metadata_store.get_report(item['report_id'], include_data=False)
+            if report_info and Path(report_info['file_path']).exists():
+                files.append((archive_member_name(item), Path(report_info['file_path'])))
+        if not files:
+            raise HTTPException(status_code=404, detail="没有可下载的报告")
+        await asyncio.to_thread(build_batch_archive, archive_path, manifest, files)
+    
+    stat = archive_path.stat()
+    last_modified = datetime.fromtimestamp(stat.st_mtime)
+    headers = cache_headers(file_etag('batch', batch_id, stat), last_modified, REPORT_FILE_CACHE_CONTROL)
+    if is_not_modified(request, headers['ETag'], last_modified):
+        return not_modified(headers)
+    
+    return send_report_file(archive_path, stat, f"{batch_id}.zip", "application/zip", headers)
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=60, description="等待任务完成的最长秒数，0表示立即返回")
+):
+    """
+    查询异步任务状态
+    
+    状态: queued / running / succeeded / failed / cancelled
+    任务成功时 result 为对应同步接口的响应内容。
+    """
+    job = await job_manager.describe(job_id, wait)
+    if not job:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return job
+
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """
+    取消异步任务（已在生成中的报告会被丢弃）
+    其他服务进程的任务由其所属进程在开始运行前或结束时取消
+    """
+    job = await asyncio.to_thread(job_manager.request_cancel, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    if job['status'] in ('succeeded', 'failed', 'cancelled'):
+        raise HTTPException(status_code=409, detail=f"任务已结束: {job['status']}")
+    return {"success": True, "message": "任务已取消", "job_id": job_id}
 
 
 @app.get("/api/health")
@@ -729,20 +2000,58 @@ async def health_check():
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "reports_count": len(reports_db),
-        "images_count": len(images_db)
+        "reports_count": metadata_store.count_reports(),
+        "images_count": metadata_store.count_images(),
+        "jobs_pending": job_manager.pending_count,
+        "startup_seconds": getattr(app.state, 'startup_seconds', None),
+        "renderers_loaded": is_loaded()
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus格式的运行指标（本服务进程）"""
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+
 # ==================== 启动函数 ====================
-def run_server():
-    """启动服务器"""
+def run_server(argv: Optional[List[str]] = None):
+    """
+    启动服务器
+    默认为开发模式（单进程，代码修改后自动重载）；生产模式关闭自动重载，启动多个服务进程，
+    已安装时使用uvloop事件循环和httptools解析HTTP。报告、图片和任务状态保存在数据库和磁盘上，
+    任一服务进程都能访问其他进程创建的报告
+    """
+    import argparse
+    import importlib.util
     import uvicorn
+    
+    parser = argparse.ArgumentParser(description='TARA报告生成API服务')
+    parser.add_argument('--host', default=os.environ.get('TARA_HOST', '0.0.0.0'), help='监听地址')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('TARA_PORT', '8000')), help='监听端口')
+    parser.add_argument('--production', action='store_true',
+                        default=os.environ.get('TARA_ENV', '').lower() == 'production',
+                        help='生产模式（默认取TARA_ENV=production）')
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('TARA_WORKERS', '0')) or None,
+                        help='服务进程数，指定时以生产模式启动（默认CPU核数）')
+    args = parser.parse_args(argv)
+    
+    if not (args.production or args.workers):
+        uvicorn.run("tara_api.main:app", host=args.host, port=args.port, reload=True)
+        return
+    
+    cpu_count = os.cpu_count() or 1
+    workers = args.workers or cpu_count
+    # 每个服务进程有自己的报告生成进程池，未指定时按服务进程数分摊CPU核数
+    os.environ.setdefault('TARA_JOB_WORKERS', str(max(1, cpu_count // workers)))
     uvicorn.run(
         "tara_api.main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        loop='uvloop' if importlib.util.find_spec('uvloop') else 'asyncio',
+        http='httptools' if importlib.util.find_spec('httptools') else 'h11',
+        reload=False
     )
 
 
@@ -0,0 +1,305 @@
+"""
+服务运行指标（Prometheus 文本格式）
+计数器、仪表和直方图都在进程内累加，记录一次只是加锁后的几次加法，不依赖 prometheus_client；
+/metrics 请求时才格式化输出。多进程部署时每个服务进程各自统计，由Prometheus按实例汇总。
+"""
+import os
+import time
+import threading
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+# Prometheus 文本格式的 Content-Type
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 耗时直方图的桶（秒）
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# 文件大小直方图的桶（字节）
+SIZE_BUCKETS = tuple(float(1024 * 4 ** i) for i in range(2, 12))  # 16KB ~ 4GB
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    """指标基类：按标签值分组保存数据"""
+    type_name = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} 需要标签: {', '.join(self.labelnames)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+            *self.samples()
+        ]
+
+
+class Counter(_Metric):
+    """只增不减的计数"""
+    type_name = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in values]
+
+
+class Gauge(_Metric):
+    """可增可减的当前值"""
+    type_name = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in values]
+
+
+class Histogram(_Metric):
+    """分布统计：每个桶只记录落在该区间的次数，输出时再累加为Prometheus的累计桶"""
+    type_name = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Tuple[float, ...] = DURATION_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 标签值 -> [各桶计数（最后一个为+Inf）, 总和]
+        self._data: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            data = self._data.get(key)
+            if data is None:
+                data = self._data[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            data[0][index] += 1
+            data[1][0] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(counts), total[0]) for key, (counts, total) in self._data.items()]
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """指标集合；collectors 在输出前调用，用于更新按需读取的仪表（如内存占用）"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """输出Prometheus文本格式"""
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                print(f"指标采集失败: {e}")
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+# ==================== 指标定义 ====================
+
+registry = Registry()
+
+http_requests_total = registry.register(Counter(
+    'tara_http_requests_total', '按路由统计的HTTP请求数', ('method', 'route', 'status')
+))
+http_request_duration_seconds = registry.register(Histogram(
+    'tara_http_request_duration_seconds', '按路由统计的HTTP请求耗时（秒）', ('method', 'route')
+))
+generation_phase_duration_seconds = registry.register(Histogram(
+    'tara_generation_phase_duration_seconds', '报告生成各阶段耗时（秒）', ('phase',)
+))
+generation_duration_seconds = registry.register(Histogram(
+    'tara_generation_duration_seconds', '报告生成总耗时（秒）', ('format', 'outcome')
+))
+generations_in_progress = registry.register(Gauge(
+    'tara_generations_in_progress', '进行中的报告生成数', ('format',)
+))
+report_output_bytes = registry.register(Histogram(
+    'tara_report_output_bytes', '生成的报告文件大小（字节）', ('format',), buckets=SIZE_BUCKETS
+))
+jobs_pending = registry.register(Gauge(
+    'tara_jobs_pending', '排队和运行中的后台任务数'
+))
+process_resident_memory_bytes = registry.register(Gauge(
+    'process_resident_memory_bytes', '服务进程常驻内存（字节）'
+))
+worker_resident_memory_bytes = registry.register(Gauge(
+    'tara_worker_resident_memory_bytes', '报告生成工作进程常驻内存合计（字节）'
+))
+
+for _format in ('xlsx', 'pdf'):
+    generations_in_progress.set(0, format=_format)
+
+
+def observe_phase(name: str, start: float, end: float) -> None:
+    """阶段监听器：记录生成阶段耗时（注册为 instrumentation 的进程级监听器）"""
+    generation_phase_duration_seconds.observe(end - start, phase=name)
+
+
+async def track_generation(output_format: str, run: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """执行一次报告生成（run为返回awaitable的函数），记录进行中数量和总耗时"""
+    generations_in_progress.inc(format=output_format)
+    start = time.perf_counter()
+    outcome = 'error'
+    try:
+        result = await run(*args, **kwargs)
+        outcome = 'success'
+        return result
+    finally:
+        generations_in_progress.dec(format=output_format)
+        generation_duration_seconds.observe(time.perf_counter() - start, format=output_format, outcome=outcome)
+
+
+def observe_output(output_format: str, path: Any) -> None:
+    """记录生成的报告文件大小"""
+    try:
+        report_output_bytes.observe(os.path.getsize(path), format=output_format)
+    except OSError:
+        pass
+
+
+# ==================== 进程内存 ====================
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def resident_memory_bytes(pid: Optional[int] = None) -> Optional[int]:
+    """
+    读取进程常驻内存（/proc/<pid>/statm）
+    没有 /proc 时（如macOS）本进程退回 getrusage 的峰值常驻内存，其他进程返回None
+    """
+    try:
+        with open(f"/proc/{pid or 'self'}/statm", 'rb') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        pass
+    if pid is not None:
+        return None
+    try:
+        import resource
+        import sys
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux以KB为单位，macOS以字节为单位
+        return maxrss if sys.platform == 'darwin' else maxrss * 1024
+    except (ImportError, OSError):
+        return None
+
+
+# ==================== 请求指标中间件 ====================
+
+class MetricsMiddleware:
+    """
+    记录每个HTTP请求的路由、状态码和耗时
+    路由取匹配到的路径模板（如 /api/reports/{report_id}），不按实际路径展开，标签数量有界
+    """
+
+    def __init__(self, app: Callable, exclude: Iterable[str] = ('/metrics',)):
+        self.app = app
+        self.exclude = set(exclude)
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope['type'] != 'http' or scope.get('path') in self.exclude:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = getattr(scope.get('route'), 'path', None) or 'unmatched'
+            method = scope.get('method', '')
+            http_request_duration_seconds.observe(time.perf_counter() - start, method=method, route=route)
+            http_requests_total.inc(method=method, route=route, status=status)
+
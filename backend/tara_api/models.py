@@ -1,13 +1,34 @@
 """
 TARA API 数据模型定义
 """
-from typing import List, Optional, Any, Dict
-from pydantic import BaseModel, Field
+from dataclasses import replace
+from functools import lru_cache, partial
+from typing import List, Optional, Any, Dict, Tuple, Type, get_args, get_origin
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, model_validator
 from datetime import datetime
 
+from .json_stream import StreamedArray
+
+
+# ==================== 报告数据模型基类 ====================
+class ReportDataModel(BaseModel):
+    """
+    报告数据模型基类：保留模型未定义的字段，数字可作为文本字段的值；
+    模型字段值为null时视为缺失，取默认值（与生成器原先按空值处理一致）
+    """
+    model_config = ConfigDict(extra='allow', coerce_numbers_to_str=True)
+
+    @model_validator(mode='before')
+    @classmethod
+    def _drop_null_fields(cls, data: Any) -> Any:
+        if isinstance(data, dict) and any(value is None for value in data.values()):
+            fields = cls.model_fields
+            return {key: value for key, value in data.items() if value is not None or key not in fields}
+        return data
+
 
 # ==================== 封面数据模型 ====================
-class CoverData(BaseModel):
+class CoverData(ReportDataModel):
     """封面数据"""
     report_title: str = Field(default="威胁分析和风险评估报告", description="报告标题")
     report_title_en: str = Field(default="Threat Analysis And Risk Assessment Report", description="报告英文标题")
@@ -22,22 +43,22 @@ class CoverData(BaseModel):
 
 
 # ==================== 相关定义数据模型 ====================
-class Assumption(BaseModel):
+class Assumption(ReportDataModel):
     """假设条目"""
-    id: str = Field(description="假设编号")
-    description: str = Field(description="假设描述")
+    id: str = Field(default="", description="假设编号")
+    description: str = Field(default="", description="假设描述")
 
 
-class Terminology(BaseModel):
+class Terminology(ReportDataModel):
     """术语条目"""
-    abbreviation: str = Field(description="缩写")
-    english: str = Field(description="英文全称")
-    chinese: str = Field(description="中文名称")
+    abbreviation: str = Field(default="", description="缩写")
+    english: str = Field(default="", description="英文全称")
+    chinese: str = Field(default="", description="中文名称")
 
 
-class DefinitionsData(BaseModel):
+class DefinitionsData(ReportDataModel):
     """相关定义数据"""
-    title: str = Field(default="TARA分析报告 - 相关定义", description="标题")
+    title: Optional[str] = Field(default=None, description="标题（未提供时使用各生成器的默认标题）")
     functional_description: str = Field(default="", description="功能描述")
     item_boundary_image: Optional[str] = Field(default=None, description="项目边界图片路径")
     system_architecture_image: Optional[str] = Field(default=None, description="系统架构图片路径")
@@ -47,11 +68,11 @@ class DefinitionsData(BaseModel):
 
 
 # ==================== 资产列表数据模型 ====================
-class Asset(BaseModel):
+class Asset(ReportDataModel):
     """资产条目"""
-    id: str = Field(description="资产ID")
-    name: str = Field(description="资产名称")
-    category: str = Field(description="分类")
+    id: str = Field(default="", description="资产ID")
+    name: str = Field(default="", description="资产名称")
+    category: str = Field(default="", description="分类")
     remarks: str = Field(default="", description="备注")
     authenticity: bool = Field(default=False, description="真实性")
     integrity: bool = Field(default=False, description="完整性")
@@ -61,15 +82,15 @@ class Asset(BaseModel):
     authorization: bool = Field(default=False, description="权限")
 
 
-class AssetsData(BaseModel):
+class AssetsData(ReportDataModel):
     """资产列表数据"""
-    title: str = Field(default="资产列表 Asset List", description="标题")
+    title: Optional[str] = Field(default=None, description="标题（未提供时使用各生成器的默认标题）")
     dataflow_image: Optional[str] = Field(default=None, description="数据流图片路径")
     assets: List[Asset] = Field(default_factory=list, description="资产列表")
 
 
 # ==================== 攻击树数据模型 ====================
-class AttackTree(BaseModel):
+class AttackTree(ReportDataModel):
     """攻击树条目"""
     asset_id: str = Field(default="", description="资产ID")
     asset_name: str = Field(default="", description="资产名称")
@@ -78,25 +99,25 @@ class AttackTree(BaseModel):
     image_url: Optional[str] = Field(default=None, description="攻击树图片URL")
 
 
-class AttackTreesData(BaseModel):
+class AttackTreesData(ReportDataModel):
     """攻击树数据"""
-    title: str = Field(default="攻击树分析 Attack Tree Analysis", description="标题")
+    title: Optional[str] = Field(default=None, description="标题（未提供时使用各生成器的默认标题）")
     attack_trees: List[AttackTree] = Field(default_factory=list, description="攻击树列表")
 
 
 # ==================== TARA结果数据模型 ====================
-class TARAResult(BaseModel):
+class TARAResult(ReportDataModel):
     """TARA分析结果条目"""
-    asset_id: str = Field(description="资产ID")
-    asset_name: str = Field(description="资产名称")
+    asset_id: str = Field(default="", description="资产ID")
+    asset_name: str = Field(default="", description="资产名称")
     subdomain1: str = Field(default="", description="子域1")
     subdomain2: str = Field(default="", description="子域2")
     subdomain3: str = Field(default="", description="子域3")
-    category: str = Field(description="分类")
-    security_attribute: str = Field(description="安全属性")
-    stride_model: str = Field(description="STRIDE模型")
-    threat_scenario: str = Field(description="威胁场景")
-    attack_path: str = Field(description="攻击路径")
+    category: str = Field(default="", description="分类")
+    security_attribute: str = Field(default="", description="安全属性")
+    stride_model: str = Field(default="", description="STRIDE模型")
+    threat_scenario: str = Field(default="", description="威胁场景")
+    attack_path: str = Field(default="", description="攻击路径")
     wp29_mapping: str = Field(default="", description="WP29映射")
     attack_vector: str = Field(default="本地", description="攻击向量")
     attack_complexity: str = Field(default="低", description="攻击复杂度")
@@ -109,14 +130,14 @@ class TARAResult(BaseModel):
     security_requirement: str = Field(default="", description="安全需求")
 
 
-class TARAResultsData(BaseModel):
+class TARAResultsData(ReportDataModel):
     """TARA分析结果数据"""
-    title: str = Field(default="TARA分析结果 TARA Analysis Results", description="标题")
+    title: Optional[str] = Field(default=None, description="标题（未提供时使用各生成器的默认标题）")
     results: List[TARAResult] = Field(default_factory=list, description="TARA结果列表")
 
 
 # ==================== 完整报告数据模型 ====================
-class TARAReportData(BaseModel):
+class TARAReportData(ReportDataModel):
     """完整的TARA报告数据"""
     cover: CoverData = Field(default_factory=CoverData, description="封面数据")
     definitions: DefinitionsData = Field(default_factory=DefinitionsData, description="相关定义数据")
@@ -125,6 +146,135 @@ class TARAReportData(BaseModel):
     tara_results: TARAResultsData = Field(default_factory=TARAResultsData, description="TARA分析结果数据")
 
 
+# ==================== 报告数据规范化 ====================
+class ReportDict(dict):
+    """
+    规范化后的报告数据（normalize_report_data 的结果）
+    所有字段齐全且默认值统一，生成器和统计直接按键取值，不再重复校验
+    """
+
+
+def section_title(section: Dict[str, Any], default: str) -> str:
+    """部分的标题，未提供时取 default（Excel、PDF和预览各有自己的默认标题）"""
+    title = section['title']
+    return default if title is None else title
+
+
+class ReportDataError(ValueError):
+    """报告数据校验失败，errors 为 [{loc, msg, type}]"""
+
+    def __init__(self, errors: List[Dict[str, Any]]):
+        self.errors = errors
+        first = errors[0] if errors else {'loc': [], 'msg': ''}
+        location = '.'.join(str(part) for part in first['loc'])
+        more = f" 等{len(errors)}处错误" if len(errors) > 1 else ''
+        super().__init__(f"{location}: {first['msg']}{more}" if location else f"{first['msg']}{more}")
+
+
+# 增量解析时以 StreamedArray 形式出现的大数组：(部分, 字段, 条目模型)
+STREAMED_REPORT_FIELDS: Tuple[Tuple[str, str, Type[ReportDataModel]], ...] = (
+    ('assets', 'assets', Asset),
+    ('tara_results', 'results', TARAResult),
+)
+
+
+def _error_list(e: ValidationError, prefix: Tuple[Any, ...] = ()) -> List[Dict[str, Any]]:
+    return [
+        {'loc': [*prefix, *error['loc']], 'msg': error['msg'], 'type': error['type']}
+        for error in e.errors(include_url=False)
+    ]
+
+
+@lru_cache(maxsize=None)
+def _field_spec(model_cls: Type[ReportDataModel]) -> Tuple[Dict[str, Any], Dict[str, Tuple[type, bool]]]:
+    """模型字段的默认值（必填字段取类型的空值）和嵌套模型字段 {字段: (模型, 是否列表)}"""
+    defaults: Dict[str, Any] = {}
+    nested: Dict[str, Tuple[type, bool]] = {}
+    for name, field in model_cls.model_fields.items():
+        annotation = field.annotation
+        args = get_args(annotation)
+        if isinstance(annotation, type) and issubclass(annotation, ReportDataModel):
+            nested[name] = (annotation, False)
+        elif get_origin(annotation) is list and args and issubclass(args[0], ReportDataModel):
+            nested[name] = (args[0], True)
+        elif field.is_required():
+            defaults[name] = False if annotation is bool else ''
+        else:
+            defaults[name] = field.get_default(call_default_factory=True)
+    return defaults, nested
+
+
+def _fill_defaults(model_cls: Type[ReportDataModel], data: Any) -> Dict[str, Any]:
+    """只补全缺失字段（值为null视为缺失），不检查类型"""
+    defaults, nested = _field_spec(model_cls)
+    if isinstance(data, dict):
+        result = {**defaults, **{key: value for key, value in data.items() if value is not None}}
+    else:
+        result = dict(defaults)
+    for name, (item_cls, is_list) in nested.items():
+        value = result.get(name)
+        if not is_list:
+            result[name] = _fill_defaults(item_cls, value)
+        elif isinstance(value, StreamedArray):
+            continue
+        else:
+            result[name] = [_fill_defaults(item_cls, item) for item in value] if isinstance(value, list) else []
+    return result
+
+
+def load_report_item(item_model: Type[ReportDataModel], item: Any) -> Dict[str, Any]:
+    """校验并规范化增量解析数组中的一项"""
+    return item_model.model_validate(item).model_dump()
+
+
+def normalize_report_data(data: Any, validate: bool = True) -> ReportDict:
+    """
+    将报告数据校验一次并规范化为 ReportDict
+    
+    参数:
+        data: 报告数据（已是 ReportDict 时直接返回）
+        validate: 是否按 TARAReportData 完整校验；False 为轻量路径，
+            只补全缺失字段，用于入库时已校验过的数据
+    
+    增量解析的大数组（StreamedArray）逐项校验，内容仍留在文件中，迭代时逐项规范化。
+    校验失败抛出 ReportDataError。
+    """
+    if isinstance(data, ReportDict):
+        return data
+    if not isinstance(data, dict):
+        raise ReportDataError([{'loc': [], 'msg': '报告数据应为JSON对象', 'type': 'dict_type'}])
+    
+    streamed = {}
+    for section, field, item_model in STREAMED_REPORT_FIELDS:
+        section_data = data.get(section)
+        if isinstance(section_data, dict) and isinstance(section_data.get(field), StreamedArray):
+            streamed[(section, field)] = (section_data[field], item_model)
+    if streamed:
+        # 大数组之外的部分照常处理
+        data = dict(data)
+        for section, field in streamed:
+            data[section] = {**data[section], field: []}
+    
+    if validate:
+        try:
+            report = TARAReportData.model_validate(data).model_dump()
+        except ValidationError as e:
+            raise ReportDataError(_error_list(e))
+    else:
+        report = _fill_defaults(TARAReportData, data)
+    
+    for (section, field), (array, item_model) in streamed.items():
+        if validate:
+            for index, item in enumerate(array):
+                try:
+                    item_model.model_validate(item)
+                except ValidationError as e:
+                    raise ReportDataError(_error_list(e, (section, field, index)))
+        loader = partial(load_report_item if validate else _fill_defaults, item_model)
+        report[section][field] = replace(array, item_loader=loader)
+    return ReportDict(report)
+
+
 # ==================== API响应模型 ====================
 class GenerateReportResponse(BaseModel):
     """生成报告响应"""
@@ -132,7 +282,10 @@ class GenerateReportResponse(BaseModel):
     message: str = Field(description="消息")
     report_id: Optional[str] = Field(default=None, description="报告ID")
     download_url: Optional[str] = Field(default=None, description="下载URL")
+    preview_url: Optional[str] = Field(default=None, description="完整预览数据URL（支持字段投影和分页）")
     preview_data: Optional[Dict[str, Any]] = Field(default=None, description="预览数据")
+    reused: bool = Field(default=False, description="是否复用了相同输入已生成的报告")
+    profiling_url: Optional[str] = Field(default=None, description="本次生成的性能分析结果下载地址（请求了性能分析时）")
 
 
 class ReportInfo(BaseModel):
@@ -151,7 +304,8 @@ class ReportListResponse(BaseModel):
     """报告列表响应"""
     success: bool = Field(description="是否成功")
     reports: List[ReportInfo] = Field(default_factory=list, description="报告列表")
-    total: int = Field(default=0, description="总数")
+    total: Optional[int] = Field(default=None, description="总数（有筛选条件时需include_total=true）")
+    next_cursor: Optional[str] = Field(default=None, description="下一页游标，没有更多记录时为空")
 
 
 class ImageUploadResponse(BaseModel):
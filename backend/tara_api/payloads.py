@@ -0,0 +1,147 @@
+"""
+报告数据存储
+报告的原始数据以gzip压缩的JSON文件保存在磁盘上，内存中只保留按大小限制的最近使用报告，
+其余报告在访问时再从磁盘加载，服务的内存占用与报告总数无关
+"""
+import os
+import gzip
+import uuid
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+from .json_backend import dumps, loads
+from .json_stream import streamed_sources, write_json
+
+
+# 解析后的报告数据（dict/list/str对象）占用内存与序列化JSON字节数之比
+# 实测（tracemalloc）：benchmark合成报告约2.9~3.1，字段值较短的报告约4.2~4.7（短字符串的对象开销占比高），取上限；
+# 可用 python -m tara_api.benchmark --payload-memory 重新测量
+PARSED_SIZE_FACTOR = 4.7
+
+
+class PayloadStore:
+    """
+    报告数据的磁盘存储 + 内存LRU缓存
+
+    缓存保存解析后的数据，占用按序列化字节数 × PARSED_SIZE_FACTOR 估算，max_cache_bytes 为内存占用上限；
+    返回的数据为共享对象，调用方不应修改。
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        max_cache_bytes: int,
+        compresslevel: int = 6,
+        size_factor: float = PARSED_SIZE_FACTOR
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_cache_bytes = max_cache_bytes
+        self.compresslevel = compresslevel
+        self.size_factor = size_factor
+        self._cache: 'OrderedDict[str, Tuple[Dict[str, Any], int]]' = OrderedDict()
+        self._cache_bytes = 0
+        self._lock = threading.Lock()
+
+    def path_for(self, report_id: str) -> Path:
+        """报告数据文件路径"""
+        return self.directory / f"{report_id}.json.gz"
+
+    def save(self, report_id: str, data: Dict[str, Any]) -> int:
+        """
+        保存报告数据（先写临时文件再原子替换），返回序列化后的大小
+        包含增量解析的数组（StreamedArray）时边读边压缩写入，不加入内存缓存
+        """
+        path = self.path_for(report_id)
+        tmp_path = self.directory / f".{report_id}.{uuid.uuid4().hex}.tmp"
+        streamed = bool(streamed_sources(data))
+        try:
+            if streamed:
+                with gzip.open(tmp_path, 'wb', compresslevel=self.compresslevel) as f:
+                    size = write_json(f, data)
+            else:
+                raw = dumps(data)
+                size = len(raw)
+                with open(tmp_path, 'wb') as f:
+                    f.write(gzip.compress(raw, compresslevel=self.compresslevel))
+            os.replace(tmp_path, path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+        if streamed:
+            self._forget(report_id)
+        else:
+            self._remember(report_id, data, size)
+        return size
+
+    def get_cached(self, report_id: str) -> Optional[Dict[str, Any]]:
+        """从内存缓存获取报告数据，未缓存返回None"""
+        with self._lock:
+            entry = self._cache.get(report_id)
+            if entry is None:
+                return None
+            self._cache.move_to_end(report_id)
+            return entry[0]
+
+    def load(self, report_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取报告数据，未缓存时从磁盘加载；数据文件不存在返回None
+        加载时整体解压后解析，峰值内存约为解压后的JSON加上解析后的数据
+        """
+        data = self.get_cached(report_id)
+        if data is not None:
+            return data
+
+        path = self.path_for(report_id)
+        try:
+            with open(path, 'rb') as f:
+                raw = gzip.decompress(f.read())
+        except FileNotFoundError:
+            return None
+        raw_size = len(raw)
+        data = loads(raw)
+        del raw
+        self._remember(report_id, data, raw_size)
+        return data
+
+    def delete(self, report_id: str) -> None:
+        """删除报告数据"""
+        self._forget(report_id)
+        path = self.path_for(report_id)
+        if path.exists():
+            path.unlink()
+
+    def cache_info(self) -> Dict[str, int]:
+        """缓存状态"""
+        with self._lock:
+            return {
+                'entries': len(self._cache),
+                'bytes': self._cache_bytes,
+                'max_bytes': self.max_cache_bytes
+            }
+
+    def _remember(self, report_id: str, data: Dict[str, Any], raw_size: int) -> None:
+        """
+        加入缓存（raw_size为序列化字节数，按解析后的估算内存计入），
+        超出大小限制时淘汰最久未使用的报告（超过限制的单个报告不缓存）
+        """
+        size = int(raw_size * self.size_factor)
+        with self._lock:
+            old = self._cache.pop(report_id, None)
+            if old is not None:
+                self._cache_bytes -= old[1]
+            if size > self.max_cache_bytes:
+                return
+            self._cache[report_id] = (data, size)
+            self._cache_bytes += size
+            while self._cache_bytes > self.max_cache_bytes:
+                _, (_, evicted_size) = self._cache.popitem(last=False)
+                self._cache_bytes -= evicted_size
+
+    def _forget(self, report_id: str) -> None:
+        with self._lock:
+            old = self._cache.pop(report_id, None)
+            if old is not None:
+                self._cache_bytes -= old[1]
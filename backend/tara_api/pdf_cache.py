@@ -0,0 +1,242 @@
+"""
+PDF报告缓存
+按内容寻址：缓存键由规范化的报告数据、引用图片的内容哈希和生成器指纹共同决定，
+内容不变时直接复用已生成的PDF，任一输入变化时自动重新生成。
+缓存目录按总大小限制，超出时按最近使用时间（文件修改时间，命中时更新）淘汰最久未用的PDF。
+"""
+import os
+import json
+import uuid
+import asyncio
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Any, Iterable, Optional, Tuple, Callable, Awaitable
+
+
+# 报告数据中引用图片路径的字段
+DEFINITION_IMAGE_FIELDS = ('item_boundary_image', 'system_architecture_image', 'software_architecture_image')
+ASSET_IMAGE_FIELDS = ('dataflow_image',)
+
+# 文件哈希缓存: path -> (size, mtime_ns, sha256)
+_file_hash_cache: Dict[str, Tuple[int, int, str]] = {}
+_file_hash_lock = threading.Lock()
+
+# 缓存淘汰锁（PDFCache.render 在工作进程中调用，实例需可序列化，锁不放在实例上）
+_sweep_lock = threading.Lock()
+
+
+def hash_file(path: Optional[str]) -> Optional[str]:
+    """
+    计算文件内容的SHA-256
+    按(大小, 修改时间)缓存结果，文件未变化时不重复读取；文件不存在返回None
+    """
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    with _file_hash_lock:
+        cached = _file_hash_cache.get(path)
+    if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+        return cached[2]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    sha256 = digest.hexdigest()
+
+    with _file_hash_lock:
+        _file_hash_cache[path] = (stat.st_size, stat.st_mtime_ns, sha256)
+    return sha256
+
+
+def _image_ref(path: Optional[str]) -> Optional[str]:
+    """将图片路径替换为内容哈希，使缓存键与图片的存储位置无关"""
+    if not path:
+        return None
+    sha256 = hash_file(path)
+    return f"sha256:{sha256}" if sha256 else "missing"
+
+
+def cache_key_payload(report_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    计算缓存键所用的报告数据
+    图片路径字段替换为图片内容哈希，其余数据保持不变（不修改原始数据）
+    """
+    normalized = dict(report_data)
+
+    definitions = dict(report_data.get('definitions') or {})
+    for field in DEFINITION_IMAGE_FIELDS:
+        if field in definitions:
+            definitions[field] = _image_ref(definitions[field])
+    normalized['definitions'] = definitions
+
+    assets = dict(report_data.get('assets') or {})
+    for field in ASSET_IMAGE_FIELDS:
+        if field in assets:
+            assets[field] = _image_ref(assets[field])
+    normalized['assets'] = assets
+
+    attack_trees = dict(report_data.get('attack_trees') or {})
+    trees = []
+    for tree in attack_trees.get('attack_trees', []):
+        tree = dict(tree)
+        if 'image' in tree:
+            tree['image'] = _image_ref(tree['image'])
+        trees.append(tree)
+    attack_trees['attack_trees'] = trees
+    normalized['attack_trees'] = attack_trees
+
+    return normalized
+
+
+def compute_pdf_cache_key(report_data: Dict[str, Any], generator_fingerprint: str) -> str:
+    """计算PDF缓存键"""
+    digest = hashlib.sha256()
+    digest.update(generator_fingerprint.encode('utf-8'))
+    digest.update(b'\0')
+    payload = json.dumps(
+        cache_key_payload(report_data),
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(',', ':'),
+        default=str
+    )
+    digest.update(payload.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class PDFCache:
+    """
+    按缓存键存放PDF文件的目录缓存
+    max_bytes 为缓存总大小上限（0表示不限制）；多个服务进程共用缓存目录时按目录实际内容统计
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int = 0):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+    def path_for(self, key: str) -> Path:
+        """缓存键对应的PDF路径"""
+        return self.cache_dir / f"{key}.pdf"
+
+    def get(self, key: str) -> Optional[Path]:
+        """获取已缓存的PDF，不存在返回None"""
+        path = self.path_for(key)
+        try:
+            # 更新修改时间，作为淘汰时的最近使用时间
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def render(self, key: str, render_func: Callable[[str], Any]) -> Path:
+        """
+        生成PDF并写入缓存
+        先写入临时文件再原子替换，避免并发请求读到不完整的文件
+        """
+        path = self.path_for(key)
+        tmp_path = self.cache_dir / f".{key}.{uuid.uuid4().hex}.tmp"
+        try:
+            render_func(str(tmp_path))
+            os.replace(tmp_path, path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+        self.sweep(keep=key)
+        return path
+
+    def discard(self, keys: Iterable[str]) -> None:
+        """删除指定缓存键的PDF"""
+        for key in keys:
+            self.path_for(key).unlink(missing_ok=True)
+
+    def sweep(self, keep: Optional[str] = None) -> int:
+        """
+        缓存总大小超出上限时，按最近使用时间从旧到新删除PDF，直到不超过上限
+        keep 为刚生成的缓存键，不被淘汰（单个PDF超过上限时仍保留，供本次请求返回）
+        返回删除的文件数
+        """
+        if not self.max_bytes:
+            return 0
+        with _sweep_lock:
+            entries = []
+            total = 0
+            for path in self.cache_dir.glob('*.pdf'):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                total += stat.st_size
+                if path.stem != keep:
+                    entries.append((stat.st_mtime_ns, stat.st_size, path))
+            removed = 0
+            entries.sort(key=lambda entry: entry[0])
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+                removed += 1
+            return removed
+
+    def info(self) -> Dict[str, int]:
+        """缓存状态"""
+        files = list(self.cache_dir.glob('*.pdf'))
+        size = 0
+        for path in files:
+            try:
+                size += path.stat().st_size
+            except FileNotFoundError:
+                pass
+        return {'entries': len(files), 'bytes': size, 'max_bytes': self.max_bytes}
+
+    def get_or_render(self, key: str, render_func: Callable[[str], Any]) -> Tuple[Path, bool]:
+        """
+        获取缓存的PDF，不存在时生成
+        返回: (PDF路径, 是否命中缓存)
+        """
+        cached = self.get(key)
+        if cached:
+            return cached, True
+        return self.render(key, render_func), False
+
+
+class PDFRenderCoordinator:
+    """
+    PDF渲染调度
+    通过 run(func, *args) 在工作进程中渲染PDF，不阻塞事件循环；同一缓存键同时只有一个渲染任务，
+    后到的请求（下载、预渲染、重新生成）等待进行中的渲染，而不是再启动一次。
+    """
+
+    def __init__(self, cache: PDFCache, run: Callable[..., Awaitable[Any]]):
+        self.cache = cache
+        self.run = run
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def is_rendering(self, key: str) -> bool:
+        """缓存键对应的PDF是否正在渲染"""
+        return key in self._inflight
+
+    async def ensure(self, key: str, render_func: Callable[[str], Any], force: bool = False) -> Tuple[Path, bool]:
+        """
+        确保缓存键对应的PDF存在
+        render_func 需可序列化并在工作进程中调用（接收输出路径）。
+        返回: (PDF路径, 是否命中缓存)
+        """
+        future = self._inflight.get(key)
+        if future is None:
+            if not force:
+                cached = self.cache.get(key)
+                if cached:
+                    return cached, True
+            future = asyncio.ensure_future(self.run(self.cache.render, key, render_func))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield: 单个请求被取消（如客户端断开）时不影响其他等待者
+        return await asyncio.shield(future), False
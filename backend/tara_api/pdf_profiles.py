@@ -0,0 +1,40 @@
+"""
+PDF输出配置
+只包含配置定义，不依赖reportlab，服务进程校验配置名称时不需要导入PDF生成器
+"""
+from dataclasses import dataclass
+from typing import Dict, Optional, Union
+
+
+@dataclass(frozen=True)
+class PDFProfile:
+    """PDF输出配置，在文件大小与生成速度之间取舍"""
+    name: str
+    page_compression: bool = True          # 是否压缩页面内容流
+    include_images: bool = True            # 是否嵌入图片（不嵌入时显示占位文字）
+    image_dpi: Optional[int] = None        # 图片按显示尺寸重采样到的DPI，None表示原图嵌入
+    jpeg_quality: Optional[int] = None     # JPEG重新压缩质量，None表示无损
+
+
+PDF_PROFILES: Dict[str, PDFProfile] = {
+    # 默认：原图嵌入，压缩页面内容
+    'standard': PDFProfile('standard'),
+    # 屏幕浏览：低DPI + JPEG重新压缩，文件最小
+    'screen': PDFProfile('screen', image_dpi=96, jpeg_quality=70),
+    # 打印：高DPI无损
+    'print': PDFProfile('print', image_dpi=300),
+    # 草稿：不含图片、不压缩，生成最快
+    'draft': PDFProfile('draft', page_compression=False, include_images=False),
+}
+
+DEFAULT_PDF_PROFILE = 'standard'
+
+
+def get_pdf_profile(profile: Union[str, PDFProfile, None] = None) -> PDFProfile:
+    """按名称获取输出配置，名称无效时抛出ValueError"""
+    if isinstance(profile, PDFProfile):
+        return profile
+    name = profile or DEFAULT_PDF_PROFILE
+    if name not in PDF_PROFILES:
+        raise ValueError(f"无效的PDF输出配置: {name}。可选配置: {', '.join(PDF_PROFILES)}")
+    return PDF_PROFILES[name]
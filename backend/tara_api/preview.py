@@ -0,0 +1,94 @@
+"""
+报告详情/预览的字段投影与列表分页
+只返回界面需要的部分：fields 选择顶层字段，limit/offset 截取资产和TARA结果列表，
+两个列表各自用自己的游标翻页（游标中记录所属列表，不能用于另一个列表），
+响应大小和序列化耗时与实际返回的内容成正比
+"""
+import json
+import base64
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+# 只指定offset/cursor时的每页条数
+DEFAULT_PAGE_SIZE = 100
+
+# 每页最多条数
+MAX_PAGE_SIZE = 1000
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[List[str]]:
+    """解析逗号分隔的字段列表；未指定返回None，包含未知字段时抛出ValueError"""
+    if fields is None:
+        return None
+    selected = [name.strip() for name in fields.split(',') if name.strip()]
+    allowed = list(allowed)
+    unknown = [name for name in selected if name not in allowed]
+    if unknown:
+        raise ValueError(f"无效的字段: {', '.join(unknown)}。可选字段: {', '.join(allowed)}")
+    return selected
+
+
+def encode_offset_cursor(name: str, offset: int) -> str:
+    """生成列表分页游标（name为列表名）"""
+    payload = json.dumps({'list': name, 'offset': offset}).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_offset_cursor(name: str, cursor: str) -> int:
+    """解析列表分页游标，无效或不属于该列表时抛出ValueError"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        offset = payload['offset']
+    except Exception:
+        raise ValueError("无效的分页游标")
+    if payload.get('list') != name:
+        raise ValueError(f"分页游标不属于列表 {name}")
+    if not isinstance(offset, int) or offset < 0:
+        raise ValueError("无效的分页游标")
+    return offset
+
+
+def project(content: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    """只保留指定的顶层字段（fields为None时不处理）"""
+    if fields is None:
+        return content
+    return {name: content[name] for name in fields if name in content}
+
+
+def paginate_lists(
+    content: Dict[str, Any],
+    list_paths: Dict[str, Tuple[str, ...]],
+    offsets: Dict[str, int],
+    limit: int
+) -> Dict[str, Dict[str, Any]]:
+    """
+    按各列表的起始位置和 limit 截取 content 中的列表（list_paths: 列表名 -> 在content中的键路径），
+    offsets: 列表名 -> 起始位置（未给出的从0开始），返回各列表的分页信息
+    路径上的字典复制后再替换，不修改缓存中的报告数据
+    """
+    pages: Dict[str, Dict[str, Any]] = {}
+    for name, path in list_paths.items():
+        if path[0] not in content:
+            continue
+
+        parent = content
+        for key in path[:-1]:
+            if not isinstance(parent.get(key), dict):
+                break
+            parent[key] = dict(parent[key])
+            parent = parent[key]
+        else:
+            items = parent.get(path[-1])
+            if not isinstance(items, list):
+                continue
+            offset = offsets.get(name, 0)
+            end = offset + limit
+            parent[path[-1]] = items[offset:end]
+            pages[name] = {
+                'offset': offset,
+                'limit': limit,
+                'total': len(items),
+                'next_cursor': encode_offset_cursor(name, end) if end < len(items) else None
+            }
+    return pages
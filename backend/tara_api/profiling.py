@@ -0,0 +1,144 @@
+"""
+单次报告生成的性能分析
+请求携带 X-Profiling 头（并通过管理令牌校验）时，该请求的报告渲染在工作进程中以分析器运行，
+分析结果保存为与报告ID关联的文件，供下载后离线查看：
+- cprofile: 确定性分析（cProfile），保存为pstats文件，可用 pstats / snakeviz 查看
+- sample: 采样分析，后台线程定时记录渲染线程的调用栈，保存为折叠栈文本，可直接生成火焰图
+未请求分析的生成不经过这里，没有额外开销。
+"""
+import io
+import os
+import sys
+import uuid
+import pstats
+import cProfile
+import threading
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+
+# 分析方式 -> 结果文件扩展名
+PROFILING_MODES = {
+    'cprofile': '.prof',
+    'sample': '.folded',
+}
+
+# 采样间隔（秒）
+SAMPLE_INTERVAL = float(os.environ.get('TARA_PROFILING_SAMPLE_MS', '5')) / 1000
+
+
+class _StackSampler(threading.Thread):
+    """
+    定时采集指定线程的调用栈，按折叠栈（根;...;叶）计数
+    只保留 run_profiled 以内的栈帧，不包含进程池调度部分
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name='tara-profiling-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None and frame.f_code is not run_profiled.__code__:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+def _write_atomic(path: Path, write: Callable[[str], None]) -> None:
+    """先写临时文件再替换，下载时不会读到不完整的结果"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.parent / f".{path.name}.{uuid.uuid4().hex}.tmp"
+    try:
+        write(str(tmp_path))
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def run_profiled(mode: str, artifact_path: str, func: Callable, *args: Any, **kwargs: Any) -> Any:
+    """
+    以分析器运行 func(*args, **kwargs)（在工作进程中调用），结果写入 artifact_path
+    生成失败时同样保存已采集的结果，便于分析失败前的耗时
+    """
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(func, *args, **kwargs)
+        finally:
+            _write_atomic(Path(artifact_path), profiler.dump_stats)
+
+    sampler = _StackSampler(threading.get_ident(), SAMPLE_INTERVAL)
+    sampler.start()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        sampler.stop()
+
+        def write(path: str) -> None:
+            with open(path, 'w', encoding='utf-8') as f:
+                for stack, count in sampler.stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+
+        _write_atomic(Path(artifact_path), write)
+
+
+def artifact_name(report_id: str, target: str, mode: str) -> str:
+    """分析结果文件名：报告ID.生成目标.时间戳.扩展名"""
+    timestamp = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+    return f"{report_id}.{target}.{timestamp}{PROFILING_MODES[mode]}"
+
+
+def list_artifacts(profiles_dir: Path, report_id: str) -> List[Dict[str, Any]]:
+    """报告的所有分析结果（按生成时间排序）"""
+    artifacts = []
+    for path in profiles_dir.glob(f"{report_id}.*"):
+        if path.suffix not in PROFILING_MODES.values():
+            continue
+        stat = path.stat()
+        artifacts.append({
+            'name': path.name,
+            'target': path.name[len(report_id) + 1:].split('.', 1)[0],
+            'mode': next(mode for mode, ext in PROFILING_MODES.items() if ext == path.suffix),
+            'size': stat.st_size,
+            'created_at': datetime.fromtimestamp(stat.st_mtime).isoformat()
+        })
+    return sorted(artifacts, key=lambda item: item['created_at'])
+
+
+def find_artifact(profiles_dir: Path, report_id: str, name: str) -> Optional[Path]:
+    """按文件名查找报告的分析结果（只接受属于该报告的文件名）"""
+    if not name.startswith(f"{report_id}.") or '/' in name or '\\' in name:
+        return None
+    path = profiles_dir / name
+    if path.suffix not in PROFILING_MODES.values() or not path.is_file():
+        return None
+    return path
+
+
+def delete_artifacts(profiles_dir: Path, report_id: str) -> None:
+    """删除报告的所有分析结果"""
+    for item in list_artifacts(profiles_dir, report_id):
+        (profiles_dir / item['name']).unlink(missing_ok=True)
+
+
+def format_pstats(path: Path, sort: str = 'cumulative', limit: int = 50) -> str:
+    """pstats文件的文本摘要（按sort排序的前limit个函数）"""
+    stream = io.StringIO()
+    stats = pstats.Stats(str(path), stream=stream)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
@@ -0,0 +1,60 @@
+"""
+报告生成器的按需加载
+Excel/PDF生成器依赖openpyxl、reportlab和PIL，导入时还要注册中文字体，耗时明显。
+服务进程在第一次使用时才导入生成器（或启动后在后台预热），不影响启动和健康检查；
+在工作进程中执行的函数也定义在这里，按引用传给进程池，服务进程不需要为此导入生成器。
+"""
+import sys
+import time
+import importlib
+from types import ModuleType
+from typing import Any, Dict
+
+
+# 按需加载的生成器模块
+GENERATOR_MODULES = ('tara_excel_generator', 'tara_pdf_generator')
+
+# 本进程中各生成器模块的导入耗时（秒）
+_import_seconds: Dict[str, float] = {}
+
+
+def _load(name: str) -> ModuleType:
+    """导入生成器模块（已导入时直接返回）"""
+    module = sys.modules.get(f"{__package__}.{name}")
+    if module is None:
+        start = time.perf_counter()
+        module = importlib.import_module(f".{name}", __package__)
+        _import_seconds.setdefault(name, time.perf_counter() - start)
+    return module
+
+
+def excel_generator() -> ModuleType:
+    """Excel生成器模块"""
+    return _load('tara_excel_generator')
+
+
+def pdf_generator() -> ModuleType:
+    """PDF生成器模块"""
+    return _load('tara_pdf_generator')
+
+
+def is_loaded() -> bool:
+    """所有生成器是否已在本进程中导入"""
+    return all(f"{__package__}.{name}" in sys.modules for name in GENERATOR_MODULES)
+
+
+def render_excel(output_path: str, json_data: Dict[str, Any]) -> str:
+    """生成Excel报告（在工作进程中调用）"""
+    return excel_generator().generate_tara_excel_from_json(output_path, json_data)
+
+
+def render_pdf(output_path: str, json_data: Dict[str, Any], **kwargs: Any) -> str:
+    """生成PDF报告（在工作进程中调用），kwargs 同 generate_tara_pdf_from_json"""
+    return pdf_generator().generate_tara_pdf_from_json(output_path, json_data, **kwargs)
+
+
+def warm_up() -> Dict[str, float]:
+    """导入所有生成器，返回本进程中各模块的导入耗时（秒）"""
+    for name in GENERATOR_MODULES:
+        _load(name)
+    return dict(_import_seconds)
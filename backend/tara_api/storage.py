@@ -0,0 +1,541 @@
+"""
+报告与图片元数据存储
+基于SQLite（WAL模式），服务重启后报告和图片记录依然有效，多个工作进程可共享同一数据库
+"""
+import json
+import base64
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Tuple
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    project_name TEXT NOT NULL,
+    document_number TEXT,
+    version TEXT,
+    status TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    file_path TEXT NOT NULL,
+    file_size INTEGER,
+    pdf_status TEXT NOT NULL DEFAULT 'none',
+    pdf_error TEXT,
+    statistics TEXT,
+    images TEXT,
+    image_paths TEXT,
+    -- 旧版本保存的报告原始数据，新报告的数据存放在 reports/payloads/
+    data TEXT
+);
+
+CREATE TABLE IF NOT EXISTS images (
+    id TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    path TEXT NOT NULL,
+    original_name TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_images_path ON images(path);
+
+-- 幂等键：输入哈希（input:）或客户端 Idempotency-Key（client:） -> 已生成的报告
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key TEXT PRIMARY KEY,
+    input_hash TEXT NOT NULL,
+    report_id TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_report_id ON idempotency_keys(report_id);
+CREATE TRIGGER IF NOT EXISTS trg_reports_delete_idempotency_keys AFTER DELETE ON reports
+    BEGIN DELETE FROM idempotency_keys WHERE report_id = OLD.id; END;
+
+-- 批量生成的状态清单
+CREATE TABLE IF NOT EXISTS batches (
+    id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    succeeded INTEGER NOT NULL,
+    manifest TEXT NOT NULL
+);
+
+-- 报告生成的时间线（每次生成或PDF渲染一条），spans为 [阶段名, 开始时间(微秒), 耗时(微秒)] 列表
+CREATE TABLE IF NOT EXISTS traces (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    report_id TEXT NOT NULL,
+    operation TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    spans TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_traces_report_id ON traces(report_id, id);
+CREATE TRIGGER IF NOT EXISTS trg_reports_delete_traces AFTER DELETE ON reports
+    BEGIN DELETE FROM traces WHERE report_id = OLD.id; END;
+
+-- 异步任务状态（多个服务进程共享），由提交任务的进程写入
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT,
+    metadata TEXT,
+    result TEXT,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_finished_at ON jobs(finished_at);
+
+-- 记录数计数器，无筛选条件时的总数不需要扫描全表
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO counters VALUES ('reports', (SELECT COUNT(*) FROM reports));
+INSERT OR IGNORE INTO counters VALUES ('images', (SELECT COUNT(*) FROM images));
+CREATE TRIGGER IF NOT EXISTS trg_reports_insert AFTER INSERT ON reports
+    BEGIN UPDATE counters SET value = value + 1 WHERE name = 'reports'; END;
+CREATE TRIGGER IF NOT EXISTS trg_reports_delete AFTER DELETE ON reports
+    BEGIN UPDATE counters SET value = value - 1 WHERE name = 'reports'; END;
+CREATE TRIGGER IF NOT EXISTS trg_images_insert AFTER INSERT ON images
+    BEGIN UPDATE counters SET value = value + 1 WHERE name = 'images'; END;
+CREATE TRIGGER IF NOT EXISTS trg_images_delete AFTER DELETE ON images
+    BEGIN UPDATE counters SET value = value - 1 WHERE name = 'images'; END;
+"""
+
+# 后续版本新增的列: 表名 -> (列名, 定义, 旧数据回填表达式)
+MIGRATIONS = {
+    'reports': (
+        ('threats_count', 'INTEGER NOT NULL DEFAULT 0', "json_extract(statistics, '$.threats_count')"),
+        ('high_risk_count', 'INTEGER NOT NULL DEFAULT 0', "json_extract(statistics, '$.high_risk_count')"),
+        ('image_urls', 'TEXT', None),
+    ),
+    'images': (
+        # 内容哈希，旧版本上传的图片为NULL
+        ('sha256', 'TEXT', None),
+    ),
+}
+
+# 排序索引均以id结尾，用于游标分页的稳定排序（替换旧版本的单列索引）
+INDEXES = """
+DROP INDEX IF EXISTS idx_reports_created_at;
+DROP INDEX IF EXISTS idx_reports_project_name;
+DROP INDEX IF EXISTS idx_reports_status;
+CREATE INDEX IF NOT EXISTS idx_reports_created_at_id ON reports(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_reports_name_id ON reports(name, id);
+CREATE INDEX IF NOT EXISTS idx_reports_project_created ON reports(project_name, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_reports_document_number ON reports(document_number);
+CREATE INDEX IF NOT EXISTS idx_reports_status_created ON reports(status, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_reports_threats_count_id ON reports(threats_count, id);
+CREATE INDEX IF NOT EXISTS idx_reports_high_risk_count_id ON reports(high_risk_count, id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_images_sha256 ON images(sha256);
+"""
+
+JOB_FIELDS = ('id', 'kind', 'status', 'created_at', 'started_at', 'finished_at', 'metadata', 'result', 'error')
+
+# 以JSON文本存储的字段
+REPORT_JSON_FIELDS = ('statistics', 'images', 'image_paths', 'image_urls', 'data')
+
+REPORT_FIELDS = (
+    'id', 'name', 'project_name', 'document_number', 'version', 'status', 'created_at',
+    'file_path', 'file_size', 'pdf_status', 'pdf_error', 'threats_count', 'high_risk_count',
+    *REPORT_JSON_FIELDS
+)
+
+# 详情查询可省略报告原始数据
+REPORT_SUMMARY_FIELDS = tuple(field for field in REPORT_FIELDS if field != 'data')
+
+# 列表页只读取展示所需的列
+REPORT_LIST_FIELDS = (
+    'id', 'name', 'project_name', 'status', 'created_at', 'file_path',
+    'threats_count', 'high_risk_count', 'statistics', 'image_urls'
+)
+
+# 可排序的列
+REPORT_SORT_FIELDS = ('created_at', 'name', 'project_name', 'threats_count', 'high_risk_count')
+
+IMAGE_FIELDS = ('id', 'type', 'filename', 'path', 'original_name', 'created_at', 'sha256')
+
+
+def _encode(field: str, value: Any) -> Any:
+    if field in REPORT_JSON_FIELDS and value is not None:
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return value
+
+
+def encode_cursor(sort_by: str, order: str, value: Any, report_id: str) -> str:
+    """生成分页游标（上一页最后一条记录的排序值和ID）"""
+    payload = json.dumps([sort_by, order, value, report_id], ensure_ascii=False)
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, sort_by: str, order: str) -> Tuple[Any, str]:
+    """解析分页游标，返回 (排序值, 报告ID)；游标无效或与排序方式不一致时抛出ValueError"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_sort, cursor_order, value, report_id = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception:
+        raise ValueError("无效的分页游标")
+    if (cursor_sort, cursor_order) != (sort_by, order):
+        raise ValueError("分页游标与排序方式不一致")
+    return value, report_id
+
+
+def _report_filters(
+    project_name: Optional[str] = None,
+    status: Optional[str] = None,
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None,
+    min_threats: Optional[int] = None,
+    max_threats: Optional[int] = None,
+    min_high_risk: Optional[int] = None,
+    max_high_risk: Optional[int] = None
+) -> Tuple[List[str], List[Any]]:
+    """构建报告筛选条件（created_at为ISO格式字符串，可直接按字符串比较）"""
+    conditions = [
+        ('project_name = ?', project_name),
+        ('status = ?', status),
+        ('created_at >= ?', created_from),
+        ('created_at < ?', created_to),
+        ('threats_count >= ?', min_threats),
+        ('threats_count <= ?', max_threats),
+        ('high_risk_count >= ?', min_high_risk),
+        ('high_risk_count <= ?', max_high_risk),
+    ]
+    clauses = [clause for clause, value in conditions if value is not None]
+    params = [value for _, value in conditions if value is not None]
+    return clauses, params
+
+
+def _decode_report(row: sqlite3.Row) -> Dict[str, Any]:
+    """数据库行转换为报告字典，值为NULL的字段省略（与原内存存储的字典结构一致）"""
+    report = {}
+    for field in row.keys():
+        value = row[field]
+        if value is None:
+            continue
+        report[field] = json.loads(value) if field in REPORT_JSON_FIELDS else value
+    return report
+
+
+class MetadataStore:
+    """
+    报告与图片元数据存储
+
+    每个线程复用一个连接；写操作各自提交，WAL模式下读写互不阻塞。
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._migrate()
+
+    def _migrate(self) -> None:
+        """创建表结构，并为旧数据库补充新增的列（可在多个进程中同时执行）"""
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        with conn:
+            # 多个服务进程同时启动时只有一个进程执行迁移
+            conn.execute("BEGIN IMMEDIATE")
+            for table, migrations in MIGRATIONS.items():
+                columns = {row['name'] for row in conn.execute(f"PRAGMA table_info({table})")}
+                for column, definition, backfill in migrations:
+                    if column not in columns:
+                        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+                        if backfill:
+                            conn.execute(f"UPDATE {table} SET {column} = COALESCE({backfill}, 0)")
+        conn.executescript(INDEXES)
+
+    def _conn(self) -> sqlite3.Connection:
+        """当前线程的数据库连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # 连接只在创建它的线程中使用；关闭时统一由close()处理
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self) -> None:
+        """关闭所有连接"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+    # ==================== 报告 ====================
+
+    def add_report(self, report: Dict[str, Any]) -> None:
+        """保存报告记录（统计数同时写入独立的列用于筛选和排序）"""
+        statistics = report.get('statistics') or {}
+        report = {
+            'threats_count': statistics.get('threats_count', 0),
+            'high_risk_count': statistics.get('high_risk_count', 0),
+            **report
+        }
+        fields = [field for field in REPORT_FIELDS if field in report]
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                f"INSERT INTO reports ({', '.join(fields)}) "
+                f"VALUES ({', '.join('?' for _ in fields)})",
+                [_encode(field, report[field]) for field in fields]
+            )
+
+    def get_report(self, report_id: str, include_data: bool = True) -> Optional[Dict[str, Any]]:
+        """获取报告记录，不存在返回None"""
+        fields = REPORT_FIELDS if include_data else REPORT_SUMMARY_FIELDS
+        row = self._conn().execute(
+            f"SELECT {', '.join(fields)} FROM reports WHERE id = ?", (report_id,)
+        ).fetchone()
+        return _decode_report(row) if row else None
+
+    def has_report(self, report_id: str) -> bool:
+        """报告是否存在"""
+        return self._conn().execute(
+            "SELECT 1 FROM reports WHERE id = ?", (report_id,)
+        ).fetchone() is not None
+
+    def update_report(self, report_id: str, **fields: Any) -> None:
+        """更新报告的部分字段"""
+        unknown = set(fields) - set(REPORT_FIELDS)
+        if unknown:
+            raise ValueError(f"未知的报告字段: {', '.join(sorted(unknown))}")
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                f"UPDATE reports SET {', '.join(f'{field} = ?' for field in fields)} WHERE id = ?",
+                [*(_encode(field, value) for field, value in fields.items()), report_id]
+            )
+
+    def delete_report(self, report_id: str) -> bool:
+        """删除报告记录，返回是否存在"""
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute("DELETE FROM reports WHERE id = ?", (report_id,))
+        return cursor.rowcount > 0
+
+    def list_reports(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        sort_by: str = 'created_at',
+        order: str = 'desc',
+        **filters: Any
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        分页列出报告（游标分页，每页按索引定位，与总数无关）
+
+        filters: project_name, status, created_from, created_to,
+                 min_threats, max_threats, min_high_risk, max_high_risk
+        返回: (报告列表, 下一页游标；没有更多记录时为None)
+        """
+        if sort_by not in REPORT_SORT_FIELDS:
+            raise ValueError(f"不支持的排序字段: {sort_by}")
+        if order not in ('asc', 'desc'):
+            raise ValueError(f"不支持的排序方向: {order}")
+
+        clauses, params = _report_filters(**filters)
+        if cursor:
+            value, last_id = decode_cursor(cursor, sort_by, order)
+            clauses.append(f"({sort_by}, id) {'<' if order == 'desc' else '>'} (?, ?)")
+            params.extend([value, last_id])
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        direction = order.upper()
+        rows = self._conn().execute(
+            f"SELECT {', '.join(REPORT_LIST_FIELDS)} FROM reports {where} "
+            f"ORDER BY {sort_by} {direction}, id {direction} LIMIT ?",
+            [*params, limit + 1]
+        ).fetchall()
+
+        reports = [_decode_report(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = encode_cursor(sort_by, order, last[sort_by], last['id'])
+        return reports, next_cursor
+
+    def count_reports(self, **filters: Any) -> int:
+        """报告数量；无筛选条件时读取计数器"""
+        clauses, params = _report_filters(**filters)
+        if not clauses:
+            return self._counter('reports')
+        return self._conn().execute(
+            f"SELECT COUNT(*) FROM reports WHERE {' AND '.join(clauses)}", params
+        ).fetchone()[0]
+
+    def _counter(self, name: str) -> int:
+        row = self._conn().execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()
+        return row['value'] if row else 0
+
+    # ==================== 幂等键 ====================
+
+    def get_idempotency_key(self, key: str) -> Optional[Dict[str, Any]]:
+        """获取幂等键记录（input_hash, report_id, created_at），不存在返回None"""
+        row = self._conn().execute(
+            "SELECT key, input_hash, report_id, created_at FROM idempotency_keys WHERE key = ?", (key,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def add_idempotency_key(self, key: str, input_hash: str, report_id: str, created_at: str) -> Dict[str, Any]:
+        """
+        记录幂等键，返回生效的记录
+        并发写入同一个键时保留先写入的记录
+        """
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO idempotency_keys (key, input_hash, report_id, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, input_hash, report_id, created_at)
+            )
+        return self.get_idempotency_key(key)
+
+    def delete_idempotency_key(self, key: str) -> None:
+        """删除幂等键（如对应的报告文件已丢失）"""
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM idempotency_keys WHERE key = ?", (key,))
+
+    # ==================== 批量生成 ====================
+
+    def add_batch(self, batch_id: str, created_at: str, manifest: Dict[str, Any]) -> None:
+        """保存批量生成的状态清单"""
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO batches (id, created_at, total, succeeded, manifest) VALUES (?, ?, ?, ?, ?)",
+                (batch_id, created_at, manifest['total'], manifest['succeeded'],
+                 json.dumps(manifest, ensure_ascii=False, default=str))
+            )
+
+    def get_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """获取批量生成的状态清单，不存在返回None"""
+        row = self._conn().execute("SELECT manifest FROM batches WHERE id = ?", (batch_id,)).fetchone()
+        return json.loads(row['manifest']) if row else None
+
+    # ==================== 生成时间线 ====================
+
+    def add_trace(self, report_id: str, operation: str, created_at: str, spans: List[List[Any]], keep: int) -> None:
+        """保存一次操作的时间线，每个报告只保留最近keep条"""
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT INTO traces (report_id, operation, created_at, spans) VALUES (?, ?, ?, ?)",
+                (report_id, operation, created_at, json.dumps(spans))
+            )
+            conn.execute(
+                "DELETE FROM traces WHERE report_id = ? AND id NOT IN ("
+                "SELECT id FROM traces WHERE report_id = ? ORDER BY id DESC LIMIT ?)",
+                (report_id, report_id, keep)
+            )
+
+    def get_traces(self, report_id: str) -> List[Dict[str, Any]]:
+        """获取报告的所有时间线（按记录顺序）"""
+        rows = self._conn().execute(
+            "SELECT operation, created_at, spans FROM traces WHERE report_id = ? ORDER BY id", (report_id,)
+        ).fetchall()
+        return [
+            {'operation': row['operation'], 'created_at': row['created_at'], 'spans': json.loads(row['spans'])}
+            for row in rows
+        ]
+
+    # ==================== 异步任务 ====================
+
+    def save_job(self, job: Dict[str, Any]) -> None:
+        """写入任务状态（job为任务的to_dict()结果），保留已有的取消请求"""
+        values = {**job, 'id': job['job_id']}
+        values['metadata'] = json.dumps(job.get('metadata') or {}, ensure_ascii=False, default=str)
+        values['result'] = None if job.get('result') is None else json.dumps(job['result'], ensure_ascii=False, default=str)
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                f"INSERT INTO jobs ({', '.join(JOB_FIELDS)}) VALUES ({', '.join('?' for _ in JOB_FIELDS)}) "
+                f"ON CONFLICT(id) DO UPDATE SET "
+                f"{', '.join(f'{field} = excluded.{field}' for field in JOB_FIELDS if field != 'id')}",
+                [values.get(field) for field in JOB_FIELDS]
+            )
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """获取任务状态（与任务的to_dict()结构一致），不存在返回None"""
+        row = self._conn().execute(
+            f"SELECT {', '.join(JOB_FIELDS)} FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        job = {'job_id': row['id'], **{field: row[field] for field in JOB_FIELDS if field != 'id'}}
+        job['metadata'] = json.loads(job['metadata']) if job['metadata'] else {}
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def request_job_cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """记录取消请求（只对未结束的任务），返回请求前的任务状态；不存在返回None"""
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status IN ('queued', 'running')",
+                (job_id,)
+            )
+        return self.get_job(job_id)
+
+    def is_job_cancel_requested(self, job_id: str) -> bool:
+        """任务是否被请求取消"""
+        row = self._conn().execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row['cancel_requested'])
+
+    def prune_jobs(self, keep: int) -> None:
+        """只保留最近结束的keep条任务记录"""
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "DELETE FROM jobs WHERE finished_at IS NOT NULL AND id NOT IN ("
+                "SELECT id FROM jobs WHERE finished_at IS NOT NULL ORDER BY finished_at DESC LIMIT ?)",
+                (keep,)
+            )
+
+    # ==================== 图片 ====================
+
+    def add_image(self, image: Dict[str, Any]) -> None:
+        """保存图片记录（相同ID或内容哈希的记录已存在时忽略）"""
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                f"INSERT OR IGNORE INTO images ({', '.join(IMAGE_FIELDS)}) "
+                f"VALUES ({', '.join('?' for _ in IMAGE_FIELDS)})",
+                [image.get(field) for field in IMAGE_FIELDS]
+            )
+
+    def get_image(self, image_id: str) -> Optional[Dict[str, Any]]:
+        """获取图片记录，不存在返回None"""
+        row = self._conn().execute(
+            f"SELECT {', '.join(IMAGE_FIELDS)} FROM images WHERE id = ?", (image_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def find_image_by_hash(self, sha256: str) -> Optional[Dict[str, Any]]:
+        """根据内容哈希查找图片记录"""
+        row = self._conn().execute(
+            f"SELECT {', '.join(IMAGE_FIELDS)} FROM images WHERE sha256 = ?", (sha256,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def find_image_id_by_path(self, path: str) -> Optional[str]:
+        """根据文件路径查找图片ID"""
+        row = self._conn().execute(
+            "SELECT id FROM images WHERE path = ? LIMIT 1", (path,)
+        ).fetchone()
+        return row['id'] if row else None
+
+    def count_images(self) -> int:
+        """图片数量"""
+        return self._counter('images')
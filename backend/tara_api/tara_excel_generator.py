@@ -18,6 +18,13 @@ from openpyxl.utils import get_column_letter
 from openpyxl.drawing.image import Image
 import os
 
+from .instrumentation import phase
+from .models import normalize_report_data, section_title
+
+
+# Excel生成器版本，修改输出内容或版式时需要递增，以使按输入内容复用的报告失效
+EXCEL_GENERATOR_VERSION = "1.1.1"
+
 
 # ==================== 样式定义 ====================
 class TARAStyles:
@@ -54,6 +61,12 @@ class TARAStyles:
     TOP_LEFT_ALIGN = Alignment(horizontal='left', vertical='top', wrap_text=True)
 
 
+def load_image(image_path: str) -> Image:
+    """读取图片（打开文件并解析尺寸），计入 excel.load_image 阶段"""
+    with phase('excel.load_image'):
+        return Image(image_path)
+
+
 # ==================== Sheet 0: 封面 ====================
 def create_cover_sheet(wb: Workbook, data: Dict[str, Any]) -> None:
     """
@@ -86,37 +99,37 @@ def create_cover_sheet(wb: Workbook, data: Dict[str, Any]) -> None:
         ws.column_dimensions[get_column_letter(i)].width = width
     
     # 数据等级信息
-    ws['F4'] = f"数据等级：{data.get('data_level', '秘密')}\nData level: Confidential"
+    ws['F4'] = f"数据等级：{data['data_level']}\nData level: Confidential"
     ws['F4'].font = Font(bold=True)
     ws['F4'].alignment = TARAStyles.LEFT_ALIGN
     
-    ws['F5'] = f"编号：{data.get('document_number', '')}\nNumber: {data.get('document_number', '')}"
+    ws['F5'] = f"编号：{data['document_number']}\nNumber: {data['document_number']}"
     ws['F5'].font = Font(bold=True)
     ws['F5'].alignment = TARAStyles.LEFT_ALIGN
     
-    ws['F6'] = f"版本：{data.get('version', '')}\nVersion："
+    ws['F6'] = f"版本：{data['version']}\nVersion："
     ws['F6'].font = Font(bold=True)
     ws['F6'].alignment = TARAStyles.LEFT_ALIGN
     
     # 主标题
     ws.merge_cells('A7:G7')
-    ws['A7'] = f"{data.get('report_title', '威胁分析和风险评估报告')}\n{data.get('report_title_en', 'Threat Analysis And Risk Assessment Report')}"
+    ws['A7'] = f"{data['report_title']}\n{data['report_title_en']}"
     ws['A7'].font = Font(size=16, bold=True)
     ws['A7'].alignment = TARAStyles.CENTER_ALIGN
     ws.row_dimensions[7].height = 45
     
     # 项目名称
     ws.merge_cells('E8:G8')
-    ws['E8'] = data.get('project_name', '')
+    ws['E8'] = data['project_name']
     ws['E8'].font = Font(size=16, bold=True)
     ws['E8'].alignment = TARAStyles.CENTER_ALIGN
     
     # 签名信息
     sign_info = [
-        ('A9:B9', 'C9:D9', '编制/日期：\nAuthor/Date', data.get('author_date', '')),
-        ('A10:B10', 'C10:D10', '审核/日期：\nReview/Date', data.get('review_date', '')),
-        ('A11:B11', 'C11:D11', '会签/日期：\nSignature/Date', data.get('sign_date', '')),
-        ('A12:B12', 'C12:D12', '批准/日期：\nApprove/Date', data.get('approve_date', '')),
+        ('A9:B9', 'C9:D9', '编制/日期：\nAuthor/Date', data['author_date']),
+        ('A10:B10', 'C10:D10', '审核/日期：\nReview/Date', data['review_date']),
+        ('A11:B11', 'C11:D11', '会签/日期：\nSignature/Date', data['sign_date']),
+        ('A12:B12', 'C12:D12', '批准/日期：\nApprove/Date', data['approve_date']),
     ]
     
     for label_range, value_range, label, value in sign_info:
@@ -163,7 +176,7 @@ def create_definitions_sheet(wb: Workbook, data: Dict[str, Any]) -> None:
     
     # 标题
     ws.merge_cells(f'A{current_row}:F{current_row}')
-    ws[f'A{current_row}'] = data.get('title', 'MY25 EV平台中控主机 TARA分析报告 - 相关定义')
+    ws[f'A{current_row}'] = section_title(data, 'MY25 EV平台中控主机 TARA分析报告 - 相关定义')
     ws[f'A{current_row}'].font = TARAStyles.TITLE_FONT
     ws[f'A{current_row}'].alignment = TARAStyles.CENTER_ALIGN
     ws.row_dimensions[current_row].height = 30
@@ -179,7 +192,7 @@ def create_definitions_sheet(wb: Workbook, data: Dict[str, Any]) -> None:
     # 功能描述内容
     desc_start = current_row
     ws.merge_cells(f'A{current_row}:F{current_row + 6}')
-    ws[f'A{current_row}'] = data.get('functional_description', '')
+    ws[f'A{current_row}'] = data['functional_description']
     ws[f'A{current_row}'].font = Font(size=11)
     ws[f'A{current_row}'].alignment = TARAStyles.TOP_LEFT_ALIGN
     current_row += 8
@@ -194,9 +207,9 @@ def create_definitions_sheet(wb: Workbook, data: Dict[str, Any]) -> None:
     # 项目边界图片区域
     img_start = current_row
     ws.merge_cells(f'A{current_row}:F{current_row + 17}')
-    if data.get('item_boundary_image') and os.path.exists(data['item_boundary_image']):
+    if data['item_boundary_image'] and os.path.exists(data['item_boundary_image']):
         try:
-            img = Image(data['item_boundary_image'])
+            img = load_image(data['item_boundary_image'])
             img.width = 700
             img.height = 350
             ws.add_image(img, f'A{current_row}')
@@ -212,9 +225,9 @@ def create_definitions_sheet(wb: Workbook, data: Dict[str, Any]) -> None:
     current_row += 1
     
     ws.merge_cells(f'A{current_row}:F{current_row + 17}')
-    if data.get('system_architecture_image') and os.path.exists(data['system_architecture_image']):
+    if data['system_architecture_image'] and os.path.exists(data['system_architecture_image']):
         try:
-            img = Image(data['system_architecture_image'])
+            img = load_image(data['system_architecture_image'])
             img.width = 700
             img.height = 350
             ws.add_image(img, f'A{current_row}')
@@ -230,9 +243,9 @@ def create_definitions_sheet(wb: Workbook, data: Dict[str, Any]) -> None:
     current_row += 1
     
     ws.merge_cells(f'A{current_row}:F{current_row + 17}')
-    if data.get('software_architecture_image') and os.path.exists(data['software_architecture_image']):
+    if data['software_architecture_image'] and os.path.exists(data['software_architecture_image']):
         try:
-            img = Image(data['software_architecture_image'])
+            img = load_image(data['software_architecture_image'])
             img.width = 700
             img.height = 350
             ws.add_image(img, f'A{current_row}')
@@ -263,13 +276,13 @@ def create_definitions_sheet(wb: Workbook, data: Dict[str, Any]) -> None:
     current_row += 1
     
     # 假设数据
-    for assumption in data.get('assumptions', []):
-        ws[f'A{current_row}'] = assumption.get('id', '')
+    for assumption in data['assumptions']:
+        ws[f'A{current_row}'] = assumption['id']
         ws[f'A{current_row}'].border = TARAStyles.THIN_BORDER
         ws[f'A{current_row}'].alignment = TARAStyles.CENTER_ALIGN
         
         ws.merge_cells(f'B{current_row}:F{current_row}')
-        ws[f'B{current_row}'] = assumption.get('description', '')
+        ws[f'B{current_row}'] = assumption['description']
         ws[f'B{current_row}'].border = TARAStyles.THIN_BORDER
         ws[f'B{current_row}'].alignment = TARAStyles.LEFT_ALIGN
         current_row += 1
@@ -311,17 +324,17 @@ def create_definitions_sheet(wb: Workbook, data: Dict[str, Any]) -> None:
     current_row += 1
     
     # 术语数据
-    for term in data.get('terminology', []):
-        ws[f'A{current_row}'] = term.get('abbreviation', '')
+    for term in data['terminology']:
+        ws[f'A{current_row}'] = term['abbreviation']
         ws[f'A{current_row}'].border = TARAStyles.THIN_BORDER
         ws[f'A{current_row}'].alignment = TARAStyles.CENTER_ALIGN
         
         ws.merge_cells(f'B{current_row}:E{current_row}')
-        ws[f'B{current_row}'] = term.get('english', '')
+        ws[f'B{current_row}'] = term['english']
         ws[f'B{current_row}'].border = TARAStyles.THIN_BORDER
         ws[f'B{current_row}'].alignment = TARAStyles.LEFT_ALIGN
         
-        ws[f'F{current_row}'] = term.get('chinese', '')
+        ws[f'F{current_row}'] = term['chinese']
         ws[f'F{current_row}'].border = TARAStyles.THIN_BORDER
         ws[f'F{current_row}'].alignment = TARAStyles.LEFT_ALIGN
         current_row += 1
@@ -363,7 +376,7 @@ def create_assets_sheet(wb: Workbook, data: Dict[str, Any]) -> None:
     
     # 标题
     ws.merge_cells(f'A{current_row}:J{current_row}')
-    ws[f'A{current_row}'] = data.get('title', 'MY25 EV平台中控主机- 资产列表 Asset List')
+    ws[f'A{current_row}'] = section_title(data, 'MY25 EV平台中控主机- 资产列表 Asset List')
     ws[f'A{current_row}'].font = Font(size=14, bold=True, color=TARAStyles.DARK_BLUE)
     ws[f'A{current_row}'].alignment = TARAStyles.CENTER_ALIGN
     ws.row_dimensions[current_row].height = 25
@@ -409,17 +422,17 @@ def create_assets_sheet(wb: Workbook, data: Dict[str, Any]) -> None:
     current_row += 1
     
     # 资产数据
-    for asset in data.get('assets', []):
-        ws[f'A{current_row}'] = asset.get('id', '')
-        ws[f'B{current_row}'] = asset.get('name', '')
-        ws[f'C{current_row}'] = asset.get('category', '')
-        ws[f'D{current_row}'] = asset.get('remarks', '')
-        ws[f'E{current_row}'] = '√' if asset.get('authenticity') else ''
-        ws[f'F{current_row}'] = '√' if asset.get('integrity') else ''
-        ws[f'G{current_row}'] = '√' if asset.get('non_repudiation') else ''
-        ws[f'H{current_row}'] = '√' if asset.get('confidentiality') else ''
-        ws[f'I{current_row}'] = '√' if asset.get('availability') else ''
-        ws[f'J{current_row}'] = '√' if asset.get('authorization') else ''
+    for asset in data['assets']:
+        ws[f'A{current_row}'] = asset['id']
+        ws[f'B{current_row}'] = asset['name']
+        ws[f'C{current_row}'] = asset['category']
+        ws[f'D{current_row}'] = asset['remarks']
+        ws[f'E{current_row}'] = '√' if asset['authenticity'] else ''
+        ws[f'F{current_row}'] = '√' if asset['integrity'] else ''
+        ws[f'G{current_row}'] = '√' if asset['non_repudiation'] else ''
+        ws[f'H{current_row}'] = '√' if asset['confidentiality'] else ''
+        ws[f'I{current_row}'] = '√' if asset['availability'] else ''
+        ws[f'J{current_row}'] = '√' if asset['authorization'] else ''
         
         for col in 'ABCDEFGHIJ':
             ws[f'{col}{current_row}'].border = TARAStyles.THIN_BORDER
@@ -428,9 +441,9 @@ def create_assets_sheet(wb: Workbook, data: Dict[str, Any]) -> None:
     
     # 数据流图
     current_row += 2
-    if data.get('dataflow_image') and os.path.exists(data['dataflow_image']):
+    if data['dataflow_image'] and os.path.exists(data['dataflow_image']):
         try:
-            img = Image(data['dataflow_image'])
+            img = load_image(data['dataflow_image'])
             img.width = 800
             img.height = 400
             ws.add_image(img, f'A{current_row}')
@@ -468,17 +481,17 @@ def create_attack_trees_sheet(wb: Workbook, data: Dict[str, Any]) -> None:
     
     # 主标题
     ws.merge_cells(f'A{current_row}:F{current_row}')
-    ws[f'A{current_row}'] = data.get('title', 'MY25 EV平台中控主机 - 攻击树分析 Attack Tree Analysis')
+    ws[f'A{current_row}'] = section_title(data, 'MY25 EV平台中控主机 - 攻击树分析 Attack Tree Analysis')
     ws[f'A{current_row}'].font = Font(size=14, bold=True, color=TARAStyles.DARK_BLUE)
     ws[f'A{current_row}'].alignment = TARAStyles.CENTER_ALIGN
     ws.row_dimensions[current_row].height = 25
     current_row += 2
     
     # 攻击树
-    for tree in data.get('attack_trees', []):
+    for tree in data['attack_trees']:
         # 攻击树标题
         ws.merge_cells(f'A{current_row}:F{current_row}')
-        ws[f'A{current_row}'] = tree.get('title', '')
+        ws[f'A{current_row}'] = tree['title']
         ws[f'A{current_row}'].font = TARAStyles.SECTION_FONT
         ws[f'A{current_row}'].fill = TARAStyles.SECTION_FILL
         ws[f'A{current_row}'].alignment = TARAStyles.CENTER_ALIGN
@@ -487,9 +500,9 @@ def create_attack_trees_sheet(wb: Workbook, data: Dict[str, Any]) -> None:
         # 攻击树图片区域
         img_start = current_row
         ws.merge_cells(f'A{current_row}:F{current_row + 17}')
-        if tree.get('image') and os.path.exists(tree['image']):
+        if tree['image'] and os.path.exists(tree['image']):
             try:
-                img = Image(tree['image'])
+                img = load_image(tree['image'])
                 img.width = 700
                 img.height = 350
                 ws.add_image(img, f'A{current_row}')
@@ -552,7 +565,7 @@ def create_tara_results_sheet(wb: Workbook, data: Dict[str, Any]) -> None:
     
     # 主标题
     ws.merge_cells(f'A{current_row}:AN{current_row}')
-    ws[f'A{current_row}'] = data.get('title', 'MY25 EV平台中控主机_TARA分析结果 TARA Analysis Results')
+    ws[f'A{current_row}'] = section_title(data, 'MY25 EV平台中控主机_TARA分析结果 TARA Analysis Results')
     ws[f'A{current_row}'].font = Font(size=14, bold=True, color=TARAStyles.DARK_BLUE)
     ws[f'A{current_row}'].alignment = TARAStyles.CENTER_ALIGN
     current_row += 2
@@ -649,39 +662,39 @@ def create_tara_results_sheet(wb: Workbook, data: Dict[str, Any]) -> None:
     current_row += 1
     
     # 数据行
-    for result in data.get('results', []):
+    for result in data['results']:
         row = current_row
         
         # 基本信息
-        ws[f'A{row}'] = result.get('asset_id', '')
-        ws[f'B{row}'] = result.get('asset_name', '')
-        ws[f'C{row}'] = result.get('subdomain1', '')
-        ws[f'D{row}'] = result.get('subdomain2', '')
-        ws[f'E{row}'] = result.get('subdomain3', '')
-        ws[f'F{row}'] = result.get('category', '')
-        ws[f'G{row}'] = result.get('security_attribute', '')
-        ws[f'H{row}'] = result.get('stride_model', '')
-        ws[f'I{row}'] = result.get('threat_scenario', '')
-        ws[f'J{row}'] = result.get('attack_path', '')
-        ws[f'K{row}'] = result.get('wp29_mapping', '')
+        ws[f'A{row}'] = result['asset_id']
+        ws[f'B{row}'] = result['asset_name']
+        ws[f'C{row}'] = result['subdomain1']
+        ws[f'D{row}'] = result['subdomain2']
+        ws[f'E{row}'] = result['subdomain3']
+        ws[f'F{row}'] = result['category']
+        ws[f'G{row}'] = result['security_attribute']
+        ws[f'H{row}'] = result['stride_model']
+        ws[f'I{row}'] = result['threat_scenario']
+        ws[f'J{row}'] = result['attack_path']
+        ws[f'K{row}'] = result['wp29_mapping']
         
         # 威胁分析 - 攻击向量
-        attack_vector = result.get('attack_vector', '本地')
+        attack_vector = result['attack_vector']
         ws[f'L{row}'] = attack_vector
         ws[f'M{row}'] = f'=IF(L{row}="网络",0.85,IF(L{row}="邻居",0.62,IF(L{row}="本地",0.55,IF(L{row}="物理",0.2,0))))'
         
         # 攻击复杂度
-        attack_complexity = result.get('attack_complexity', '低')
+        attack_complexity = result['attack_complexity']
         ws[f'N{row}'] = attack_complexity
         ws[f'O{row}'] = f'=IF(N{row}="低",0.77,IF(N{row}="高",0.44,0))'
         
         # 权限要求
-        privileges = result.get('privileges_required', '低')
+        privileges = result['privileges_required']
         ws[f'P{row}'] = privileges
         ws[f'Q{row}'] = f'=IF(P{row}="无",0.85,IF(P{row}="低",0.62,IF(P{row}="高",0.27,0)))'
         
         # 用户交互
-        user_interaction = result.get('user_interaction', '不需要')
+        user_interaction = result['user_interaction']
         ws[f'R{row}'] = user_interaction
         ws[f'S{row}'] = f'=IF(R{row}="不需要",0.85,IF(R{row}="需要",0.62,0))'
         
@@ -690,25 +703,25 @@ def create_tara_results_sheet(wb: Workbook, data: Dict[str, Any]) -> None:
         ws[f'U{row}'] = f'=IF(T{row}<=1.05,"很低",IF(T{row}<=1.99,"低",IF(T{row}<=2.99,"中",IF(T{row}<=3.99,"高","很高"))))'
         
         # 安全影响
-        safety = result.get('safety_impact', '中等的')
+        safety = result['safety_impact']
         ws[f'V{row}'] = safety
         ws[f'W{row}'] = f'=IF(V{row}="可忽略不计的","没有受伤",IF(V{row}="中等的","轻伤和中等伤害",IF(V{row}="重大的","严重伤害(生存概率高)",IF(V{row}="严重的","危及生命(生存概率不确定)或致命伤害",""))))'
         ws[f'X{row}'] = f'=IF(V{row}="可忽略不计的",0,IF(V{row}="中等的",1,IF(V{row}="重大的",10,IF(V{row}="严重的",1000,0))))'
         
         # 经济影响
-        financial = result.get('financial_impact', '中等的')
+        financial = result['financial_impact']
         ws[f'Y{row}'] = financial
         ws[f'Z{row}'] = f'=IF(Y{row}="可忽略不计的","财务损失不会产生任何影响",IF(Y{row}="中等的","财务损失会产生中等影响",IF(Y{row}="重大的","财务损失会产生重大影响",IF(Y{row}="严重的","财务损失会产生严重影响",""))))'
         ws[f'AA{row}'] = f'=IF(Y{row}="可忽略不计的",0,IF(Y{row}="中等的",1,IF(Y{row}="重大的",10,IF(Y{row}="严重的",1000,0))))'
         
         # 操作影响
-        operational = result.get('operational_impact', '重大的')
+        operational = result['operational_impact']
         ws[f'AB{row}'] = operational
         ws[f'AC{row}'] = f'=IF(AB{row}="可忽略不计的","操作损坏不会导致车辆功能减少",IF(AB{row}="中等的","操作损坏会导致车辆功能中等减少",IF(AB{row}="重大的","操作损坏会导致车辆功能重大减少",IF(AB{row}="严重的","操作损坏会导致车辆功能丧失",""))))'
         ws[f'AD{row}'] = f'=IF(AB{row}="可忽略不计的",0,IF(AB{row}="中等的",1,IF(AB{row}="重大的",10,IF(AB{row}="严重的",1000,0))))'
         
         # 隐私影响
-        privacy = result.get('privacy_impact', '可忽略不计的')
+        privacy = result['privacy_impact']
         ws[f'AE{row}'] = privacy
         ws[f'AF{row}'] = f'=IF(AE{row}="可忽略不计的","隐私危害不会产生任何影响",IF(AE{row}="中等的","隐私危害会产生中等影响",IF(AE{row}="重大的","隐私危害会产生重大影响",IF(AE{row}="严重的","隐私危害会产生严重影响",""))))'
         ws[f'AG{row}'] = f'=IF(AE{row}="可忽略不计的",0,IF(AE{row}="中等的",1,IF(AE{row}="重大的",10,IF(AE{row}="严重的",1000,0))))'
@@ -725,7 +738,7 @@ def create_tara_results_sheet(wb: Workbook, data: Dict[str, Any]) -> None:
         
         # 安全目标和需求
         ws[f'AL{row}'] = f'=IF(AK{row}="保留风险","/",IF(OR(AK{row}="降低风险",AK{row}="降低风险/规避风险/转移风险"),"需要定义安全目标",""))'
-        ws[f'AM{row}'] = result.get('security_requirement', '')
+        ws[f'AM{row}'] = result['security_requirement']
         
         # WP29控制映射
         ws[f'AN{row}'] = f'=IF(H{row}="T篡改","M10",IF(H{row}="D拒绝服务","M13",IF(H{row}="I信息泄露","M11",IF(H{row}="S欺骗","M23",IF(H{row}="R抵赖","M24",IF(H{row}="E权限提升","M16",""))))))'
@@ -740,6 +753,28 @@ def create_tara_results_sheet(wb: Workbook, data: Dict[str, Any]) -> None:
 
 
 # ==================== 主生成函数 ====================
+def write_tara_excel(output_path: str, report: Dict[str, Any]) -> str:
+    """按规范化后的报告数据（normalize_report_data 的结果）写出Excel文件"""
+    wb = Workbook()
+    
+    # 创建各个Sheet
+    with phase('excel.create_cover_sheet'):
+        create_cover_sheet(wb, report['cover'])
+    with phase('excel.create_definitions_sheet'):
+        create_definitions_sheet(wb, report['definitions'])
+    with phase('excel.create_assets_sheet'):
+        create_assets_sheet(wb, report['assets'])
+    with phase('excel.create_attack_trees_sheet'):
+        create_attack_trees_sheet(wb, report['attack_trees'])
+    with phase('excel.create_tara_results_sheet'):
+        create_tara_results_sheet(wb, report['tara_results'])
+    
+    # 保存文件
+    with phase('excel.save'):
+        wb.save(output_path)
+    return output_path
+
+
 def generate_tara_excel(
     output_path: str,
     cover_data: Dict[str, Any],
@@ -750,6 +785,7 @@ def generate_tara_excel(
 ) -> str:
     """
     生成TARA分析报告Excel文件
+    各部分数据只补全缺失字段，不做校验（缺失字段按默认值处理）
     
     参数:
         output_path: 输出文件路径
@@ -762,18 +798,15 @@ def generate_tara_excel(
     返回:
         str: 生成的文件路径
     """
-    wb = Workbook()
-    
-    # 创建各个Sheet
-    create_cover_sheet(wb, cover_data)
-    create_definitions_sheet(wb, definitions_data)
-    create_assets_sheet(wb, assets_data)
-    create_attack_trees_sheet(wb, attack_trees_data)
-    create_tara_results_sheet(wb, tara_results_data)
-    
-    # 保存文件
-    wb.save(output_path)
-    return output_path
+    with phase('excel.normalize'):
+        report = normalize_report_data({
+            'cover': cover_data,
+            'definitions': definitions_data,
+            'assets': assets_data,
+            'attack_trees': attack_trees_data,
+            'tara_results': tara_results_data
+        }, validate=False)
+    return write_tara_excel(output_path, report)
 
 
 def generate_tara_excel_from_json(
@@ -785,7 +818,7 @@ def generate_tara_excel_from_json(
     
     参数:
         output_path: 输出文件路径
-        json_data: 包含所有数据的JSON对象
+        json_data: 包含所有数据的JSON对象（已规范化的 ReportDict 不再重复校验）
             {
                 "cover": {...},
                 "definitions": {...},
@@ -797,14 +830,9 @@ def generate_tara_excel_from_json(
     返回:
         str: 生成的文件路径
     """
-    return generate_tara_excel(
-        output_path=output_path,
-        cover_data=json_data.get('cover', {}),
-        definitions_data=json_data.get('definitions', {}),
-        assets_data=json_data.get('assets', {}),
-        attack_trees_data=json_data.get('attack_trees', {}),
-        tara_results_data=json_data.get('tara_results', {})
-    )
+    with phase('excel.normalize'):
+        report = normalize_report_data(json_data)
+    return write_tara_excel(output_path, report)
 
 
 if __name__ == "__main__":
@@ -4,8 +4,11 @@ TARA PDF报告生成器
 与Excel报告保持内容一致
 """
 
+import io
 import os
-from typing import Dict, List, Any, Optional
+import math
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Tuple, Union
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -13,7 +16,7 @@ from reportlab.lib.units import mm, cm, inch
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from reportlab.platypus import (
     SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle,
-    PageBreak, Image, KeepTogether, ListFlowable, ListItem
+    PageBreak, Image, KeepTogether, ListFlowable, ListItem, Flowable
 )
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
@@ -21,6 +24,10 @@ from reportlab.pdfbase.cidfonts import UnicodeCIDFont
 from reportlab.graphics.shapes import Drawing, Line
 from PIL import Image as PILImage
 
+from .instrumentation import phase
+from .models import normalize_report_data, section_title
+from .pdf_profiles import PDFProfile, PDF_PROFILES, DEFAULT_PDF_PROFILE, get_pdf_profile
+
 
 # ==================== 中文字体注册 ====================
 import urllib.request
@@ -130,12 +137,17 @@ def register_chinese_fonts():
     """
     注册中文字体，解决乱码问题
     优先级：系统字体 > 本地缓存字体 > CID字体
+    返回: (字体名称, 字体来源)，字体来源为字体文件路径或CID字体名
     """
     registered_fonts = []
+    font_source = None
     registered_bold = None
     
+    # 设置 TARA_PDF_FONT=cid 时跳过系统字体，直接使用内置CID字体（便于离线复现）
+    use_cid_only = os.environ.get('TARA_PDF_FONT', '').lower() == 'cid'
+    
     # 1. 尝试注册系统字体
-    font_candidates = find_chinese_fonts()
+    font_candidates = [] if use_cid_only else find_chinese_fonts()
     
     for font_info in font_candidates:
         font_path, font_name = font_info[0], font_info[1]
@@ -148,6 +160,7 @@ def register_chinese_fonts():
                 else:
                     pdfmetrics.registerFont(TTFont(font_name, font_path))
                 registered_fonts.append(font_name)
+                font_source = font_path
                 print(f"成功注册字体: {font_name} ({font_path})")
                 
                 # 只需要注册一个即可
@@ -162,6 +175,7 @@ def register_chinese_fonts():
             # STSong-Light 是 reportlab 内置的 CID 字体，支持中文
             pdfmetrics.registerFont(UnicodeCIDFont('STSong-Light'))
             registered_fonts.append('STSong-Light')
+            font_source = 'cid:STSong-Light'
             print("使用内置CID字体: STSong-Light")
         except Exception as e:
             print(f"注册CID字体失败: {e}")
@@ -171,6 +185,7 @@ def register_chinese_fonts():
         try:
             pdfmetrics.registerFont(UnicodeCIDFont('HeiseiMin-W3'))
             registered_fonts.append('HeiseiMin-W3')
+            font_source = 'cid:HeiseiMin-W3'
             print("使用内置CID字体: HeiseiMin-W3")
         except Exception as e:
             print(f"注册HeiseiMin字体失败: {e}")
@@ -190,9 +205,9 @@ def register_chinese_fonts():
         print("或者将中文字体文件（.ttf/.ttc）放到以下目录：")
         print(f"  {FONT_CACHE_DIR}")
         print("=" * 60)
-        return 'Helvetica'
+        return 'Helvetica', 'builtin:Helvetica'
     
-    return registered_fonts[0]
+    return registered_fonts[0], font_source
 
 
 def get_font_name():
@@ -200,8 +215,23 @@ def get_font_name():
     return CHINESE_FONT
 
 
+def get_generator_fingerprint() -> str:
+    """
+    获取生成器指纹，用于PDF缓存失效判断
+    由生成器版本和所用字体（名称、文件大小、修改时间）组成
+    """
+    font_stamp = CHINESE_FONT_SOURCE
+    if CHINESE_FONT_SOURCE and os.path.exists(CHINESE_FONT_SOURCE):
+        stat = os.stat(CHINESE_FONT_SOURCE)
+        font_stamp = f"{CHINESE_FONT_SOURCE}:{stat.st_size}:{stat.st_mtime_ns}"
+    return f"{PDF_GENERATOR_VERSION}|{CHINESE_FONT}|{font_stamp}"
+
+
+# PDF生成器版本，修改输出内容或版式时需要递增，以使已缓存的PDF失效
+PDF_GENERATOR_VERSION = "1.2.1"
+
 # 注册字体并获取默认中文字体名
-CHINESE_FONT = register_chinese_fonts()
+CHINESE_FONT, CHINESE_FONT_SOURCE = register_chinese_fonts()
 CHINESE_FONT_BOLD = CHINESE_FONT  # 大多数中文字体没有独立的粗体，使用相同字体
 
 
@@ -344,28 +374,81 @@ def safe_paragraph(text: str, style, max_width: Optional[float] = None) -> Parag
     return Paragraph(text, style)
 
 
-def load_image_safe(image_path: str, max_width: float = 450, max_height: float = 300) -> Optional[Image]:
-    """安全加载图片，自动缩放"""
-    if not image_path or not os.path.exists(image_path):
-        return None
-    
-    try:
-        # 使用PIL获取图片尺寸
-        with PILImage.open(image_path) as img:
-            orig_width, orig_height = img.size
-        
-        # 计算缩放比例
-        width_ratio = max_width / orig_width
-        height_ratio = max_height / orig_height
-        ratio = min(width_ratio, height_ratio, 1.0)  # 不放大
+@lru_cache(maxsize=8)
+def _resample_image(image_path: str, mtime_ns: int, target_width: int, target_height: int,
+                    jpeg_quality: Optional[int]) -> bytes:
+    """
+    按目标像素尺寸重采样图片，返回编码后的图片数据（JPEG或无损PNG）
+    同一图片在报告中多次出现时复用结果（mtime_ns参与缓存键，图片变化后自动失效）
+    """
+    with PILImage.open(image_path) as img:
+        img.load()
+        if img.width > target_width or img.height > target_height:
+            img = img.resize((target_width, target_height), PILImage.LANCZOS)
         
-        new_width = orig_width * ratio
-        new_height = orig_height * ratio
+        buffer = io.BytesIO()
+        if not jpeg_quality:
+            if img.mode not in ('RGB', 'RGBA', 'L', 'LA', 'P'):
+                img = img.convert('RGB')
+            # reportlab嵌入时会重新压缩像素数据，这里使用最快的压缩级别
+            img.save(buffer, 'PNG', compress_level=1)
+            return buffer.getvalue()
         
-        return Image(image_path, width=new_width, height=new_height)
-    except Exception as e:
-        print(f"Failed to load image {image_path}: {e}")
+        # JPEG不支持透明通道，合成到白色背景
+        if img.mode in ('RGBA', 'LA', 'P'):
+            img = img.convert('RGBA')
+            background = PILImage.new('RGB', img.size, (255, 255, 255))
+            background.paste(img, mask=img.split()[-1])
+            img = background
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+        img.save(buffer, 'JPEG', quality=jpeg_quality, optimize=True)
+        return buffer.getvalue()
+
+
+def load_image_safe(image_path: str, max_width: float = 450, max_height: float = 300,
+                    profile: Optional[PDFProfile] = None) -> Optional[Image]:
+    """
+    安全加载图片，自动缩放
+    
+    指定输出配置时按配置处理：不含图片时返回None；
+    设置了image_dpi时按显示尺寸重采样，设置了jpeg_quality时重新压缩为JPEG。
+    """
+    if profile and not profile.include_images:
+        return None
+    if not image_path or not os.path.exists(image_path):
         return None
+    
+    with phase('pdf.load_image'):
+        try:
+            # 使用PIL获取图片尺寸
+            with PILImage.open(image_path) as img:
+                orig_width, orig_height = img.size
+                
+                # 计算缩放比例
+                width_ratio = max_width / orig_width
+                height_ratio = max_height / orig_height
+                ratio = min(width_ratio, height_ratio, 1.0)  # 不放大
+                
+                new_width = orig_width * ratio
+                new_height = orig_height * ratio
+                
+                source = image_path
+                if profile and profile.image_dpi:
+                    # 显示尺寸(pt) -> 目标像素
+                    target_width = max(1, math.ceil(new_width / 72 * profile.image_dpi))
+                    target_height = max(1, math.ceil(new_height / 72 * profile.image_dpi))
+                    needs_resample = orig_width > target_width or orig_height > target_height
+                    if needs_resample or profile.jpeg_quality:
+                        source = io.BytesIO(_resample_image(
+                            image_path, os.stat(image_path).st_mtime_ns,
+                            target_width, target_height, profile.jpeg_quality
+                        ))
+            
+            return Image(source, width=new_width, height=new_height)
+        except Exception as e:
+            print(f"Failed to load image {image_path}: {e}")
+            return None
 
 
 def create_section_header(title: str, styles) -> Table:
@@ -408,12 +491,12 @@ def create_cover_page(data: Dict[str, Any], styles) -> List:
     
     # 数据等级信息（右上角）
     info_data = [
-        [f"数据等级：{data.get('data_level', '秘密')}", ""],
+        [f"数据等级：{data['data_level']}", ""],
         [f"Data level: Confidential", ""],
-        [f"编号：{data.get('document_number', '')}", ""],
-        [f"Number: {data.get('document_number', '')}", ""],
-        [f"版本：{data.get('version', '')}", ""],
-        [f"Version: {data.get('version', '')}", ""],
+        [f"编号：{data['document_number']}", ""],
+        [f"Number: {data['document_number']}", ""],
+        [f"版本：{data['version']}", ""],
+        [f"Version: {data['version']}", ""],
     ]
     info_table = Table(info_data, colWidths=[300, 200])
     info_table.setStyle(TableStyle([
@@ -428,15 +511,15 @@ def create_cover_page(data: Dict[str, Any], styles) -> List:
     elements.append(Spacer(1, 80))
     
     # 主标题
-    title = data.get('report_title', '威胁分析和风险评估报告')
-    title_en = data.get('report_title_en', 'Threat Analysis And Risk Assessment Report')
+    title = data['report_title']
+    title_en = data['report_title_en']
     elements.append(Paragraph(title, styles['TARATitle']))
     elements.append(Paragraph(title_en, styles['TARASubTitle']))
     
     elements.append(Spacer(1, 20))
     
     # 项目名称
-    project_name = data.get('project_name', '')
+    project_name = data['project_name']
     if project_name:
         elements.append(Paragraph(project_name, styles['TARATitle']))
     
@@ -444,10 +527,10 @@ def create_cover_page(data: Dict[str, Any], styles) -> List:
     
     # 签署信息表格
     sign_data = [
-        ['编制/日期：', data.get('author_date', ''), 'Author/Date:', data.get('author_date', '')],
-        ['审核/日期：', data.get('review_date', ''), 'Review/Date:', data.get('review_date', '')],
-        ['会签/日期：', data.get('sign_date', ''), 'Signature/Date:', data.get('sign_date', '')],
-        ['批准/日期：', data.get('approve_date', ''), 'Approve/Date:', data.get('approve_date', '')],
+        ['编制/日期：', data['author_date'], 'Author/Date:', data['author_date']],
+        ['审核/日期：', data['review_date'], 'Review/Date:', data['review_date']],
+        ['会签/日期：', data['sign_date'], 'Signature/Date:', data['sign_date']],
+        ['批准/日期：', data['approve_date'], 'Approve/Date:', data['approve_date']],
     ]
     
     sign_table = Table(sign_data, colWidths=[80, 100, 90, 100])
@@ -467,12 +550,12 @@ def create_cover_page(data: Dict[str, Any], styles) -> List:
 
 
 # ==================== 相关定义页 ====================
-def create_definitions_page(data: Dict[str, Any], styles) -> List:
+def create_definitions_page(data: Dict[str, Any], styles, profile: Optional[PDFProfile] = None) -> List:
     """创建相关定义页"""
     elements = []
     
     # 页面标题
-    title = data.get('title', 'TARA分析报告 - 相关定义')
+    title = section_title(data, 'TARA分析报告 - 相关定义')
     elements.append(Paragraph(title, styles['TARATitle']))
     elements.append(Spacer(1, 12))
     
@@ -480,7 +563,7 @@ def create_definitions_page(data: Dict[str, Any], styles) -> List:
     elements.append(create_section_header('1. 功能描述 Functional Description', styles))
     elements.append(Spacer(1, 6))
     
-    func_desc = data.get('functional_description', '')
+    func_desc = data['functional_description']
     if func_desc:
         elements.append(Paragraph(func_desc, styles['TARABody']))
     elements.append(Spacer(1, 12))
@@ -489,7 +572,7 @@ def create_definitions_page(data: Dict[str, Any], styles) -> List:
     elements.append(create_section_header('2. 项目边界 Item Boundary', styles))
     elements.append(Spacer(1, 6))
     
-    boundary_img = load_image_safe(data.get('item_boundary_image', ''), max_width=480, max_height=280)
+    boundary_img = load_image_safe(data['item_boundary_image'], max_width=480, max_height=280, profile=profile)
     if boundary_img:
         elements.append(boundary_img)
     else:
@@ -500,7 +583,7 @@ def create_definitions_page(data: Dict[str, Any], styles) -> List:
     elements.append(create_section_header('3. 系统架构图 System Architecture', styles))
     elements.append(Spacer(1, 6))
     
-    sys_arch_img = load_image_safe(data.get('system_architecture_image', ''), max_width=480, max_height=280)
+    sys_arch_img = load_image_safe(data['system_architecture_image'], max_width=480, max_height=280, profile=profile)
     if sys_arch_img:
         elements.append(sys_arch_img)
     else:
@@ -511,7 +594,7 @@ def create_definitions_page(data: Dict[str, Any], styles) -> List:
     elements.append(create_section_header('4. 软件架构图 Software Architecture', styles))
     elements.append(Spacer(1, 6))
     
-    sw_arch_img = load_image_safe(data.get('software_architecture_image', ''), max_width=480, max_height=280)
+    sw_arch_img = load_image_safe(data['software_architecture_image'], max_width=480, max_height=280, profile=profile)
     if sw_arch_img:
         elements.append(sw_arch_img)
     else:
@@ -522,7 +605,7 @@ def create_definitions_page(data: Dict[str, Any], styles) -> List:
     elements.append(create_section_header('5. 相关项假设 Item Assumptions', styles))
     elements.append(Spacer(1, 6))
     
-    assumptions = data.get('assumptions', [])
+    assumptions = data['assumptions']
     if assumptions:
         # 表头
         header = ['假设编号\nAssumption ID', '假设描述\nAssumption Description']
@@ -530,8 +613,8 @@ def create_definitions_page(data: Dict[str, Any], styles) -> List:
         
         for asm in assumptions:
             row = [
-                asm.get('id', ''),
-                asm.get('description', '')
+                asm['id'],
+                asm['description']
             ]
             table_data.append(row)
         
@@ -558,16 +641,16 @@ def create_definitions_page(data: Dict[str, Any], styles) -> List:
     elements.append(create_section_header('6. 术语表 Terminology', styles))
     elements.append(Spacer(1, 6))
     
-    terminology = data.get('terminology', [])
+    terminology = data['terminology']
     if terminology:
         header = ['缩写\nAbbreviation', '英文全称\nEnglish Full Name', '中文全称\nChinese Name']
         table_data = [header]
         
         for term in terminology:
             row = [
-                term.get('abbreviation', ''),
-                term.get('english', ''),
-                term.get('chinese', '')
+                term['abbreviation'],
+                term['english'],
+                term['chinese']
             ]
             table_data.append(row)
         
@@ -591,16 +674,16 @@ def create_definitions_page(data: Dict[str, Any], styles) -> List:
 
 
 # ==================== 资产列表页 ====================
-def create_assets_page(data: Dict[str, Any], styles) -> List:
+def create_assets_page(data: Dict[str, Any], styles, profile: Optional[PDFProfile] = None) -> List:
     """创建资产列表页"""
     elements = []
     
     # 页面标题
-    title = data.get('title', '资产列表 Asset List')
+    title = section_title(data, '资产列表 Asset List')
     elements.append(Paragraph(title, styles['TARATitle']))
     elements.append(Spacer(1, 12))
     
-    assets = data.get('assets', [])
+    assets = data['assets']
     if assets:
         # 创建表头（两行）
         header1 = ['Asset Identification 资产识别', '', '', '', 'Cybersecurity Attributes 网络安全属性', '', '', '', '', '']
@@ -621,16 +704,16 @@ def create_assets_page(data: Dict[str, Any], styles) -> List:
         
         for asset in assets:
             row = [
-                asset.get('id', ''),
-                asset.get('name', ''),
-                asset.get('category', ''),
-                asset.get('remarks', '')[:50] + '...' if len(asset.get('remarks', '')) > 50 else asset.get('remarks', ''),
-                '√' if asset.get('authenticity') else '',
-                '√' if asset.get('integrity') else '',
-                '√' if asset.get('non_repudiation') else '',
-                '√' if asset.get('confidentiality') else '',
-                '√' if asset.get('availability') else '',
-                '√' if asset.get('authorization') else ''
+                asset['id'],
+                asset['name'],
+                asset['category'],
+                asset['remarks'][:50] + '...' if len(asset['remarks']) > 50 else asset['remarks'],
+                '√' if asset['authenticity'] else '',
+                '√' if asset['integrity'] else '',
+                '√' if asset['non_repudiation'] else '',
+                '√' if asset['confidentiality'] else '',
+                '√' if asset['availability'] else '',
+                '√' if asset['authorization'] else ''
             ]
             table_data.append(row)
         
@@ -662,7 +745,7 @@ def create_assets_page(data: Dict[str, Any], styles) -> List:
     elements.append(create_section_header('数据流图 Data Flow Diagram', styles))
     elements.append(Spacer(1, 6))
     
-    dataflow_img = load_image_safe(data.get('dataflow_image', ''), max_width=480, max_height=300)
+    dataflow_img = load_image_safe(data['dataflow_image'], max_width=480, max_height=300, profile=profile)
     if dataflow_img:
         elements.append(dataflow_img)
     else:
@@ -673,24 +756,24 @@ def create_assets_page(data: Dict[str, Any], styles) -> List:
 
 
 # ==================== 攻击树页 ====================
-def create_attack_trees_page(data: Dict[str, Any], styles) -> List:
+def create_attack_trees_page(data: Dict[str, Any], styles, profile: Optional[PDFProfile] = None) -> List:
     """创建攻击树页"""
     elements = []
     
     # 页面标题
-    title = data.get('title', '攻击树分析 Attack Tree Analysis')
+    title = section_title(data, '攻击树分析 Attack Tree Analysis')
     elements.append(Paragraph(title, styles['TARATitle']))
     elements.append(Spacer(1, 12))
     
-    attack_trees = data.get('attack_trees', [])
+    attack_trees = data['attack_trees']
     for i, tree in enumerate(attack_trees):
         # 攻击树标题
-        tree_title = tree.get('title', f'攻击树 {i+1}')
+        tree_title = tree['title'] or f'攻击树 {i+1}'
         elements.append(create_section_header(tree_title, styles))
         elements.append(Spacer(1, 6))
         
         # 攻击树图片
-        tree_img = load_image_safe(tree.get('image', ''), max_width=480, max_height=350)
+        tree_img = load_image_safe(tree['image'], max_width=480, max_height=350, profile=profile)
         if tree_img:
             elements.append(tree_img)
         else:
@@ -708,11 +791,11 @@ def create_tara_results_page(data: Dict[str, Any], styles) -> List:
     elements = []
     
     # 页面标题
-    title = data.get('title', 'TARA分析结果 TARA Analysis Results')
+    title = section_title(data, 'TARA分析结果 TARA Analysis Results')
     elements.append(Paragraph(title, styles['TARATitle']))
     elements.append(Spacer(1, 8))
     
-    results = data.get('results', [])
+    results = data['results']
     if not results:
         elements.append(Paragraph('无分析结果', styles['TARABody']))
         return elements
@@ -720,15 +803,15 @@ def create_tara_results_page(data: Dict[str, Any], styles) -> List:
     # 为每条结果创建详细卡片
     for idx, result in enumerate(results):
         # 威胁标题
-        threat_title = f"威胁 {idx+1}: {result.get('asset_name', '')} - {result.get('stride_model', '')}"
+        threat_title = f"威胁 {idx+1}: {result['asset_name']} - {result['stride_model']}"
         elements.append(create_section_header(threat_title, styles))
         elements.append(Spacer(1, 4))
         
         # 基本信息表
         basic_data = [
-            ['资产ID', result.get('asset_id', ''), '资产名称', result.get('asset_name', '')],
-            ['分类', result.get('category', ''), '安全属性', result.get('security_attribute', '').replace('\n', ' ')],
-            ['STRIDE模型', result.get('stride_model', ''), 'WP29映射', result.get('wp29_mapping', '').replace('\n', ', ')],
+            ['资产ID', result['asset_id'], '资产名称', result['asset_name']],
+            ['分类', result['category'], '安全属性', result['security_attribute'].replace('\n', ' ')],
+            ['STRIDE模型', result['stride_model'], 'WP29映射', result['wp29_mapping'].replace('\n', ', ')],
         ]
         
         basic_table = Table(basic_data, colWidths=[60, 170, 60, 180])
@@ -746,10 +829,10 @@ def create_tara_results_page(data: Dict[str, Any], styles) -> List:
         elements.append(Spacer(1, 4))
         
         # 威胁场景
-        elements.append(Paragraph(f"<b>威胁场景:</b> {result.get('threat_scenario', '')}", styles['TARABody']))
+        elements.append(Paragraph(f"<b>威胁场景:</b> {result['threat_scenario']}", styles['TARABody']))
         
         # 攻击路径
-        attack_path = result.get('attack_path', '')
+        attack_path = result['attack_path']
         if attack_path:
             elements.append(Paragraph(f"<b>攻击路径:</b> {attack_path[:200]}{'...' if len(attack_path) > 200 else ''}", styles['TARABody']))
         elements.append(Spacer(1, 4))
@@ -758,10 +841,10 @@ def create_tara_results_page(data: Dict[str, Any], styles) -> List:
         threat_analysis_data = [
             ['攻击向量', '攻击复杂度', '权限要求', '用户交互'],
             [
-                result.get('attack_vector', ''),
-                result.get('attack_complexity', ''),
-                result.get('privileges_required', ''),
-                result.get('user_interaction', '')
+                result['attack_vector'],
+                result['attack_complexity'],
+                result['privileges_required'],
+                result['user_interaction']
             ]
         ]
         
@@ -783,10 +866,10 @@ def create_tara_results_page(data: Dict[str, Any], styles) -> List:
         impact_data = [
             ['安全影响', '经济影响', '操作影响', '隐私影响'],
             [
-                result.get('safety_impact', ''),
-                result.get('financial_impact', ''),
-                result.get('operational_impact', ''),
-                result.get('privacy_impact', '')
+                result['safety_impact'],
+                result['financial_impact'],
+                result['operational_impact'],
+                result['privacy_impact']
             ]
         ]
         
@@ -805,7 +888,7 @@ def create_tara_results_page(data: Dict[str, Any], styles) -> List:
         elements.append(Spacer(1, 4))
         
         # 风险评估和安全需求
-        security_req = result.get('security_requirement', '')
+        security_req = result['security_requirement']
         risk_data = [
             ['安全需求', security_req[:100] + '...' if len(security_req) > 100 else security_req]
         ]
@@ -832,6 +915,141 @@ def create_tara_results_page(data: Dict[str, Any], styles) -> List:
 
 
 # ==================== 风险汇总页 ====================
+# 结果条数超过该阈值时，风险汇总表改用直接绘制画布的快速路径
+RISK_SUMMARY_CANVAS_THRESHOLD = 500
+
+RISK_SUMMARY_HEADER = ['序号', '资产', 'STRIDE', '攻击向量', '安全影响', '操作影响', '安全需求']
+RISK_SUMMARY_COL_WIDTHS = [30, 70, 50, 50, 60, 60, 160]
+
+
+def risk_summary_row(idx: int, result: Dict[str, Any]) -> List[str]:
+    """构建风险汇总表的一行数据"""
+    security_req = result['security_requirement']
+    return [
+        str(idx + 1),
+        result['asset_name'],
+        result['stride_model'],
+        result['attack_vector'],
+        result['safety_impact'],
+        result['operational_impact'],
+        security_req[:30] + '...' if len(security_req) > 30 else security_req
+    ]
+
+
+def clip_text(text: str, font_name: str, font_size: float, max_width: float) -> Tuple[str, float]:
+    """按列宽截断文本，超出部分以省略号结尾，返回(文本, 宽度)"""
+    text = str(text or '').replace('\n', ' ')
+    width = pdfmetrics.stringWidth(text, font_name, font_size)
+    if width <= max_width:
+        return text, width
+    ellipsis = '...'
+    available = max_width - pdfmetrics.stringWidth(ellipsis, font_name, font_size)
+    # 二分查找可容纳的最大字符数
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if pdfmetrics.stringWidth(text[:mid], font_name, font_size) <= available:
+            low = mid
+        else:
+            high = mid - 1
+    text = text[:low] + ellipsis
+    return text, pdfmetrics.stringWidth(text, font_name, font_size)
+
+
+class RiskSummaryTable(Flowable):
+    """
+    风险汇总表（画布快速路径）
+
+    直接在画布上按固定行高逐页绘制，每页重复表头。
+    分页时只切分行号区间，不复制行数据，也不创建单元格对象，
+    因此耗时随行数线性增长，内存占用保持平稳。
+    rows 为 risk_summary_row 构建好的行数据（结果可能是只能顺序迭代的 StreamedArray，不能按下标读取）
+    """
+
+    FONT_SIZE = 7
+    ROW_HEIGHT = 16
+    HEADER_HEIGHT = 18
+    PADDING = 3
+
+    def __init__(self, rows: List[List[str]], start: int = 0, end: Optional[int] = None):
+        Flowable.__init__(self)
+        self.rows = rows
+        self.start = start
+        self.end = len(rows) if end is None else end
+        self.col_widths = RISK_SUMMARY_COL_WIDTHS
+        self.width = sum(self.col_widths)
+        # 与其他表格（Table默认居中）对齐
+        self.hAlign = 'CENTER'
+
+    def _height_for(self, rows: int) -> float:
+        return self.HEADER_HEIGHT + rows * self.ROW_HEIGHT
+
+    def wrap(self, availWidth, availHeight):
+        self.height = self._height_for(self.end - self.start)
+        return self.width, self.height
+
+    def split(self, availWidth, availHeight):
+        rows_fit = int((availHeight - self.HEADER_HEIGHT) // self.ROW_HEIGHT)
+        if rows_fit <= 0:
+            return []
+        if rows_fit >= self.end - self.start:
+            return [self]
+        middle = self.start + rows_fit
+        parts = [
+            RiskSummaryTable(self.rows, self.start, middle),
+            RiskSummaryTable(self.rows, middle, self.end)
+        ]
+        for part in parts:
+            part.hAlign = self.hAlign
+        return parts
+
+    def _draw_cells(self, values: List[str], y: float, height: float, font_name: str) -> None:
+        canv = self.canv
+        x = 0
+        baseline = y + (height - self.FONT_SIZE) / 2 + self.FONT_SIZE * 0.2
+        for value, col_width in zip(values, self.col_widths):
+            text, text_width = clip_text(value, font_name, self.FONT_SIZE, col_width - 2 * self.PADDING)
+            canv.drawString(x + (col_width - text_width) / 2, baseline, text)
+            x += col_width
+
+    def draw(self):
+        canv = self.canv
+        rows = self.end - self.start
+        top = self._height_for(rows)
+        header_bottom = top - self.HEADER_HEIGHT
+
+        # 表头
+        canv.setFillColor(TARAColors.DARK_BLUE)
+        canv.rect(0, header_bottom, self.width, self.HEADER_HEIGHT, stroke=0, fill=1)
+        canv.setFillColor(TARAColors.WHITE)
+        canv.setFont(CHINESE_FONT_BOLD, self.FONT_SIZE)
+        self._draw_cells(RISK_SUMMARY_HEADER, header_bottom, self.HEADER_HEIGHT, CHINESE_FONT_BOLD)
+
+        # 交替行背景色（与全局行号保持一致，跨页不打乱）
+        canv.setFillColor(TARAColors.LIGHT_GRAY)
+        for offset in range(rows):
+            if (self.start + offset) % 2 == 1:
+                y = header_bottom - (offset + 1) * self.ROW_HEIGHT
+                canv.rect(0, y, self.width, self.ROW_HEIGHT, stroke=0, fill=1)
+
+        # 数据行
+        canv.setFillColor(TARAColors.BLACK)
+        canv.setFont(CHINESE_FONT, self.FONT_SIZE)
+        for offset in range(rows):
+            idx = self.start + offset
+            y = header_bottom - (offset + 1) * self.ROW_HEIGHT
+            self._draw_cells(self.rows[idx], y, self.ROW_HEIGHT, CHINESE_FONT)
+
+        # 网格线
+        xs = [0]
+        for col_width in self.col_widths:
+            xs.append(xs[-1] + col_width)
+        ys = [top, header_bottom] + [header_bottom - (i + 1) * self.ROW_HEIGHT for i in range(rows)]
+        canv.setStrokeColor(TARAColors.GRAY)
+        canv.setLineWidth(0.5)
+        canv.grid(xs, ys)
+
+
 def create_risk_summary_page(data: Dict[str, Any], styles) -> List:
     """创建风险汇总页"""
     elements = []
@@ -839,29 +1057,23 @@ def create_risk_summary_page(data: Dict[str, Any], styles) -> List:
     elements.append(create_section_header('风险评估汇总 Risk Assessment Summary', styles))
     elements.append(Spacer(1, 12))
     
-    results = data.get('results', [])
+    results = data['results']
     if not results:
         elements.append(Paragraph('无分析结果', styles['TARABody']))
         return elements
     
+    # 大量结果时直接绘制画布，避免Table布局和分页的开销
+    if len(results) > RISK_SUMMARY_CANVAS_THRESHOLD:
+        elements.append(RiskSummaryTable([risk_summary_row(idx, result) for idx, result in enumerate(results)]))
+        return elements
+    
     # 汇总表
-    summary_header = ['序号', '资产', 'STRIDE', '攻击向量', '安全影响', '操作影响', '安全需求']
-    table_data = [summary_header]
+    table_data = [RISK_SUMMARY_HEADER]
     
     for idx, result in enumerate(results):
-        row = [
-            str(idx + 1),
-            result.get('asset_name', ''),
-            result.get('stride_model', ''),
-            result.get('attack_vector', ''),
-            result.get('safety_impact', ''),
-            result.get('operational_impact', ''),
-            result.get('security_requirement', '')[:30] + '...' if len(result.get('security_requirement', '')) > 30 else result.get('security_requirement', '')
-        ]
-        table_data.append(row)
+        table_data.append(risk_summary_row(idx, result))
     
-    col_widths = [30, 70, 50, 50, 60, 60, 160]
-    summary_table = Table(table_data, colWidths=col_widths, repeatRows=1)
+    summary_table = Table(table_data, colWidths=RISK_SUMMARY_COL_WIDTHS, repeatRows=1)
     summary_table.setStyle(TableStyle([
         ('BACKGROUND', (0, 0), (-1, 0), TARAColors.DARK_BLUE),
         ('TEXTCOLOR', (0, 0), (-1, 0), TARAColors.WHITE),
@@ -881,28 +1093,14 @@ def create_risk_summary_page(data: Dict[str, Any], styles) -> List:
 
 
 # ==================== 主生成函数 ====================
-def generate_tara_pdf(
+def write_tara_pdf(
     output_path: str,
-    cover_data: Dict[str, Any],
-    definitions_data: Dict[str, Any],
-    assets_data: Dict[str, Any],
-    attack_trees_data: Dict[str, Any],
-    tara_results_data: Dict[str, Any]
+    report: Dict[str, Any],
+    profile: Union[str, PDFProfile, None] = None
 ) -> str:
-    """
-    生成TARA分析报告PDF文件
-    
-    参数:
-        output_path: 输出文件路径
-        cover_data: 封面数据
-        definitions_data: 相关定义数据
-        assets_data: 资产列表数据
-        attack_trees_data: 攻击树数据
-        tara_results_data: TARA分析结果数据
+    """按规范化后的报告数据（normalize_report_data 的结果）写出PDF文件"""
+    profile = get_pdf_profile(profile)
     
-    返回:
-        str: 生成的文件路径
-    """
     # 创建PDF文档
     doc = SimpleDocTemplate(
         output_path,
@@ -910,7 +1108,8 @@ def generate_tara_pdf(
         rightMargin=20*mm,
         leftMargin=20*mm,
         topMargin=20*mm,
-        bottomMargin=20*mm
+        bottomMargin=20*mm,
+        pageCompression=1 if profile.page_compression else 0
     )
     
     # 获取样式
@@ -920,53 +1119,95 @@ def generate_tara_pdf(
     elements = []
     
     # 1. 封面
-    elements.extend(create_cover_page(cover_data, styles))
+    with phase('pdf.create_cover_page'):
+        elements.extend(create_cover_page(report['cover'], styles))
     
     # 2. 相关定义
-    elements.extend(create_definitions_page(definitions_data, styles))
+    with phase('pdf.create_definitions_page'):
+        elements.extend(create_definitions_page(report['definitions'], styles, profile))
     
     # 3. 资产列表
-    elements.extend(create_assets_page(assets_data, styles))
+    with phase('pdf.create_assets_page'):
+        elements.extend(create_assets_page(report['assets'], styles, profile))
     
     # 4. 攻击树
-    if attack_trees_data.get('attack_trees'):
-        elements.extend(create_attack_trees_page(attack_trees_data, styles))
+    if report['attack_trees']['attack_trees']:
+        with phase('pdf.create_attack_trees_page'):
+            elements.extend(create_attack_trees_page(report['attack_trees'], styles, profile))
     
     # 5. TARA分析结果
-    elements.extend(create_tara_results_page(tara_results_data, styles))
+    with phase('pdf.create_tara_results_page'):
+        elements.extend(create_tara_results_page(report['tara_results'], styles))
     
     # 6. 风险汇总
     elements.append(PageBreak())
-    elements.extend(create_risk_summary_page(tara_results_data, styles))
+    with phase('pdf.create_risk_summary_page'):
+        elements.extend(create_risk_summary_page(report['tara_results'], styles))
     
     # 构建PDF
-    doc.build(elements)
+    with phase('pdf.doc_build'):
+        doc.build(elements)
     
     return output_path
 
 
+def generate_tara_pdf(
+    output_path: str,
+    cover_data: Dict[str, Any],
+    definitions_data: Dict[str, Any],
+    assets_data: Dict[str, Any],
+    attack_trees_data: Dict[str, Any],
+    tara_results_data: Dict[str, Any],
+    profile: Union[str, PDFProfile, None] = None
+) -> str:
+    """
+    生成TARA分析报告PDF文件
+    各部分数据只补全缺失字段，不做校验（缺失字段按默认值处理）
+    
+    参数:
+        output_path: 输出文件路径
+        cover_data: 封面数据
+        definitions_data: 相关定义数据
+        assets_data: 资产列表数据
+        attack_trees_data: 攻击树数据
+        tara_results_data: TARA分析结果数据
+        profile: 输出配置名称（standard/screen/print/draft），默认standard
+    
+    返回:
+        str: 生成的文件路径
+    """
+    with phase('pdf.normalize'):
+        report = normalize_report_data({
+            'cover': cover_data,
+            'definitions': definitions_data,
+            'assets': assets_data,
+            'attack_trees': attack_trees_data,
+            'tara_results': tara_results_data
+        }, validate=False)
+    return write_tara_pdf(output_path, report, profile)
+
+
 def generate_tara_pdf_from_json(
     output_path: str,
-    json_data: Dict[str, Any]
+    json_data: Dict[str, Any],
+    profile: Union[str, PDFProfile, None] = None,
+    validate: bool = True
 ) -> str:
     """
     从JSON数据生成TARA分析报告PDF文件
     
     参数:
         output_path: 输出文件路径
-        json_data: 包含所有数据的JSON对象
+        json_data: 包含所有数据的JSON对象（已规范化的 ReportDict 不再重复校验）
+        profile: 输出配置名称（standard/screen/print/draft），默认standard
+        validate: 是否完整校验数据；入库时已校验的报告数据传False，只补全缺失字段
     
     返回:
         str: 生成的文件路径
     """
-    return generate_tara_pdf(
-        output_path=output_path,
-        cover_data=json_data.get('cover', {}),
-        definitions_data=json_data.get('definitions', {}),
-        assets_data=json_data.get('assets', {}),
-        attack_trees_data=json_data.get('attack_trees', {}),
-        tara_results_data=json_data.get('tara_results', {})
-    )
+    with phase('pdf.normalize'):
+        report = normalize_report_data(json_data, validate=validate)
+    return write_tara_pdf(output_path, report, profile)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,71 @@
+"""
+报告生成的时间线追踪
+一次操作（生成报告、渲染PDF）中记录的阶段（json.parse、images.persist、各工作表/章节、保存/构建等）
+按开始和结束时间保存，可导出为Chrome trace-event格式，在 chrome://tracing 或 Perfetto 中查看。
+阶段之间按时间嵌套：操作 → 解析/校验 → 渲染（含排队） → 各工作表/章节 → 保存/构建；
+多个报告的时间线合并导出时，每个报告为一个进程，可以看到并发生成时的重叠。
+"""
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+
+class TraceRecorder:
+    """
+    记录一次操作的阶段（作为 instrumentation 的上下文监听器注册）
+    操作本身作为根阶段，从创建记录器开始到 finish() 为止
+    """
+
+    def __init__(self, operation: str):
+        self.operation = operation
+        self.created_at = datetime.now().isoformat()
+        self.start = time.perf_counter()
+        # perf_counter -> Unix时间的偏移，不同操作的时间线可以对齐
+        self._epoch_offset = time.time() - self.start
+        self._spans: List[Tuple[str, float, float]] = []
+
+    def __call__(self, name: str, start: float, end: float) -> None:
+        self._spans.append((name, start, end))
+
+    def finish(self) -> List[List[Any]]:
+        """结束记录，返回阶段列表: [阶段名, 开始时间(微秒, Unix时间), 耗时(微秒)]"""
+        end = time.perf_counter()
+        spans = [(self.operation, self.start, end), *self._spans]
+        return [
+            [name, round((start + self._epoch_offset) * 1e6), round((finish - start) * 1e6)]
+            for name, start, finish in spans
+        ]
+
+
+def chrome_trace(traces: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    导出为Chrome trace-event格式
+    traces: 报告ID -> 该报告的操作记录列表（每项包含 operation、created_at、spans）
+    每个报告为一个进程（pid），每次操作为一个线程（tid），阶段为完整事件（ph=X）
+    """
+    metadata: List[Dict[str, Any]] = []
+    events: List[Dict[str, Any]] = []
+    for pid, (report_id, records) in enumerate(traces.items(), start=1):
+        metadata.append({'ph': 'M', 'name': 'process_name', 'pid': pid, 'tid': 0, 'args': {'name': report_id}})
+        for tid, record in enumerate(records, start=1):
+            metadata.append({
+                'ph': 'M', 'name': 'thread_name', 'pid': pid, 'tid': tid,
+                'args': {'name': f"{record['operation']} {record['created_at']}"}
+            })
+            for name, ts, dur in record['spans']:
+                events.append({
+                    'name': name,
+                    'cat': name.split('.', 1)[0],
+                    'ph': 'X',
+                    'ts': ts,
+                    'dur': dur,
+                    'pid': pid,
+                    'tid': tid
+                })
+    # 同一开始时间时外层阶段在前，查看器按此嵌套
+    events.sort(key=lambda event: (event['ts'], -event['dur']))
+    return {
+        'traceEvents': metadata + events,
+        'displayTimeUnit': 'ms',
+        'otherData': {'report_ids': list(traces)}
+    }
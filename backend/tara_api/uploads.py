@@ -0,0 +1,112 @@
+"""
+上传文件处理
+上传内容按固定大小分块写入磁盘，同一遍读取中完成大小限制、内容哈希和文件类型识别，
+单个上传占用的内存不超过分块大小
+"""
+import os
+import uuid
+import hashlib
+import aiofiles
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from fastapi import UploadFile
+
+
+# 每次读取的分块大小
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# 用于识别文件类型的文件头长度
+SNIFF_BYTES = 4096
+
+
+class UploadTooLargeError(Exception):
+    """上传文件超过大小限制"""
+
+    def __init__(self, filename: Optional[str], max_size: int):
+        self.filename = filename
+        self.max_size = max_size
+        super().__init__(f"文件 {filename or ''} 超过大小限制({max_size // (1024 * 1024)}MB)")
+
+
+@dataclass
+class SpooledUpload:
+    """已写入临时文件的上传内容"""
+    path: Path
+    size: int
+    sha256: str
+    header: bytes
+    filename: Optional[str]
+
+    def discard(self) -> None:
+        """删除临时文件"""
+        if self.path.exists():
+            self.path.unlink()
+
+
+def sniff_image_type(header: bytes) -> Optional[str]:
+    """根据文件头识别图片格式，返回规范扩展名；无法识别返回None"""
+    if header.startswith(b'\x89PNG\r\n\x1a\n'):
+        return '.png'
+    if header.startswith(b'\xff\xd8\xff'):
+        return '.jpg'
+    if header.startswith((b'GIF87a', b'GIF89a')):
+        return '.gif'
+    if header.startswith(b'BM'):
+        return '.bmp'
+    text = header.lstrip(b'\xef\xbb\xbf \t\r\n').lower()
+    if text.startswith((b'<?xml', b'<svg', b'<!--', b'<!doctype svg')) and b'<svg' in text:
+        return '.svg'
+    return None
+
+
+async def spool_upload(
+    upload: UploadFile,
+    dest_dir: Path,
+    max_size: int,
+    chunk_size: int = UPLOAD_CHUNK_SIZE
+) -> SpooledUpload:
+    """
+    将上传内容分块写入 dest_dir 下的临时文件
+    超过 max_size 时立即停止读取并抛出 UploadTooLargeError（已知大小时在读取前检查）
+    """
+    if upload.size is not None and upload.size > max_size:
+        raise UploadTooLargeError(upload.filename, max_size)
+
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = dest_dir / f".upload.{uuid.uuid4().hex}.tmp"
+    digest = hashlib.sha256()
+    header = b''
+    size = 0
+    try:
+        async with aiofiles.open(tmp_path, 'wb') as f:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLargeError(upload.filename, max_size)
+                if len(header) < SNIFF_BYTES:
+                    header += chunk[:SNIFF_BYTES - len(header)]
+                digest.update(chunk)
+                await f.write(chunk)
+    except BaseException:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
+
+    return SpooledUpload(
+        path=tmp_path,
+        size=size,
+        sha256=digest.hexdigest(),
+        header=header,
+        filename=upload.filename
+    )
+
+
+def commit_upload(spooled: SpooledUpload, target: Path) -> Path:
+    """将临时文件原子移动到目标路径"""
+    os.replace(spooled.path, target)
+    return target
@@ -0,0 +1,82 @@
+"""
+测试公共数据与API客户端
+API测试的数据库、上传文件和报告目录都在临时目录中，不影响 backend/ 下的数据
+"""
+import io
+import os
+import sys
+from typing import Any, Dict, Tuple
+
+import pytest
+
+
+def make_report_data(results_count: int = 2, title: str = "威胁分析和风险评估报告") -> Dict[str, Any]:
+    """最小的有效报告数据"""
+    return {
+        "cover": {"report_title": title, "project_name": "测试项目", "document_number": "DOC-1", "version": "V1.0"},
+        "definitions": {
+            "title": "相关定义",
+            "functional_description": "功能描述",
+            "assumptions": [{"id": "ASM-01", "description": "假设"}],
+            "terminology": [{"abbreviation": "IVI", "english": "In-Vehicle Infotainment", "chinese": "车载信息娱乐"}]
+        },
+        "assets": {
+            "title": "资产列表",
+            "assets": [
+                {"id": f"P{i:03d}", "name": f"资产{i}", "category": "内部实体", "authenticity": True}
+                for i in range(results_count)
+            ]
+        },
+        "attack_trees": {"title": "攻击树", "attack_trees": []},
+        "tara_results": {
+            "title": "TARA分析结果",
+            "results": [
+                {
+                    "asset_id": f"P{i:03d}",
+                    "asset_name": f"资产{i}",
+                    "category": "内部实体",
+                    "security_attribute": "Authenticity",
+                    "stride_model": "S欺骗",
+                    "threat_scenario": "威胁场景",
+                    "attack_path": "攻击路径",
+                    "attack_vector": "网络",
+                    "operational_impact": "重大的"
+                }
+                for i in range(results_count)
+            ]
+        }
+    }
+
+
+def make_png(color: Tuple[int, int, int] = (255, 0, 0), size: Tuple[int, int] = (40, 30)) -> bytes:
+    """生成PNG图片内容，不同颜色的图片内容不同"""
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def report_data() -> Dict[str, Any]:
+    return make_report_data()
+
+
+@pytest.fixture(scope="session")
+def client(tmp_path_factory):
+    """
+    API测试客户端（整个测试会话共用一个应用实例）
+    应用的目录和数据库路径在导入 tara_api.main 时确定，测试模块只能在用到本fixture后导入它
+    """
+    assert "tara_api.main" not in sys.modules, "tara_api.main 已在设置测试目录前导入"
+    data_dir = tmp_path_factory.mktemp("data")
+    os.environ["TARA_DATA_DIR"] = str(data_dir)
+    os.environ["TARA_DB_PATH"] = str(data_dir / "tara.db")
+    os.environ["TARA_RENDERER_WARMUP"] = "false"
+    os.environ.setdefault("TARA_JOB_WORKERS", "1")
+
+    from fastapi.testclient import TestClient
+    from tara_api.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
@@ -0,0 +1,58 @@
+"""批量上传zip压缩包的文件数和大小限制"""
+import zipfile
+
+import pytest
+
+from tara_api.batches import BatchArchiveError, list_zip_documents, read_zip_document
+
+
+def make_zip(path, members):
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, content in members.items():
+            zf.writestr(name, content)
+    return path
+
+
+def test_lists_json_documents_sorted_and_skips_metadata(tmp_path):
+    archive = make_zip(tmp_path / "reports.zip", {
+        "b.json": "{}",
+        "a.json": "{}",
+        "dir/c.JSON": "{}",
+        "notes.txt": "x",
+        ".hidden.json": "{}",
+        "__MACOSX/._a.json": "x",
+    })
+    assert list_zip_documents(archive, max_documents=10) == ["a.json", "b.json", "dir/c.JSON"]
+
+
+def test_rejects_too_many_documents(tmp_path):
+    archive = make_zip(tmp_path / "reports.zip", {f"{i}.json": "{}" for i in range(4)})
+    with pytest.raises(BatchArchiveError, match="上限"):
+        list_zip_documents(archive, max_documents=3)
+
+
+def test_rejects_archive_without_json(tmp_path):
+    archive = make_zip(tmp_path / "reports.zip", {"readme.txt": "x"})
+    with pytest.raises(BatchArchiveError):
+        list_zip_documents(archive, max_documents=3)
+
+
+def test_rejects_invalid_zip(tmp_path):
+    archive = tmp_path / "reports.zip"
+    archive.write_bytes(b"not a zip")
+    with pytest.raises(BatchArchiveError):
+        list_zip_documents(archive, max_documents=3)
+
+
+def test_reads_document_within_limit(tmp_path):
+    archive = make_zip(tmp_path / "reports.zip", {"a.json": '{"cover": {}}'})
+    assert read_zip_document(archive, "a.json", max_size=1024) == b'{"cover": {}}'
+
+
+def test_rejects_document_over_limit(tmp_path):
+    # 高压缩比的内容：压缩后很小，按解压后的大小限制
+    archive = make_zip(tmp_path / "reports.zip", {"big.json": " " * (2 * 1024 * 1024)})
+    assert archive.stat().st_size < 64 * 1024
+    with pytest.raises(BatchArchiveError):
+        read_zip_document(archive, "big.json", max_size=1024 * 1024)
+
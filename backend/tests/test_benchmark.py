@@ -0,0 +1,50 @@
+"""PDF生成基准测试和布局分析"""
+import json
+
+import pytest
+
+from tara_api import benchmark
+from tara_api.benchmark import FlowableProfiler, measure_payload_memory
+
+
+@pytest.fixture(autouse=True)
+def restore_font_env(monkeypatch):
+    # 基准测试会设置 TARA_PDF_FONT，测试结束后恢复
+    monkeypatch.delenv("TARA_PDF_FONT", raising=False)
+
+
+def test_json_report_with_flowable_profile(tmp_path, capsys):
+    assert benchmark.main(["--sizes", "3", "--flowables", "--json", "--output-dir", str(tmp_path)]) == 0
+    [result] = json.loads(capsys.readouterr().out)
+
+    assert result["results_count"] == 3
+    assert result["pages"] > 0
+    assert result["file_size"] == (tmp_path / "bench_3.pdf").stat().st_size
+    assert "pdf.doc_build" in result["phases"]
+    assert {row["method"] for row in result["flowables"]} <= set(FlowableProfiler.METHODS)
+    assert any(row["flowable"] == "Table" for row in result["flowables"])
+
+
+def test_default_output_dir_is_removed(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(benchmark.tempfile, "tempdir", str(tmp_path))
+    assert benchmark.main(["--sizes", "2"]) == 0
+    assert "results\tpages" in capsys.readouterr().out
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_profiler_restores_methods():
+    from reportlab.platypus import Table
+
+    original = Table.__dict__["wrap"]
+    with FlowableProfiler().active():
+        assert Table.__dict__["wrap"] is not original
+    assert Table.__dict__["wrap"] is original
+
+
+def test_payload_memory_factor_within_configured_limit(capsys):
+    from tara_api.payloads import PARSED_SIZE_FACTOR
+
+    [result] = measure_payload_memory([50])
+    assert 0 < result["factor"] <= PARSED_SIZE_FACTOR
+    assert benchmark.main(["--payload-memory", "--sizes", "50"]) == 0
+    assert "PARSED_SIZE_FACTOR" in capsys.readouterr().out
@@ -0,0 +1,75 @@
+"""报告下载：Range断点续传和Web服务器文件转发"""
+import json
+from urllib.parse import quote
+
+import pytest
+
+from conftest import make_report_data
+
+
+@pytest.fixture(scope="module")
+def report_id(client):
+    response = client.post("/api/reports/generate", data={"json_data": json.dumps(make_report_data())})
+    return response.json()["report_id"]
+
+
+@pytest.fixture(scope="module")
+def full_file(client, report_id):
+    response = client.get(f"/api/reports/{report_id}/download")
+    assert response.status_code == 200
+    assert response.headers["Accept-Ranges"] == "bytes"
+    return response
+
+
+def test_range_request_returns_partial_content(client, report_id, full_file):
+    size = len(full_file.content)
+    response = client.get(f"/api/reports/{report_id}/download", headers={"Range": "bytes=100-199"})
+    assert response.status_code == 206
+    assert response.headers["Content-Range"] == f"bytes 100-199/{size}"
+    assert response.content == full_file.content[100:200]
+
+    suffix = client.get(f"/api/reports/{report_id}/download", headers={"Range": "bytes=-50"})
+    assert suffix.content == full_file.content[-50:]
+
+
+def test_if_range_with_stale_etag_sends_whole_file(client, report_id, full_file):
+    response = client.get(
+        f"/api/reports/{report_id}/download",
+        headers={"Range": "bytes=0-9", "If-Range": '"stale"'}
+    )
+    assert response.status_code == 200
+    assert response.content == full_file.content
+
+    resumed = client.get(
+        f"/api/reports/{report_id}/download",
+        headers={"Range": "bytes=0-9", "If-Range": full_file.headers["ETag"]}
+    )
+    assert resumed.status_code == 206
+
+
+def test_unsatisfiable_range(client, report_id, full_file):
+    size = len(full_file.content)
+    response = client.get(f"/api/reports/{report_id}/download", headers={"Range": f"bytes={size + 10}-"})
+    assert response.status_code == 416
+
+
+def test_x_accel_redirect_offload(client, report_id, monkeypatch):
+    from tara_api import main
+
+    monkeypatch.setattr(main, "FILE_OFFLOAD", "x-accel-redirect")
+    response = client.get(f"/api/reports/{report_id}/download")
+    assert response.status_code == 200
+    assert response.content == b""
+    assert response.headers["X-Accel-Redirect"] == f"{main.ACCEL_REDIRECT_PREFIX.rstrip('/')}/{report_id}.xlsx"
+    # 中文文件名按RFC 5987编码
+    assert response.headers["Content-Disposition"].startswith("attachment; filename*=utf-8''")
+    assert quote("测试项目") in response.headers["Content-Disposition"]
+    assert "ETag" in response.headers
+
+
+def test_x_sendfile_offload(client, report_id, monkeypatch):
+    from tara_api import main
+
+    monkeypatch.setattr(main, "FILE_OFFLOAD", "x-sendfile")
+    response = client.get(f"/api/reports/{report_id}/download")
+    assert response.headers["X-Sendfile"] == str((main.REPORTS_DIR / f"{report_id}.xlsx").resolve())
@@ -0,0 +1,35 @@
+"""Excel报告生成：各部分数据的默认值"""
+from openpyxl import load_workbook
+
+from conftest import make_report_data
+from tara_api.tara_excel_generator import generate_tara_excel, generate_tara_excel_from_json
+
+
+def test_generate_accepts_raw_partial_sections(tmp_path):
+    output = tmp_path / "report.xlsx"
+    generate_tara_excel(
+        str(output),
+        cover_data={"project_name": "测试项目"},
+        definitions_data={},
+        assets_data={"assets": [{"id": "P001", "name": "资产"}]},
+        attack_trees_data={},
+        tara_results_data={"results": [{"asset_id": "P001"}]}
+    )
+
+    wb = load_workbook(output)
+    definitions, assets, attack_trees, results = (wb[name] for name in wb.sheetnames[1:5])
+    # 未提供标题时使用Excel报告的默认标题
+    assert definitions["A1"].value == "MY25 EV平台中控主机 TARA分析报告 - 相关定义"
+    assert assets["A1"].value == "MY25 EV平台中控主机- 资产列表 Asset List"
+    assert attack_trees["A1"].value == "MY25 EV平台中控主机 - 攻击树分析 Attack Tree Analysis"
+    assert results["A1"].value == "MY25 EV平台中控主机_TARA分析结果 TARA Analysis Results"
+
+
+def test_generate_from_json_keeps_given_titles(tmp_path):
+    output = tmp_path / "report.xlsx"
+    data = make_report_data()
+    generate_tara_excel_from_json(str(output), data)
+
+    wb = load_workbook(output)
+    assert wb[wb.sheetnames[1]]["A1"].value == data["definitions"]["title"]
+    assert wb[wb.sheetnames[4]]["A1"].value == data["tara_results"]["title"]
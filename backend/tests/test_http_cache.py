@@ -0,0 +1,97 @@
+"""ETag和条件请求：内容未变化时返回304"""
+import hashlib
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from starlette.requests import Request
+
+from conftest import make_png, make_report_data
+from tara_api.http_cache import is_not_modified, make_etag, to_http_date
+
+
+def request_with(**headers):
+    raw = [(name.replace("_", "-").lower().encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "headers": raw})
+
+
+@pytest.mark.parametrize("if_none_match, expected", [
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"x", "abc"', True),
+    ("*", True),
+    ('"other"', False),
+])
+def test_if_none_match(if_none_match, expected):
+    assert is_not_modified(request_with(if_none_match=if_none_match), '"abc"') is expected
+
+
+def test_if_modified_since():
+    modified = datetime(2026, 1, 1, 12, 0, 0, 500000)
+    assert is_not_modified(request_with(if_modified_since=to_http_date(modified)), '"a"', modified)
+    earlier = to_http_date(modified - timedelta(seconds=1))
+    assert not is_not_modified(request_with(if_modified_since=earlier), '"a"', modified)
+    assert not is_not_modified(request_with(if_modified_since="not a date"), '"a"', modified)
+    # 同时携带时以 If-None-Match 为准
+    assert not is_not_modified(
+        request_with(if_none_match='"other"', if_modified_since=to_http_date(modified)), '"a"', modified
+    )
+
+
+def test_make_etag_is_strong_and_stable():
+    assert make_etag("report", 1) == make_etag("report", 1)
+    assert make_etag("report", 1) != make_etag("report", 2)
+    assert make_etag("report", 1).startswith('"')
+
+
+@pytest.fixture(scope="module")
+def report_id(client):
+    response = client.post("/api/reports/generate", data={"json_data": json.dumps(make_report_data())})
+    return response.json()["report_id"]
+
+
+@pytest.mark.parametrize("path", ["", "/preview", "/download"])
+def test_report_endpoints_revalidate(client, report_id, path):
+    url = f"/api/reports/{report_id}{path}"
+    first = client.get(url)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    cached = client.get(url, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["ETag"] == etag
+
+
+def test_query_parameters_change_etag(client, report_id):
+    full = client.get(f"/api/reports/{report_id}/preview")
+    projected = client.get(f"/api/reports/{report_id}/preview", params={"fields": "cover"})
+    assert full.headers["ETag"] != projected.headers["ETag"]
+
+
+def test_pdf_status_changes_report_etag(client, report_id):
+    from tara_api.main import metadata_store
+
+    before = client.get(f"/api/reports/{report_id}").headers["ETag"]
+    metadata_store.update_report(report_id, pdf_status="failed")
+    try:
+        after = client.get(f"/api/reports/{report_id}", headers={"If-None-Match": before})
+        assert after.status_code == 200
+        assert after.headers["ETag"] != before
+    finally:
+        metadata_store.update_report(report_id, pdf_status="none")
+
+
+def test_image_uses_content_hash_etag(client):
+    content = make_png((9, 8, 7))
+    image_id = client.post(
+        "/api/images/upload",
+        files={"file": ("a.png", content, "image/png")},
+        data={"image_type": "dataflow"}
+    ).json()["image_id"]
+
+    response = client.get(f"/api/images/{image_id}")
+    assert response.headers["ETag"] == f'"{hashlib.sha256(content).hexdigest()}"'
+    assert "immutable" in response.headers["Cache-Control"]
+    cached = client.get(f"/api/images/{image_id}", headers={"If-Modified-Since": response.headers["Last-Modified"]})
+    assert cached.status_code == 304
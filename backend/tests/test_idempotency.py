@@ -0,0 +1,39 @@
+"""Idempotency-Key：相同内容重放同一报告，不同内容返回422"""
+import json
+import uuid
+
+from conftest import make_report_data
+
+
+def generate(client, data, key):
+    return client.post(
+        "/api/reports/generate",
+        data={"json_data": json.dumps(data)},
+        headers={"Idempotency-Key": key}
+    )
+
+
+def test_same_key_and_content_replays_report(client):
+    key = uuid.uuid4().hex
+    first = generate(client, make_report_data(), key)
+    assert first.status_code == 200
+    assert not first.json().get("reused")
+
+    second = generate(client, make_report_data(), key)
+    assert second.status_code == 200
+    assert second.json()["reused"] is True
+    assert second.json()["report_id"] == first.json()["report_id"]
+
+
+def test_same_key_with_different_content_is_rejected(client):
+    key = uuid.uuid4().hex
+    assert generate(client, make_report_data(), key).status_code == 200
+
+    response = generate(client, make_report_data(title="另一份报告"), key)
+    assert response.status_code == 422
+
+
+def test_different_keys_generate_separate_reports(client):
+    first = generate(client, make_report_data(), uuid.uuid4().hex)
+    second = generate(client, make_report_data(), uuid.uuid4().hex)
+    assert first.json()["report_id"] != second.json()["report_id"]
@@ -0,0 +1,40 @@
+"""图片上传：按内容存储和去重"""
+import hashlib
+
+from conftest import make_png
+
+
+def upload(client, content, image_type="dataflow", filename="image.png"):
+    return client.post(
+        "/api/images/upload",
+        files={"file": (filename, content, "image/png")},
+        data={"image_type": image_type}
+    )
+
+
+def test_same_content_shares_one_image(client):
+    from tara_api.main import metadata_store
+
+    content = make_png((10, 20, 30))
+    first = upload(client, content, "dataflow", "a.png")
+    second = upload(client, content, "attack_tree", "b.png")
+    assert first.status_code == second.status_code == 200
+
+    image_id = first.json()["image_id"]
+    assert image_id == second.json()["image_id"] == f"IMG-{hashlib.sha256(content).hexdigest()[:16]}"
+    # 响应中的类型为本次请求的类型，记录保留首次上传的类型
+    assert second.json()["image_type"] == "attack_tree"
+    assert metadata_store.get_image(image_id)["type"] == "dataflow"
+    assert client.get(f"/api/images/{image_id}").content == content
+
+
+def test_different_content_gets_different_ids(client):
+    first = upload(client, make_png((1, 1, 1)))
+    second = upload(client, make_png((2, 2, 2)))
+    assert first.json()["image_id"] != second.json()["image_id"]
+
+
+def test_rejects_invalid_uploads(client):
+    assert upload(client, b"not an image").status_code == 400
+    assert upload(client, make_png(), filename="image.txt").status_code == 400
+    assert upload(client, make_png(), image_type="unknown").status_code == 400
@@ -0,0 +1,221 @@
+"""后台任务：取消运行中的任务、排队上限；多个服务进程共享任务状态"""
+import asyncio
+import json
+import time
+from pathlib import Path
+
+import pytest
+
+from conftest import make_report_data
+from tara_api.jobs import JobManager, JobQueueFullError
+
+
+def write_after(path: str, seconds: float) -> str:
+    """在工作进程中模拟耗时的报告生成"""
+    time.sleep(seconds)
+    Path(path).write_text("report")
+    return path
+
+
+async def wait_for_status(job, status: str, timeout: float = 10) -> None:
+    deadline = time.monotonic() + timeout
+    while job.status != status:
+        assert time.monotonic() < deadline, f"任务未进入 {status} 状态"
+        await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+async def manager():
+    job_manager = JobManager(max_workers=1, max_pending=2)
+    job_manager.start()
+    yield job_manager
+    await job_manager.shutdown()
+
+
+async def test_cancel_waits_for_worker_and_removes_output(manager, tmp_path):
+    output = tmp_path / "report.xlsx"
+
+    async def work():
+        try:
+            return await manager.run(write_after, str(output), 0.5)
+        except asyncio.CancelledError:
+            output.unlink(missing_ok=True)
+            raise
+
+    # 先启动工作进程，取消时任务已在工作进程中执行
+    await manager.run(time.sleep, 0)
+    first = manager.submit("test", work)
+    await wait_for_status(first, "running")
+    await asyncio.sleep(0.1)
+    second = manager.submit("test", lambda: manager.run(time.sleep, 0))
+
+    manager.cancel(first.id)
+    await first.task
+    assert first.status == "cancelled"
+    # 工作进程结束后才清理输出，不会留下取消后写出的文件
+    assert not output.exists()
+
+    # 并发名额在工作进程结束后才释放
+    await second.task
+    assert second.status == "succeeded"
+    assert second.started_at >= first.finished_at
+    # 被取消的生成结束后没有再写出文件
+    assert not output.exists()
+
+
+async def test_cancel_queued_job_never_runs(manager, tmp_path):
+    output = tmp_path / "report.xlsx"
+    release = asyncio.Event()
+
+    first = manager.submit("test", release.wait)
+    second = manager.submit("test", lambda: manager.run(write_after, str(output), 0))
+    await wait_for_status(first, "running")
+
+    manager.cancel(second.id)
+    release.set()
+    await asyncio.gather(first.task, second.task)
+    assert second.status == "cancelled"
+    assert second.started_at is None
+    assert not output.exists()
+
+
+async def test_submit_rejects_when_queue_is_full(manager):
+    release = asyncio.Event()
+    jobs = [manager.submit("test", release.wait) for _ in range(manager.max_pending)]
+
+    with pytest.raises(JobQueueFullError):
+        manager.submit("test", release.wait)
+
+    release.set()
+    await asyncio.gather(*(job.task for job in jobs))
+    # 排队的任务完成后可以再次提交
+    manager.submit("test", release.wait)
+
+
+async def test_direct_run_shares_slots_and_queue_limit(manager):
+    release = asyncio.Event()
+    job = manager.submit("test", release.wait)
+    await wait_for_status(job, "running")
+
+    # 唯一的名额被异步任务占用，同步调用排队等待
+    direct = asyncio.ensure_future(manager.run(time.sleep, 0))
+    await asyncio.sleep(0.2)
+    assert not direct.done()
+    assert manager.pending_count == 2
+
+    # 排队数已达上限（2），再调用直接拒绝
+    with pytest.raises(JobQueueFullError):
+        await manager.run(time.sleep, 0)
+
+    release.set()
+    await asyncio.wait_for(direct, 10)
+    assert manager.pending_count == 0
+
+
+async def test_run_inside_job_uses_the_job_slot(manager):
+    # 单个名额：任务中的 run() 不重复占用名额，不会死锁
+    job = manager.submit("test", lambda: manager.run(time.sleep, 0))
+    await asyncio.wait_for(job.task, 10)
+    assert job.status == "succeeded"
+
+
+async def test_worker_pids_lists_pool_processes(manager):
+    assert manager.worker_pids() == []
+    await manager.run(time.sleep, 0)
+    pids = manager.worker_pids()
+    assert len(pids) == 1 and all(pid > 0 for pid in pids)
+
+
+@pytest.mark.parametrize("async_job", [True, False])
+def test_generate_returns_503_when_queue_is_full(client, monkeypatch, async_job):
+    from tara_api.main import job_manager
+
+    monkeypatch.setattr(job_manager, "max_pending", 0)
+    response = client.post(
+        "/api/reports/generate",
+        params={"async": str(async_job).lower()},
+        data={"json_data": json.dumps(make_report_data())}
+    )
+    assert response.status_code == 503
+
+
+@pytest.fixture
+async def workers(tmp_path, monkeypatch):
+    """共用同一数据库的两个服务进程的任务管理器"""
+    from tara_api import jobs
+    from tara_api.storage import MetadataStore
+
+    monkeypatch.setattr(jobs, "REMOTE_POLL_INTERVAL", 0.02)
+    store = MetadataStore(tmp_path / "tara.db")
+    managers = [JobManager(max_workers=1, store=store) for _ in range(2)]
+    yield managers
+    for job_manager in managers:
+        await job_manager.shutdown()
+    store.close()
+
+
+async def test_other_worker_sees_job_state(workers):
+    owner, other = workers
+    release = asyncio.Event()
+
+    async def work():
+        await release.wait()
+        return {"report_id": "RPT-1"}
+
+    job = owner.submit("test", work, {"report_id": "RPT-1"})
+    await wait_for_status(job, "running")
+    state = await other.describe(job.id, timeout=0)
+    assert state["status"] == "running"
+    assert state["metadata"] == {"report_id": "RPT-1"}
+
+    # 其他进程等待时轮询共享存储，任务完成后返回结果
+    waiter = asyncio.ensure_future(other.describe(job.id, timeout=10))
+    await asyncio.sleep(0.05)
+    release.set()
+    state = await asyncio.wait_for(waiter, 10)
+    assert state["status"] == "succeeded"
+    assert state["result"] == {"report_id": "RPT-1"}
+    assert await other.describe("JOB-UNKNOWN", timeout=0) is None
+
+
+async def test_cancel_from_other_worker(workers):
+    owner, other = workers
+    release = asyncio.Event()
+    first = owner.submit("test", release.wait)
+    queued = owner.submit("test", release.wait)
+    await wait_for_status(first, "running")
+
+    # 排队中的任务在开始前取消，运行中的任务在结束时丢弃结果
+    assert other.request_cancel(queued.id)["status"] == "queued"
+    assert other.request_cancel(first.id)["status"] == "running"
+    release.set()
+    await asyncio.gather(first.task, queued.task)
+
+    assert first.status == "cancelled"
+    assert queued.status == "cancelled" and queued.started_at is None
+    assert (await other.describe(first.id, timeout=0))["status"] == "cancelled"
+    # 已结束的任务不能再取消
+    assert other.request_cancel(first.id)["status"] == "cancelled"
+
+
+@pytest.mark.parametrize("argv, expected", [
+    ([], {"reload": True}),
+    (["--workers", "3"], {"workers": 3, "reload": False}),
+    (["--production"], {"reload": False}),
+])
+def test_run_server_modes(client, monkeypatch, argv, expected):
+    import uvicorn
+    from tara_api.main import run_server
+
+    calls = []
+    monkeypatch.setattr(uvicorn, "run", lambda app, **kwargs: calls.append(kwargs))
+    monkeypatch.delenv("TARA_ENV", raising=False)
+    monkeypatch.delenv("TARA_WORKERS", raising=False)
+    monkeypatch.setenv("TARA_JOB_WORKERS", "1")
+    run_server(argv)
+
+    [kwargs] = calls
+    assert {key: kwargs.get(key) for key in expected} == expected
+    if not kwargs["reload"]:
+        assert kwargs["workers"] >= 1
+        assert kwargs["loop"] in ("uvloop", "asyncio")
@@ -0,0 +1,65 @@
+"""JSON解析与序列化：orjson和标准库两种后端的行为一致"""
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime
+
+import pytest
+
+from tara_api import json_backend
+
+
+@pytest.fixture(params=["orjson", "json"])
+def backend(request, monkeypatch):
+    if request.param == "orjson":
+        if json_backend.orjson is None:
+            pytest.skip("未安装orjson或已强制使用标准库")
+    else:
+        monkeypatch.setattr(json_backend, "orjson", None)
+    return request.param
+
+
+def test_loads_accepts_bytes_and_str(backend):
+    document = '{"标题": "报告", "items": [1, 2.5, null, true]}'
+    expected = {"标题": "报告", "items": [1, 2.5, None, True]}
+    assert json_backend.loads(document) == expected
+    assert json_backend.loads(document.encode()) == expected
+    assert json_backend.loads(memoryview(document.encode())) == expected
+
+
+def test_loads_errors_are_json_decode_errors(backend):
+    with pytest.raises(json.JSONDecodeError):
+        json_backend.loads(b'{"a": ')
+
+
+def test_dumps_is_compact_utf8(backend):
+    data = {"b": 1, "a": ["中文", {"c": None}]}
+    assert json_backend.dumps(data) == '{"b":1,"a":["中文",{"c":null}]}'.encode()
+    assert json_backend.dumps(data, sort_keys=True) == '{"a":["中文",{"c":null}],"b":1}'.encode()
+    # 无法序列化的对象转为字符串
+    assert json.loads(json_backend.dumps({"at": datetime(2026, 1, 1)}))["at"].startswith("2026-01-01")
+
+
+def test_backends_produce_identical_output(monkeypatch):
+    # 内容哈希依赖序列化结果，两种后端须一致
+    if json_backend.orjson is None:
+        pytest.skip("未安装orjson或已强制使用标准库")
+    data = {"z": [1, -2, 3.5, "引号\"和\\反斜杠"], "a": {"nested": True, "empty": []}}
+    fast = json_backend.dumps(data, sort_keys=True)
+    monkeypatch.setattr(json_backend, "orjson", None)
+    assert json_backend.dumps(data, sort_keys=True) == fast
+
+
+def test_response_uses_backend(backend):
+    response = json_backend.FastJSONResponse({"名称": "报告"})
+    assert response.body == '{"名称":"报告"}'.encode()
+
+
+def test_environment_forces_standard_library():
+    env = {**os.environ, "TARA_JSON_BACKEND": "json"}
+    output = subprocess.run(
+        [sys.executable, "-c", "from tara_api import json_backend; print(json_backend.JSON_BACKEND)"],
+        env=env, capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.dirname(__file__))
+    )
+    assert output.stdout.strip() == "json"
@@ -0,0 +1,130 @@
+"""大型JSON文档的增量解析：流式数组的读取、校验和写回"""
+import io
+import json
+import pickle
+from dataclasses import replace
+
+import pytest
+
+from conftest import make_report_data
+from tara_api.json_stream import StreamedArray, StreamedJSONError, load_streaming, streamed_sources, write_json
+
+
+def write_file(tmp_path, content, name="report.json"):
+    path = tmp_path / name
+    path.write_bytes(content if isinstance(content, bytes) else json.dumps(content, ensure_ascii=False).encode())
+    return path
+
+
+def test_streams_configured_arrays_and_parses_the_rest(tmp_path):
+    data = make_report_data(results_count=5)
+    path = write_file(tmp_path, data)
+
+    loaded = load_streaming(path)
+    results = loaded["tara_results"]["results"]
+    assert isinstance(results, StreamedArray)
+    assert isinstance(loaded["assets"]["assets"], StreamedArray)
+    assert len(results) == 5 and results
+    # 可多次迭代，每次都从文件读取
+    assert list(results) == data["tara_results"]["results"]
+    assert list(results) == data["tara_results"]["results"]
+    # 其余部分为普通的 dict/list
+    assert loaded["cover"] == data["cover"]
+    assert loaded["definitions"] == data["definitions"]
+    assert streamed_sources(loaded) == {str(path)}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 64])
+def test_small_chunks_and_escaped_content(tmp_path, chunk_size):
+    # 字符串中的引号、反斜杠和括号不影响数组边界
+    tricky = ['a"b', 'c\\', '[{', '}]', '\\"', '中文\n', '']
+    data = {
+        "cover": {"report_title": '标题 "[x]" {y}'},
+        "tara_results": {
+            "title": "结果",
+            "results": [{"threat_scenario": text, "nested": {"list": [1, [2, {"x": text}]]}} for text in tricky]
+        },
+        "assets": {"assets": []}
+    }
+    path = write_file(tmp_path, data)
+
+    loaded = load_streaming(path, chunk_size=chunk_size)
+    assert loaded["cover"] == data["cover"]
+    assert list(loaded["tara_results"]["results"]) == data["tara_results"]["results"]
+    assert len(loaded["assets"]["assets"]) == 0
+    assert not loaded["assets"]["assets"]
+    assert list(loaded["assets"]["assets"]) == []
+
+
+def test_long_strings_do_not_hit_recursion_limits(tmp_path):
+    text = 'x\\"' * 200000
+    path = write_file(tmp_path, {"tara_results": {"results": [{"threat_scenario": text}]}})
+    results = load_streaming(path, chunk_size=64 * 1024)["tara_results"]["results"]
+    assert next(iter(results))["threat_scenario"] == text
+
+
+@pytest.mark.parametrize("content, expected", [
+    (b' [1, 2, {"a": 3}] \n', [1, 2, {"a": 3}]),
+    (b'{"cover": {"a": 1}}\r\n\n', {"cover": {"a": 1}}),
+])
+def test_trailing_whitespace_is_allowed(tmp_path, content, expected):
+    # 顶层不是对象时按普通方式解析
+    path = write_file(tmp_path, content)
+    assert load_streaming(path) == expected
+    assert load_streaming(path, chunk_size=2) == expected
+
+
+@pytest.mark.parametrize("content", [
+    b'{"tara_results": {"results": [{"a": 1}, {"a": 2}',
+    b'{"tara_results": {"results": [{"a": "unterminated}]}}',
+    b'{"cover": {}} extra',
+    b'{"tara_results": {"results": [{"a": 1}, 2]}}',
+    b'{"tara_results": {"results": [{"a": 1} {"a": 2}]}}',
+    b'{"cover": {"a": tru}}',
+    b'{1: 2}',
+])
+def test_malformed_documents_are_rejected(tmp_path, content):
+    path = write_file(tmp_path, content)
+    with pytest.raises(StreamedJSONError) as info:
+        load_streaming(path, chunk_size=8)
+    # 与 json.loads 的错误类型兼容
+    assert isinstance(info.value, json.JSONDecodeError)
+
+
+def test_write_json_copies_raw_arrays(tmp_path):
+    data = make_report_data(results_count=3)
+    loaded = load_streaming(write_file(tmp_path, data))
+
+    out = io.BytesIO()
+    size = write_json(out, loaded)
+    assert size == len(out.getvalue())
+    assert json.loads(out.getvalue()) == data
+
+
+def test_write_json_applies_item_loader(tmp_path):
+    data = make_report_data(results_count=3)
+    loaded = load_streaming(write_file(tmp_path, data))
+    results = loaded["tara_results"]["results"]
+    loaded["tara_results"]["results"] = replace(results, item_loader=lambda item: {**item, "extra": 1})
+
+    out = io.BytesIO()
+    write_json(out, loaded)
+    written = json.loads(out.getvalue())
+    assert [item["extra"] for item in written["tara_results"]["results"]] == [1, 1, 1]
+    # 没有 item_loader 的数组仍按原文复制
+    assert written["assets"] == data["assets"]
+
+
+def test_write_json_plain_data():
+    out = io.BytesIO()
+    write_json(out, {"a": [1, 2], "b": "中文"})
+    assert json.loads(out.getvalue()) == {"a": [1, 2], "b": "中文"}
+
+
+def test_streamed_array_and_error_are_picklable(tmp_path):
+    loaded = load_streaming(write_file(tmp_path, make_report_data(results_count=2)))
+    results = loaded["tara_results"]["results"]
+    assert list(pickle.loads(pickle.dumps(results))) == list(results)
+
+    error = pickle.loads(pickle.dumps(StreamedJSONError("JSON数据不完整", 10)))
+    assert error.pos == 10
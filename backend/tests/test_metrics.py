@@ -0,0 +1,81 @@
+"""Prometheus运行指标：计数器和直方图的文本格式，/metrics 端点记录的路由耗时和生成阶段耗时"""
+import json
+
+import pytest
+
+from conftest import make_report_data
+from tara_api.metrics import CONTENT_TYPE, Counter, Gauge, Histogram, Registry
+
+
+def test_counter_and_gauge_render():
+    registry = Registry()
+    counter = registry.register(Counter('test_requests_total', '请求数', ('route',)))
+    gauge = registry.register(Gauge('test_pending', '排队数'))
+    counter.inc(route='/a')
+    counter.inc(2, route='/a')
+    counter.inc(route='say "hi"\n')
+    gauge.set(5)
+    gauge.dec()
+
+    lines = registry.render().splitlines()
+    assert lines[:2] == ['# HELP test_requests_total 请求数', '# TYPE test_requests_total counter']
+    assert 'test_requests_total{route="/a"} 3' in lines
+    # 标签值中的引号和换行被转义
+    assert 'test_requests_total{route="say \\"hi\\"\\n"} 1' in lines
+    assert '# TYPE test_pending gauge' in lines
+    assert 'test_pending 4' in lines
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram('test_seconds', '耗时', ('phase',), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3):
+        histogram.observe(value, phase='x')
+
+    assert histogram.samples() == [
+        'test_seconds_bucket{phase="x",le="0.1"} 1',
+        'test_seconds_bucket{phase="x",le="1"} 3',
+        'test_seconds_bucket{phase="x",le="+Inf"} 4',
+        'test_seconds_sum{phase="x"} 4.05',
+        'test_seconds_count{phase="x"} 4',
+    ]
+
+
+@pytest.mark.parametrize("labels", [{}, {"route": "/a", "extra": 1}])
+def test_wrong_labels_are_rejected(labels):
+    counter = Counter('test_total', '计数', ('route',))
+    with pytest.raises(ValueError):
+        counter.inc(**labels)
+
+
+def test_collector_errors_do_not_break_render():
+    registry = Registry()
+    gauge = registry.register(Gauge('test_value', '值'))
+    registry.add_collector(lambda: 1 / 0)
+    registry.add_collector(lambda: gauge.set(7))
+    assert 'test_value 7' in registry.render()
+
+
+def test_metrics_endpoint_reports_routes_and_generation_phases(client):
+    response = client.post("/api/reports/generate", data={"json_data": json.dumps(make_report_data())})
+    assert response.status_code == 200
+    client.get(f"/api/reports/{response.json()['report_id']}")
+    client.get("/metrics")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == CONTENT_TYPE
+    text = response.text
+
+    # 路由按路径模板统计，不按实际报告ID展开
+    assert 'tara_http_requests_total{method="POST",route="/api/reports/generate",status="200"}' in text
+    assert 'route="/api/reports/{report_id}"' in text
+    assert 'tara_http_request_duration_seconds_count{method="GET",route="/api/reports/{report_id}"}' in text
+    # /metrics 本身不计入
+    assert 'route="/metrics"' not in text
+
+    assert 'tara_generation_phase_duration_seconds_count{phase="json.parse"}' in text
+    assert 'tara_generation_phase_duration_seconds_count{phase="render.xlsx"}' in text
+    assert 'tara_generation_duration_seconds_count{format="xlsx",outcome="success"}' in text
+    assert 'tara_report_output_bytes_count{format="xlsx"}' in text
+    assert 'tara_generations_in_progress{format="xlsx"} 0' in text
+    assert 'process_resident_memory_bytes ' in text
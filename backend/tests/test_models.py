@@ -0,0 +1,44 @@
+"""报告数据的校验和规范化"""
+import pytest
+
+from conftest import make_report_data
+from tara_api.models import ReportDataError, ReportDict, normalize_report_data, section_title
+
+
+def test_missing_and_null_fields_take_defaults():
+    data = make_report_data()
+    data["cover"]["version"] = None
+    del data["tara_results"]["results"][0]["attack_vector"]
+
+    report = normalize_report_data(data)
+    assert isinstance(report, ReportDict)
+    assert report["cover"]["version"] == "V1.0"
+    assert report["tara_results"]["results"][0]["attack_vector"] == "本地"
+    assert report["tara_results"]["results"][0]["security_requirement"] == ""
+    # 已规范化的数据直接返回
+    assert normalize_report_data(report) is report
+
+
+def test_lightweight_path_only_fills_missing_fields():
+    report = normalize_report_data({"cover": {"project_name": 1}, "assets": {"assets": [{"id": "P1"}]}}, validate=False)
+    assert report["cover"]["project_name"] == 1
+    assert report["assets"]["assets"][0]["authenticity"] is False
+    assert report["tara_results"]["results"] == []
+
+
+def test_invalid_data_reports_location():
+    data = make_report_data()
+    data["assets"]["assets"][1]["authenticity"] = "not-a-bool"
+    with pytest.raises(ReportDataError) as info:
+        normalize_report_data(data)
+    assert info.value.errors[0]["loc"][:3] == ["assets", "assets", 1]
+
+    with pytest.raises(ReportDataError):
+        normalize_report_data(["not", "an", "object"])
+
+
+def test_section_title_defaults_only_when_missing():
+    report = normalize_report_data({"definitions": {}, "assets": {"title": ""}})
+    assert section_title(report["definitions"], "默认标题") == "默认标题"
+    # 明确提供的空标题保持为空
+    assert section_title(report["assets"], "默认标题") == ""
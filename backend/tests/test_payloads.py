@@ -0,0 +1,72 @@
+"""报告数据存储：磁盘上的压缩文件 + 按大小限制的内存LRU缓存"""
+import gzip
+import json
+
+from conftest import make_report_data
+from tara_api.json_stream import load_streaming
+from tara_api.payloads import PayloadStore
+
+
+def serialized_size(data):
+    return len(json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode())
+
+
+def test_round_trip_through_disk(tmp_path):
+    data = make_report_data()
+    store = PayloadStore(tmp_path, max_cache_bytes=0)
+    store.save("RPT-1", data)
+
+    assert json.loads(gzip.decompress(store.path_for("RPT-1").read_bytes())) == data
+    # 缓存上限为0时每次都从磁盘加载
+    assert store.get_cached("RPT-1") is None
+    assert store.load("RPT-1") == data
+    assert store.cache_info()["entries"] == 0
+
+    store.delete("RPT-1")
+    assert store.load("RPT-1") is None
+    assert not store.path_for("RPT-1").exists()
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    reports = {f"RPT-{i}": make_report_data(title=f"报告{i}") for i in range(3)}
+    entry_size = max(serialized_size(data) for data in reports.values())
+    # 只能容纳两份报告（按估算的解析后内存计）
+    store = PayloadStore(tmp_path, max_cache_bytes=int(entry_size * 2.5), size_factor=1.0)
+
+    store.save("RPT-0", reports["RPT-0"])
+    store.save("RPT-1", reports["RPT-1"])
+    assert store.get_cached("RPT-0") is not None
+    store.save("RPT-2", reports["RPT-2"])
+
+    assert store.get_cached("RPT-1") is None
+    assert store.get_cached("RPT-0") is not None
+    assert store.get_cached("RPT-2") is not None
+    info = store.cache_info()
+    assert info["entries"] == 2 and info["bytes"] <= info["max_bytes"]
+
+    # 被淘汰的报告从磁盘重新加载后再次缓存
+    assert store.load("RPT-1") == reports["RPT-1"]
+    assert store.get_cached("RPT-1") is not None
+
+
+def test_cache_size_uses_parsed_size_factor(tmp_path):
+    data = make_report_data()
+    store = PayloadStore(tmp_path, max_cache_bytes=10 ** 9, size_factor=4.0)
+    size = store.save("RPT-1", data)
+    assert store.cache_info()["bytes"] == int(size * 4.0)
+
+    # 单个报告超过上限时不缓存
+    small = PayloadStore(tmp_path, max_cache_bytes=size * 3, size_factor=4.0)
+    small.save("RPT-2", data)
+    assert small.cache_info()["entries"] == 0
+
+
+def test_streamed_data_is_written_without_caching(tmp_path):
+    data = make_report_data(results_count=5)
+    source = tmp_path / "source.json"
+    source.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+    store = PayloadStore(tmp_path / "payloads", max_cache_bytes=10 ** 9)
+    store.save("RPT-1", load_streaming(source))
+    assert store.get_cached("RPT-1") is None
+    assert store.load("RPT-1") == data
@@ -0,0 +1,64 @@
+"""PDF缓存键随图片内容和生成器指纹变化；缓存按大小上限淘汰最久未使用的PDF"""
+import os
+
+from conftest import make_report_data
+from tara_api.pdf_cache import PDFCache, compute_pdf_cache_key
+
+
+def with_image(image_path):
+    data = make_report_data()
+    data["definitions"]["item_boundary_image"] = str(image_path)
+    return data
+
+
+def test_cache_key_is_stable_for_same_input(tmp_path):
+    image = tmp_path / "boundary.png"
+    image.write_bytes(b"image-v1")
+    assert compute_pdf_cache_key(with_image(image), "1.0") == compute_pdf_cache_key(with_image(image), "1.0")
+
+
+def test_cache_key_changes_when_image_content_changes(tmp_path):
+    image = tmp_path / "boundary.png"
+    image.write_bytes(b"image-v1")
+    before = compute_pdf_cache_key(with_image(image), "1.0")
+
+    # 同一路径，内容（和大小）变化
+    image.write_bytes(b"image-version-2")
+    assert compute_pdf_cache_key(with_image(image), "1.0") != before
+
+
+def test_cache_key_changes_when_generator_fingerprint_changes(tmp_path):
+    image = tmp_path / "boundary.png"
+    image.write_bytes(b"image-v1")
+    assert compute_pdf_cache_key(with_image(image), "1.0") != compute_pdf_cache_key(with_image(image), "1.1")
+
+
+def test_cache_key_does_not_depend_on_image_location(tmp_path):
+    first = tmp_path / "a.png"
+    second = tmp_path / "b.png"
+    first.write_bytes(b"same-image")
+    second.write_bytes(b"same-image")
+    assert compute_pdf_cache_key(with_image(first), "1.0") == compute_pdf_cache_key(with_image(second), "1.0")
+
+
+def test_sweep_evicts_least_recently_used(tmp_path):
+    cache = PDFCache(tmp_path, max_bytes=25)
+    for index, key in enumerate(["old", "used", "new"]):
+        cache.path_for(key).write_bytes(b"x" * 10)
+        os.utime(cache.path_for(key), (1000 + index, 1000 + index))
+
+    # 命中缓存更新使用时间，"old" 成为最久未使用的
+    assert cache.get("old") is not None
+    assert cache.sweep() == 1
+    assert cache.get("used") is None
+    assert cache.get("old") is not None
+    assert cache.get("new") is not None
+
+
+def test_render_keeps_new_entry_over_limit(tmp_path):
+    cache = PDFCache(tmp_path, max_bytes=5)
+    cache.path_for("old").write_bytes(b"x" * 4)
+
+    path = cache.render("new", lambda output: open(output, "wb").write(b"y" * 10))
+    assert path.exists()
+    assert cache.get("old") is None
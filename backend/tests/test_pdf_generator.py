@@ -0,0 +1,86 @@
+"""PDF报告生成：原始数据的默认值；风险汇总表的画布快速路径"""
+import json
+
+from reportlab.lib.pagesizes import A4
+from reportlab.platypus import SimpleDocTemplate
+
+from conftest import make_report_data
+from tara_api.json_stream import StreamedArray, load_streaming
+from tara_api.models import normalize_report_data
+from tara_api.tara_pdf_generator import (
+    RISK_SUMMARY_CANVAS_THRESHOLD, RISK_SUMMARY_COL_WIDTHS, RiskSummaryTable, create_risk_summary_page,
+    generate_tara_pdf, generate_tara_pdf_from_json, get_tara_styles, risk_summary_row
+)
+
+
+def streamed_report(tmp_path, results_count):
+    path = tmp_path / "report.json"
+    path.write_text(json.dumps(make_report_data(results_count=results_count), ensure_ascii=False), encoding="utf-8")
+    return normalize_report_data(load_streaming(path))
+
+
+def test_canvas_summary_accepts_streamed_results(tmp_path):
+    # 大文件上传时结果为只能顺序迭代的 StreamedArray
+    report = streamed_report(tmp_path, RISK_SUMMARY_CANVAS_THRESHOLD + 100)
+    assert isinstance(report["tara_results"]["results"], StreamedArray)
+
+    output = tmp_path / "report.pdf"
+    generate_tara_pdf_from_json(str(output), report, profile="draft")
+    assert output.read_bytes().startswith(b"%PDF")
+
+
+def test_canvas_summary_rows_and_split(tmp_path):
+    report = streamed_report(tmp_path, RISK_SUMMARY_CANVAS_THRESHOLD + 1)
+    elements = create_risk_summary_page(report["tara_results"], get_tara_styles())
+    table = elements[-1]
+    assert isinstance(table, RiskSummaryTable)
+    expected = [risk_summary_row(i, result) for i, result in enumerate(report["tara_results"]["results"])]
+    assert table.rows == expected
+
+    # 分页只切分行号区间，各部分保持居中并覆盖全部行
+    first, rest = table.split(500, RiskSummaryTable.HEADER_HEIGHT + 10 * RiskSummaryTable.ROW_HEIGHT)
+    assert (first.start, first.end, rest.start, rest.end) == (0, 10, 10, len(expected))
+    assert first.hAlign == rest.hAlign == "CENTER"
+    assert table.split(500, RiskSummaryTable.HEADER_HEIGHT) == []
+
+    doc = SimpleDocTemplate(str(tmp_path / "summary.pdf"), pagesize=A4)
+    doc.build([table])
+
+
+def test_generate_accepts_raw_partial_sections(tmp_path):
+    output = tmp_path / "report.pdf"
+    generate_tara_pdf(
+        str(output),
+        cover_data={"project_name": "测试项目"},
+        definitions_data={},
+        assets_data={"assets": [{"id": "P001", "name": "资产"}]},
+        attack_trees_data={},
+        tara_results_data={"results": [{"asset_id": "P001"}]},
+        profile="draft"
+    )
+    assert output.read_bytes().startswith(b"%PDF")
+
+
+def test_canvas_path_only_above_threshold():
+    styles = get_tara_styles()
+    at_threshold = normalize_report_data(make_report_data(results_count=RISK_SUMMARY_CANVAS_THRESHOLD))
+    above = normalize_report_data(make_report_data(results_count=RISK_SUMMARY_CANVAS_THRESHOLD + 1))
+    assert not isinstance(create_risk_summary_page(at_threshold["tara_results"], styles)[-1], RiskSummaryTable)
+    assert isinstance(create_risk_summary_page(above["tara_results"], styles)[-1], RiskSummaryTable)
+
+
+def test_repeated_splits_cover_every_row_once():
+    rows = [[str(i)] * len(RISK_SUMMARY_COL_WIDTHS) for i in range(95)]
+    page_height = RiskSummaryTable.HEADER_HEIGHT + 20 * RiskSummaryTable.ROW_HEIGHT + 5
+
+    parts, remaining = [], RiskSummaryTable(rows)
+    while True:
+        split = remaining.split(500, page_height)
+        if split == [remaining]:
+            parts.append(remaining)
+            break
+        first, remaining = split
+        parts.append(first)
+    assert [(part.start, part.end) for part in parts] == [(i, min(i + 20, 95)) for i in range(0, 95, 20)]
+    # 每页高度包含重复的表头
+    assert all(part.wrap(500, page_height)[1] <= page_height for part in parts)
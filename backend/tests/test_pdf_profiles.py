@@ -0,0 +1,70 @@
+"""PDF输出配置：文件大小与生成速度的取舍"""
+import json
+
+import pytest
+
+from conftest import make_report_data
+from tara_api.benchmark import create_sample_image
+from tara_api.pdf_profiles import DEFAULT_PDF_PROFILE, PDF_PROFILES, PDFProfile, get_pdf_profile
+from tara_api.tara_pdf_generator import generate_tara_pdf_from_json, load_image_safe
+
+
+@pytest.fixture(scope="module")
+def image_path(tmp_path_factory):
+    return create_sample_image(str(tmp_path_factory.mktemp("images") / "boundary.png"))
+
+
+@pytest.fixture(scope="module")
+def photo_path(tmp_path_factory):
+    """接近照片的图片（带噪点），JPEG重新压缩后明显变小"""
+    from PIL import Image
+
+    path = tmp_path_factory.mktemp("images") / "photo.png"
+    Image.effect_noise((1600, 900), 40).convert("RGB").save(path)
+    return str(path)
+
+
+def render(tmp_path, image_path, profile):
+    data = make_report_data()
+    data["definitions"]["item_boundary_image"] = image_path
+    output = tmp_path / f"{profile}.pdf"
+    generate_tara_pdf_from_json(str(output), data, profile=profile)
+    return output.read_bytes()
+
+
+def test_get_pdf_profile():
+    assert get_pdf_profile().name == DEFAULT_PDF_PROFILE
+    assert get_pdf_profile("screen") is PDF_PROFILES["screen"]
+    custom = PDFProfile("custom", image_dpi=50)
+    assert get_pdf_profile(custom) is custom
+    with pytest.raises(ValueError):
+        get_pdf_profile("unknown")
+
+
+def test_image_handling_per_profile(image_path):
+    assert load_image_safe(image_path, profile=PDF_PROFILES["draft"]) is None
+    standard = load_image_safe(image_path, max_width=480, max_height=280, profile=PDF_PROFILES["standard"])
+    screen = load_image_safe(image_path, max_width=480, max_height=280, profile=PDF_PROFILES["screen"])
+    # 显示尺寸相同，只改变嵌入的像素
+    assert (standard.drawWidth, standard.drawHeight) == (screen.drawWidth, screen.drawHeight)
+    assert standard.filename == image_path
+    assert screen.filename != image_path
+
+
+def test_profiles_trade_size_for_quality(tmp_path, photo_path):
+    standard = render(tmp_path, photo_path, "standard")
+    screen = render(tmp_path, photo_path, "screen")
+    draft = render(tmp_path, photo_path, "draft")
+
+    assert len(screen) < len(standard)
+    assert b"/DCTDecode" in screen
+    # 草稿不嵌入图片，页面内容不压缩
+    assert b"/Subtype /Image" not in draft
+    assert b"/Subtype /Image" in standard
+
+
+def test_api_rejects_unknown_profile(client):
+    response = client.post("/api/reports/generate", data={"json_data": json.dumps(make_report_data())})
+    report_id = response.json()["report_id"]
+    assert client.get(f"/api/reports/{report_id}/download/pdf", params={"profile": "unknown"}).status_code == 400
+    assert client.post(f"/api/reports/{report_id}/generate-pdf", params={"profile": "unknown"}).status_code == 400
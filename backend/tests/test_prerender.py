@@ -0,0 +1,49 @@
+"""生成报告后在后台预渲染PDF"""
+import json
+import time
+
+from conftest import make_report_data
+
+
+def generate(client, prerender):
+    response = client.post(
+        "/api/reports/generate",
+        data={"json_data": json.dumps(make_report_data(title=f"预渲染 {prerender}")), "prerender_pdf": str(prerender).lower()}
+    )
+    assert response.status_code == 200
+    return response.json()["report_id"]
+
+
+def wait_for_pdf_status(report_id, statuses, timeout=30):
+    from tara_api.main import metadata_store
+
+    deadline = time.monotonic() + timeout
+    while True:
+        status = metadata_store.get_report(report_id, include_data=False)["pdf_status"]
+        if status in statuses:
+            return status
+        assert time.monotonic() < deadline, f"PDF状态停留在 {status}"
+        time.sleep(0.05)
+
+
+def test_prerendered_pdf_is_served_from_cache(client):
+    from tara_api.main import pdf_cache
+
+    before = set(pdf_cache.cache_dir.glob("*.pdf"))
+    report_id = generate(client, True)
+    assert wait_for_pdf_status(report_id, ("ready", "failed")) == "ready"
+    [rendered] = set(pdf_cache.cache_dir.glob("*.pdf")) - before
+
+    # 下载的是后台渲染好的缓存文件
+    response = client.get(f"/api/reports/{report_id}/download/pdf")
+    assert response.status_code == 200
+    assert response.headers["ETag"] == f'"{rendered.stem}"'
+    assert response.content == rendered.read_bytes()
+
+
+def test_without_prerender_pdf_is_not_rendered(client):
+    from tara_api.main import metadata_store
+
+    report_id = generate(client, False)
+    time.sleep(0.2)
+    assert metadata_store.get_report(report_id, include_data=False)["pdf_status"] == "none"
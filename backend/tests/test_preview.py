@@ -0,0 +1,82 @@
+"""报告详情/预览的字段投影和列表分页"""
+import json
+
+import pytest
+
+from conftest import make_report_data
+from tara_api.preview import decode_offset_cursor, encode_offset_cursor, paginate_lists, parse_fields, project
+
+
+def test_parse_fields():
+    assert parse_fields(None, ["cover", "assets"]) is None
+    assert parse_fields("cover, assets,", ["cover", "assets"]) == ["cover", "assets"]
+    with pytest.raises(ValueError):
+        parse_fields("cover,unknown", ["cover"])
+
+
+def test_cursor_belongs_to_one_list():
+    cursor = encode_offset_cursor("assets", 20)
+    assert decode_offset_cursor("assets", cursor) == 20
+    with pytest.raises(ValueError):
+        decode_offset_cursor("tara_results", cursor)
+    with pytest.raises(ValueError):
+        decode_offset_cursor("assets", "not-a-cursor")
+
+
+def test_paginate_does_not_modify_source():
+    source = {"tara_results": {"title": "结果", "results": list(range(5))}}
+    content = project(dict(source), ["tara_results"])
+    pages = paginate_lists(content, {"tara_results": ("tara_results", "results")}, {"tara_results": 2}, 2)
+
+    assert content["tara_results"]["results"] == [2, 3]
+    assert source["tara_results"]["results"] == list(range(5))
+    assert pages["tara_results"]["total"] == 5
+    assert decode_offset_cursor("tara_results", pages["tara_results"]["next_cursor"]) == 4
+
+
+@pytest.fixture(scope="module")
+def report_id(client):
+    response = client.post("/api/reports/generate", data={"json_data": json.dumps(make_report_data(results_count=7))})
+    return response.json()["report_id"]
+
+
+def collect(client, url, name, cursor_param, key=lambda item: item):
+    items, params = [], {"limit": 3}
+    while True:
+        body = client.get(url, params=params).json()
+        items.extend(key(item) for item in body[name])
+        cursor = body["page"][name]["next_cursor"]
+        if cursor is None:
+            return items
+        params = {"limit": 3, cursor_param: cursor}
+
+
+def test_preview_lists_page_independently(client, report_id):
+    url = f"/api/reports/{report_id}/preview"
+    assets = collect(client, url, "assets", "assets_cursor", lambda item: item["id"])
+    results = collect(client, url, "tara_results", "results_cursor", lambda item: item["asset_id"])
+    assert assets == results == [f"P{i:03d}" for i in range(7)]
+
+    # 一个列表的游标不影响另一个列表
+    first = client.get(url, params={"limit": 3}).json()
+    second = client.get(url, params={"limit": 3, "results_cursor": first["page"]["tara_results"]["next_cursor"]}).json()
+    assert [item["id"] for item in second["assets"]] == ["P000", "P001", "P002"]
+    assert second["page"]["tara_results"]["offset"] == 3
+
+
+def test_projection(client, report_id):
+    body = client.get(f"/api/reports/{report_id}/preview", params={"fields": "cover,statistics"}).json()
+    assert set(body) == {"cover", "statistics"}
+
+    detail = client.get(f"/api/reports/{report_id}", params={"fields": "tara_results", "limit": 2}).json()
+    assert set(detail) == {"tara_results", "page"}
+    assert len(detail["tara_results"]["results"]) == 2
+    assert detail["page"]["tara_results"]["total"] == 7
+
+
+def test_invalid_view_parameters(client, report_id):
+    url = f"/api/reports/{report_id}/preview"
+    assert client.get(url, params={"fields": "unknown"}).status_code == 400
+    assets_cursor = encode_offset_cursor("assets", 3)
+    assert client.get(url, params={"results_cursor": assets_cursor}).status_code == 400
+    assert client.get(url, params={"limit": 0}).status_code == 422
@@ -0,0 +1,120 @@
+"""按需性能分析：管理令牌校验，分析结果的生成、列表、下载和文本摘要"""
+import json
+import time
+
+import pytest
+
+from conftest import make_report_data
+from tara_api.profiling import find_artifact, format_pstats, list_artifacts, run_profiled
+
+TOKEN = "test-profiling-token"
+
+
+def busy(seconds: float) -> int:
+    deadline = time.perf_counter() + seconds
+    count = 0
+    while time.perf_counter() < deadline:
+        count += 1
+    return count
+
+
+@pytest.mark.parametrize("mode", ["cprofile", "sample"])
+def test_run_profiled_writes_artifact(tmp_path, monkeypatch, mode):
+    from tara_api import profiling
+
+    monkeypatch.setattr(profiling, "SAMPLE_INTERVAL", 0.001)
+    path = tmp_path / f"RPT-1.xlsx.1.{'prof' if mode == 'cprofile' else 'folded'}"
+    assert run_profiled(mode, str(path), busy, 0.1) > 0
+
+    if mode == "cprofile":
+        assert "busy" in format_pstats(path)
+    else:
+        lines = path.read_text(encoding="utf-8").splitlines()
+        assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+        assert any(line.startswith("busy (") for line in lines)
+    # 不留下临时文件
+    assert [p.name for p in tmp_path.iterdir()] == [path.name]
+
+
+def test_run_profiled_saves_artifact_when_render_fails(tmp_path):
+    path = tmp_path / "RPT-1.xlsx.1.prof"
+    with pytest.raises(ZeroDivisionError):
+        run_profiled("cprofile", str(path), lambda: 1 / 0)
+    assert path.exists()
+
+
+def test_artifact_lookup_is_scoped_to_report(tmp_path):
+    (tmp_path / "RPT-1.xlsx.20260101T000000.prof").write_bytes(b"")
+    (tmp_path / "RPT-1.pdf.20260101T000001.folded").write_text("a;b 1\n")
+    (tmp_path / "RPT-10.xlsx.20260101T000000.prof").write_bytes(b"")
+    (tmp_path / "RPT-1.notes.txt").write_text("x")
+
+    artifacts = list_artifacts(tmp_path, "RPT-1")
+    assert [(item["target"], item["mode"]) for item in artifacts] == [("xlsx", "cprofile"), ("pdf", "sample")]
+    assert find_artifact(tmp_path, "RPT-1", "RPT-1.pdf.20260101T000001.folded")
+    assert find_artifact(tmp_path, "RPT-1", "RPT-10.xlsx.20260101T000000.prof") is None
+    assert find_artifact(tmp_path, "RPT-1", "RPT-1.notes.txt") is None
+    assert find_artifact(tmp_path, "RPT-1", "RPT-1/../RPT-10.xlsx.20260101T000000.prof") is None
+
+
+def generate(client, headers=None):
+    return client.post(
+        "/api/reports/generate",
+        data={"json_data": json.dumps(make_report_data())},
+        headers=headers or {}
+    )
+
+
+@pytest.mark.parametrize("configured, headers, status", [
+    ("", {"X-Profiling": "cprofile", "X-Profiling-Token": TOKEN}, 403),
+    (TOKEN, {"X-Profiling": "cprofile"}, 403),
+    (TOKEN, {"X-Profiling": "cprofile", "X-Profiling-Token": "wrong"}, 403),
+    (TOKEN, {"X-Profiling": "perf", "X-Profiling-Token": TOKEN}, 400),
+])
+def test_profiling_requires_valid_token_and_mode(client, monkeypatch, configured, headers, status):
+    from tara_api import main
+
+    monkeypatch.setattr(main, "PROFILING_TOKEN", configured)
+    assert generate(client, headers).status_code == status
+
+
+def test_generation_without_profiling_has_no_artifact(client):
+    response = generate(client)
+    assert response.status_code == 200
+    assert response.json().get("profiling_url") is None
+
+
+@pytest.mark.parametrize("mode", ["cprofile", "sample"])
+def test_profiled_generation_artifact_can_be_downloaded(client, monkeypatch, mode):
+    from tara_api import main
+
+    monkeypatch.setattr(main, "PROFILING_TOKEN", TOKEN)
+    auth = {"X-Profiling-Token": TOKEN}
+    response = generate(client, {"X-Profiling": mode, **auth})
+    assert response.status_code == 200
+    body = response.json()
+    url = body["profiling_url"]
+    assert url.startswith(f"/api/reports/{body['report_id']}/profiles/")
+
+    listing = client.get(f"/api/reports/{body['report_id']}/profiles", headers=auth)
+    assert listing.status_code == 200
+    [artifact] = listing.json()["profiles"]
+    assert artifact["download_url"] == url
+    assert (artifact["target"], artifact["mode"]) == ("xlsx", mode)
+
+    # 列表和下载同样需要令牌
+    assert client.get(f"/api/reports/{body['report_id']}/profiles").status_code == 403
+    assert client.get(url).status_code == 403
+    raw = client.get(url, headers=auth)
+    assert raw.status_code == 200 and raw.content
+
+    text = client.get(url, params={"format": "text", "sort": "tottime"}, headers=auth)
+    if mode == "cprofile":
+        assert text.status_code == 200
+        assert "function calls" in text.text
+    else:
+        assert text.status_code == 400
+
+    # 删除报告时一并删除分析结果
+    assert client.delete(f"/api/reports/{body['report_id']}").status_code == 200
+    assert not list_artifacts(main.PROFILES_DIR, body["report_id"])
@@ -0,0 +1,52 @@
+"""报告生成器按需加载：服务启动时不导入生成器及其依赖"""
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ("reportlab", "openpyxl", "PIL", "tara_api.tara_pdf_generator", "tara_api.tara_excel_generator")
+
+
+def run_python(code, tmp_path):
+    env = {
+        **os.environ,
+        "TARA_DATA_DIR": str(tmp_path),
+        "TARA_DB_PATH": str(tmp_path / "tara.db"),
+        "TARA_RENDERER_WARMUP": "false",
+    }
+    output = subprocess.run(
+        [sys.executable, "-c", code], env=env, cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def test_app_import_does_not_load_generators(tmp_path):
+    code = (
+        "import sys, json\n"
+        "import tara_api.main\n"
+        f"print(json.dumps([name for name in {HEAVY_MODULES!r} if name in sys.modules]))\n"
+    )
+    assert run_python(code, tmp_path) == []
+
+
+def test_warm_up_loads_generators(tmp_path):
+    code = (
+        "import json\n"
+        "from tara_api import renderers\n"
+        "before = renderers.is_loaded()\n"
+        "seconds = renderers.warm_up()\n"
+        "print(json.dumps({'before': before, 'after': renderers.is_loaded(), 'seconds': seconds}))\n"
+    )
+    result = run_python(code, tmp_path)
+    assert result["before"] is False and result["after"] is True
+    assert set(result["seconds"]) == {"tara_excel_generator", "tara_pdf_generator"}
+    assert all(value > 0 for value in result["seconds"].values())
+
+
+def test_health_reports_startup_and_renderer_state(client):
+    body = client.get("/api/health").json()
+    assert body["status"] == "healthy"
+    assert body["startup_seconds"] > 0
+    assert isinstance(body["renderers_loaded"], bool)
@@ -0,0 +1,39 @@
+"""报告列表接口：带时区的时间筛选按服务器本地时间比较"""
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from conftest import make_report_data
+
+
+@pytest.fixture(scope="module")
+def report_id(client):
+    response = client.post("/api/reports/generate", data={"json_data": json.dumps(make_report_data())})
+    assert response.status_code == 200
+    return response.json()["report_id"]
+
+
+@pytest.mark.parametrize("tz", [timezone.utc, timezone(timedelta(hours=9)), timezone(timedelta(hours=-5))])
+def test_created_filters_accept_aware_datetimes(client, report_id, tz):
+    now = datetime.now().astimezone(tz)
+    window = {
+        "created_from": (now - timedelta(minutes=5)).isoformat(),
+        "created_to": (now + timedelta(minutes=5)).isoformat()
+    }
+    ids = [report["id"] for report in client.get("/api/reports", params=window).json()["reports"]]
+    assert report_id in ids
+
+    # 窗口整体移到一小时之后，不应包含该报告
+    later = {
+        "created_from": (now + timedelta(hours=1)).isoformat(),
+        "created_to": (now + timedelta(hours=2)).isoformat()
+    }
+    ids = [report["id"] for report in client.get("/api/reports", params=later).json()["reports"]]
+    assert report_id not in ids
+
+
+def test_list_cursor_round_trip(client, report_id):
+    first = client.get("/api/reports", params={"limit": 1}).json()
+    assert len(first["reports"]) == 1
+    assert client.get("/api/reports", params={"cursor": "invalid"}).status_code == 400
@@ -0,0 +1,127 @@
+"""SQLite元数据存储：报告和图片记录的持久化；报告列表的游标分页和筛选"""
+import pytest
+
+from tara_api.storage import MetadataStore
+
+
+def add_report(store, report_id: str, created_at: str = '2026-01-01T00:00:00', threats: int = 0) -> None:
+    store.add_report({
+        'id': report_id,
+        'name': f'报告 {report_id}',
+        'project_name': '测试项目',
+        'status': 'completed',
+        'created_at': created_at,
+        'file_path': f'/tmp/{report_id}.xlsx',
+        'statistics': {'threats_count': threats, 'high_risk_count': 0}
+    })
+
+
+@pytest.fixture
+def store(tmp_path):
+    metadata_store = MetadataStore(tmp_path / "tara.db")
+    yield metadata_store
+    metadata_store.close()
+
+
+def test_report_round_trip_and_persistence(tmp_path):
+    store = MetadataStore(tmp_path / "tara.db")
+    add_report(store, "RPT-1", threats=3)
+    store.update_report("RPT-1", pdf_status='ready')
+    store.close()
+
+    # 重新打开数据库，记录依然存在
+    reopened = MetadataStore(tmp_path / "tara.db")
+    try:
+        report = reopened.get_report("RPT-1", include_data=False)
+        assert report['pdf_status'] == 'ready'
+        assert report['statistics'] == {'threats_count': 3, 'high_risk_count': 0}
+        assert reopened.has_report("RPT-1")
+        assert reopened.delete_report("RPT-1")
+        assert reopened.get_report("RPT-1") is None
+        assert not reopened.delete_report("RPT-1")
+    finally:
+        reopened.close()
+
+
+def test_update_rejects_unknown_fields(store):
+    add_report(store, "RPT-1")
+    with pytest.raises(ValueError):
+        store.update_report("RPT-1", unknown_field=1)
+
+
+def test_image_records(store):
+    image = {
+        'id': 'IMG-1', 'type': 'dataflow', 'filename': 'a.png', 'path': '/tmp/a.png',
+        'original_name': 'a.png', 'created_at': '2026-01-01T00:00:00', 'sha256': 'abc'
+    }
+    store.add_image(image)
+    # 相同ID的记录已存在时忽略
+    store.add_image({**image, 'type': 'item_boundary'})
+    assert store.get_image('IMG-1')['type'] == 'dataflow'
+    assert store.find_image_by_hash('abc')['id'] == 'IMG-1'
+    assert store.find_image_id_by_path('/tmp/a.png') == 'IMG-1'
+    assert store.count_images() == 1
+
+
+def collect_pages(store, limit: int, on_page=None, **kwargs):
+    ids, cursor = [], None
+    while True:
+        rows, cursor = store.list_reports(limit=limit, cursor=cursor, **kwargs)
+        ids.extend(row['id'] for row in rows)
+        if on_page:
+            on_page()
+        if not cursor:
+            return ids
+
+
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_pages_cover_ties_exactly_once(store, order):
+    # 多个报告的排序值相同，按ID区分先后
+    for i in range(23):
+        add_report(store, f"RPT-{i:03d}", threats=i % 3)
+
+    ids = collect_pages(store, 5, sort_by='threats_count', order=order)
+    assert len(ids) == 23
+    assert len(set(ids)) == 23
+    rows, _ = store.list_reports(limit=100, sort_by='threats_count', order=order)
+    assert ids == [row['id'] for row in rows]
+
+
+def test_inserts_during_paging_do_not_shift_pages(store):
+    for i in range(20):
+        add_report(store, f"RPT-{i:03d}", f"2026-01-01T00:00:{i:02d}", threats=1)
+    original = {f"RPT-{i:03d}" for i in range(20)}
+    inserted = iter(range(100, 200))
+
+    def insert_newer():
+        # 按创建时间倒序时，新报告位于已读页之前
+        i = next(inserted)
+        add_report(store, f"RPT-{i:03d}", f"2026-01-02T00:00:{i % 60:02d}", threats=1)
+
+    ids = collect_pages(store, 6, on_page=insert_newer, sort_by='created_at', order='desc')
+    assert [report_id for report_id in ids if report_id in original] == sorted(original, reverse=True)
+    assert len(ids) == len(set(ids))
+
+
+def test_invalid_cursor_is_rejected(store):
+    with pytest.raises(ValueError):
+        store.list_reports(cursor="not-a-cursor")
+
+
+def test_filters_and_count(store):
+    for i in range(10):
+        add_report(store, f"RPT-{i:03d}", f"2026-01-0{i % 3 + 1}T12:00:00", threats=i)
+
+    rows, cursor = store.list_reports(limit=50, min_threats=3, max_threats=6)
+    assert sorted(row['id'] for row in rows) == [f"RPT-{i:03d}" for i in range(3, 7)]
+    assert cursor is None
+
+    window = {'created_from': '2026-01-02T00:00:00', 'created_to': '2026-01-03T00:00:00'}
+    rows, _ = store.list_reports(limit=50, **window)
+    assert {row['id'] for row in rows} == {f"RPT-{i:03d}" for i in range(10) if i % 3 == 1}
+    assert store.count_reports(**window) == len(rows)
+
+
+def test_invalid_sort_field_is_rejected(store):
+    with pytest.raises(ValueError):
+        store.list_reports(sort_by='file_path')
@@ -0,0 +1,105 @@
+"""报告生成时间线：阶段记录、Chrome trace-event导出和按报告保存的条数上限"""
+import json
+import time
+
+from conftest import make_report_data
+from tara_api.instrumentation import listening, phase
+from tara_api.storage import MetadataStore
+from tara_api.tracing import TraceRecorder, chrome_trace
+
+
+def test_recorder_collects_phases_within_operation():
+    recorder = TraceRecorder("generate_report")
+    with listening(recorder):
+        with phase("json.parse"):
+            time.sleep(0.01)
+    # 离开监听范围后的阶段不记录
+    with phase("render.xlsx"):
+        pass
+    spans = recorder.finish()
+
+    assert [span[0] for span in spans] == ["generate_report", "json.parse"]
+    (_, root_ts, root_dur), (_, ts, dur) = spans
+    # 时间为Unix时间（微秒），阶段位于操作之内
+    assert abs(root_ts / 1e6 - time.time()) < 60
+    assert root_ts <= ts and ts + dur <= root_ts + root_dur
+    assert dur >= 10000
+
+
+def test_chrome_trace_events():
+    traces = {
+        "RPT-1": [
+            {"operation": "generate_report", "created_at": "t1", "spans": [["generate_report", 100, 50], ["json.parse", 100, 10]]},
+            {"operation": "render_pdf.standard", "created_at": "t2", "spans": [["render_pdf.standard", 300, 20]]},
+        ],
+        "RPT-2": [
+            {"operation": "batch_generate", "created_at": "t3", "spans": [["batch_generate", 90, 40]]},
+        ],
+    }
+    trace = chrome_trace(traces)
+    assert trace["otherData"] == {"report_ids": ["RPT-1", "RPT-2"]}
+
+    metadata = [event for event in trace["traceEvents"] if event["ph"] == "M"]
+    assert {(event["pid"], event["args"]["name"]) for event in metadata if event["name"] == "process_name"} == {
+        (1, "RPT-1"), (2, "RPT-2")
+    }
+    assert {event["args"]["name"] for event in metadata if event["name"] == "thread_name"} == {
+        "generate_report t1", "render_pdf.standard t2", "batch_generate t3"
+    }
+
+    events = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+    # 按开始时间排序，同一开始时间时外层阶段在前
+    assert [(event["name"], event["pid"], event["tid"]) for event in events] == [
+        ("batch_generate", 2, 1),
+        ("generate_report", 1, 1),
+        ("json.parse", 1, 1),
+        ("render_pdf.standard", 1, 2),
+    ]
+    assert events[2]["cat"] == "json"
+
+
+def test_store_keeps_latest_traces(tmp_path):
+    store = MetadataStore(tmp_path / "tara.db")
+    try:
+        for i in range(5):
+            store.add_trace("RPT-1", f"op{i}", "t", [[f"op{i}", i, 1]], keep=3)
+        traces = store.get_traces("RPT-1")
+        assert [trace["operation"] for trace in traces] == ["op2", "op3", "op4"]
+        assert traces[0]["spans"] == [["op2", 2, 1]]
+        assert store.get_traces("RPT-2") == []
+    finally:
+        store.close()
+
+
+def test_report_trace_endpoint(client):
+    response = client.post("/api/reports/generate", data={"json_data": json.dumps(make_report_data())})
+    assert response.status_code == 200
+    report_id = response.json()["report_id"]
+    assert client.post(f"/api/reports/{report_id}/generate-pdf").status_code == 200
+
+    response = client.get(f"/api/reports/{report_id}/trace")
+    assert response.status_code == 200
+    trace = response.json()
+    events = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+    by_thread = {}
+    for event in events:
+        by_thread.setdefault(event["tid"], []).append(event["name"])
+
+    # 报告生成和PDF渲染各为一个线程
+    generate_phases, pdf_phases = by_thread[1], by_thread[2]
+    assert {"generate_report", "json.parse", "report.validate", "render.xlsx", "report.save"} <= set(generate_phases)
+    assert any(name.startswith("excel.") for name in generate_phases)
+    assert {"render_pdf.standard", "render.pdf"} <= set(pdf_phases)
+    assert all(event["dur"] >= 0 for event in events)
+
+    assert client.get("/api/reports/RPT-UNKNOWN/trace").status_code == 404
+
+
+def test_tracing_can_be_disabled(client, monkeypatch):
+    from tara_api import main
+
+    monkeypatch.setattr(main, "TRACE_ENABLED", False)
+    response = client.post("/api/reports/generate", data={"json_data": json.dumps(make_report_data())})
+    report_id = response.json()["report_id"]
+    trace = client.get(f"/api/reports/{report_id}/trace").json()
+    assert not [event for event in trace["traceEvents"] if event["ph"] == "X"]
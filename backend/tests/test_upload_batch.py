@@ -0,0 +1,67 @@
+"""批量上传JSON和图片：图片并发保存，无法保存的图片逐个列出"""
+import asyncio
+import json
+
+from conftest import make_png, make_report_data
+
+
+def post_batch(client, images, attack_trees):
+    files = [("json_file", ("report.json", json.dumps(make_report_data()).encode(), "application/json"))]
+    files += [(field, (f"{field}.png", content, "image/png")) for field, content in images.items()]
+    files += [("attack_tree_images", item) for item in attack_trees]
+    return client.post("/api/upload/batch", files=files)
+
+
+def test_images_are_linked_and_errors_listed(client):
+    from tara_api.main import load_report_data, metadata_store
+
+    shared = make_png((50, 60, 70))
+    response = post_batch(
+        client,
+        {"item_boundary_image": shared, "dataflow_image": shared},
+        [
+            ("tree0.png", make_png((1, 2, 3)), "image/png"),
+            ("tree1.png", b"not an image", "image/png"),
+            ("tree2.txt", make_png((4, 5, 6)), "text/plain"),
+        ]
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert sorted(error["field"] for error in body["image_errors"]) == ["attack_tree_images[1]", "attack_tree_images[2]"]
+
+    report_id = body["report_info"]["id"]
+    report = metadata_store.get_report(report_id, include_data=False)
+    # 相同内容的图片只保存一份
+    assert report["image_paths"]["item_boundary"] == report["image_paths"]["dataflow"]
+    assert len(report["image_paths"]["attack_trees"]) == 1
+    assert report["image_urls"]["item_boundary"].startswith("/api/images/IMG-")
+
+    report_data = client.portal.call(load_report_data, report_id)
+    assert report_data["definitions"]["item_boundary_image"] == report["image_paths"]["item_boundary"]
+    assert [tree["image"] for tree in report_data["attack_trees"]["attack_trees"]] == report["image_paths"]["attack_trees"]
+
+
+def test_image_saving_is_concurrent_and_bounded(client, monkeypatch):
+    from tara_api import main
+
+    original = main.spool_upload
+    active, peak = 0, 0
+
+    async def slow_spool(*args, **kwargs):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        try:
+            await asyncio.sleep(0.05)
+            return await original(*args, **kwargs)
+        finally:
+            active -= 1
+
+    monkeypatch.setattr(main, "spool_upload", slow_spool)
+    monkeypatch.setattr(main, "BATCH_IMAGE_CONCURRENCY", 2)
+    trees = [(f"tree{i}.png", make_png((i, i, i)), "image/png") for i in range(6)]
+    response = post_batch(client, {}, trees)
+
+    assert response.status_code == 200
+    assert response.json()["image_errors"] == []
+    assert peak == 2
@@ -0,0 +1,75 @@
+"""上传文件分块写入磁盘：大小限制、内容哈希和文件类型识别"""
+import hashlib
+import io
+
+import pytest
+from fastapi import UploadFile
+
+from conftest import make_png
+from tara_api.uploads import SNIFF_BYTES, UploadTooLargeError, commit_upload, sniff_image_type, spool_upload
+
+
+def make_upload(content, filename="upload.bin", size=None):
+    return UploadFile(file=io.BytesIO(content), filename=filename, size=size)
+
+
+async def test_spool_writes_hashes_and_keeps_header(tmp_path):
+    content = bytes(range(256)) * 100
+    spooled = await spool_upload(make_upload(content), tmp_path, max_size=len(content), chunk_size=1000)
+
+    assert spooled.path.read_bytes() == content
+    assert spooled.size == len(content)
+    assert spooled.sha256 == hashlib.sha256(content).hexdigest()
+    assert spooled.header == content[:SNIFF_BYTES]
+
+    target = commit_upload(spooled, tmp_path / "final.bin")
+    assert target.read_bytes() == content
+    assert not spooled.path.exists()
+
+
+@pytest.mark.parametrize("declared_size", [None, 2048])
+async def test_oversized_upload_is_rejected_and_removed(tmp_path, declared_size):
+    # 未声明大小时边读边检查，声明的大小超限时不读取内容
+    upload = make_upload(b"x" * 2048, size=declared_size)
+    with pytest.raises(UploadTooLargeError):
+        await spool_upload(upload, tmp_path, max_size=1024, chunk_size=256)
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize("header, expected", [
+    (make_png(), ".png"),
+    (b"\xff\xd8\xff\xe0rest", ".jpg"),
+    (b"GIF89a...", ".gif"),
+    (b"BM....", ".bmp"),
+    (b"\xef\xbb\xbf <?xml version='1.0'?><svg xmlns='http://www.w3.org/2000/svg'/>", ".svg"),
+    (b"<html><body>not an image</body></html>", None),
+    (b"<?xml version='1.0'?><note/>", None),
+    (b"", None),
+])
+def test_sniff_image_type(header, expected):
+    assert sniff_image_type(header) == expected
+
+
+def test_api_rejects_oversized_image(client, monkeypatch):
+    from tara_api import main
+
+    monkeypatch.setattr(main, "MAX_IMAGE_SIZE", 16)
+    response = client.post(
+        "/api/images/upload",
+        files={"file": ("big.png", make_png(), "image/png")},
+        data={"image_type": "dataflow"}
+    )
+    assert response.status_code == 413
+    # 临时文件已删除
+    assert not list(main.IMAGES_DIR.glob(".upload.*"))
+
+
+def test_api_rejects_oversized_json(client, monkeypatch):
+    from tara_api import main
+
+    monkeypatch.setattr(main, "MAX_JSON_SIZE", 100)
+    response = client.post(
+        "/api/reports/generate",
+        files={"json_file": ("report.json", b"{" + b" " * 200 + b"}", "application/json")}
+    )
+    assert response.status_code == 413